@@ -0,0 +1,1228 @@
+#!/usr/bin/env python
+"""Detección y resolución de colisiones entre discos sobre arreglos de NumPy. El módulo contiene:
+
+- `rebotar_paredes` - Maneja los choques de todos los discos con las paredes.
+- `envolver` - Con bordes periódicos, devuelve a la caja los discos que salieron por un lado.
+- `imagen_minima` - Con bordes periódicos, lleva una diferencia de posiciones a la de la imagen más cercana.
+- `RejillaCeldas` - Fase amplia con una lista de celdas vectorizada.
+- `RejillaMultinivel` - Fase amplia para radios muy distintos: una lista de celdas por clase de tamaño.
+- `RejillaIncremental` - Lista de celdas que se conserva entre pasos y solo reubica los discos que cambiaron de celda.
+- `ListaVerlet` - Fase amplia con lista de vecinos y piel: solo reconstruye la lista cuando algún disco se movió más de media piel.
+- `BarridoEjes` - Fase amplia por barrido y poda a lo largo del lado más largo de la caja, sin cuadrícula.
+- `ArbolCuaternario` - Fase amplia con un árbol cuaternario adaptativo armado en bloque a partir de códigos de Morton, para distribuciones muy agrupadas.
+- `elegir_deteccion` - Elige entre la cuadrícula y el barrido según la forma de la caja y la densidad.
+- `fase_amplia_para` - Elige la fase amplia adecuada según la distribución de radios.
+- `holgura_separacion` - Separación extra de los discos que chocan, según la precisión de las posiciones.
+- `resolver_pares` - Resuelve, uno por uno, los pares de discos en contacto.
+- `rondas_sin_conflicto` - Reparte los pares en rondas en las que ningún disco aparece dos veces.
+- `resolver_lote` - Resuelve los pares en contacto por rondas, con operaciones sobre arreglos.
+"""
+
+import numpy as np
+
+from Instrumentacion import NULA
+
+
+def rebotar_paredes(pos, vel, radios, ancho, altura, masas=None):
+    """
+    Comprueba los choques de todos los discos con las paredes, con la misma regla que `Disco.check_colisionPared`: invierte la velocidad perpendicular a la pared y recoloca el disco justo dentro de la caja. Usa máscaras booleanas en lugar de recorrer los discos.
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2). Se modifica en el lugar.
+        vel (array): Velocidades de los discos, de forma (N, 2). Se modifica en el lugar.
+        radios (array): Radios de los discos, de forma (N,)
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        masas (array): Masas de los discos. Si se dan, también se devuelve el impulso transferido a las paredes.
+
+    Returns:
+        int | tuple: Cantidad de choques con las paredes; con `masas`, la cantidad y el impulso total (suma de `m |Δv|`) transferido a las paredes.
+    """
+    rebotes = 0
+    impulso = 0.0
+    for eje, largo in ((0, ancho), (1, altura)):
+        p = pos[:, eje]
+        v = vel[:, eje]
+        izq = p - radios <= -largo / 2
+        der = ~izq & (p + radios >= largo / 2)
+        if masas is not None:
+            vi, vd = v[izq], v[der]
+            impulso += float(masas[izq] @ (np.abs(vi) - vi) + masas[der] @ (np.abs(vd) + vd))
+        v[izq] = np.abs(v[izq])  # Rebote positivo
+        p[izq] = -largo / 2 + radios[izq] + largo/1000
+        v[der] = -np.abs(v[der])  # Rebote negativo
+        p[der] = largo / 2 - radios[der] - largo/1000
+        rebotes += int(np.count_nonzero(izq) + np.count_nonzero(der))
+    if masas is not None:
+        return rebotes, impulso
+    return rebotes
+
+
+def envolver(pos, ancho, altura):
+    """
+    Aplica bordes periódicos: un disco que sale por un lado de la caja entra por el lado opuesto.
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2). Se modifica en el lugar.
+        ancho (float): Ancho de la caja
+        altura (float): Alto de la caja
+
+    Returns:
+        int: Cantidad de discos que cruzaron un borde.
+    """
+    cruzaron = 0
+    for eje, largo in ((0, ancho), (1, altura)):
+        p = pos[:, eje]
+        fuera = (p < -largo / 2) | (p >= largo / 2)
+        if fuera.any():
+            p[fuera] = np.mod(p[fuera] + largo / 2, largo) - largo / 2
+            cruzaron += int(np.count_nonzero(fuera))
+    return cruzaron
+
+
+def imagen_minima(d, largo):
+    """
+    Lleva las diferencias de posición `d` a la de la imagen más cercana en una caja periódica de lado `largo`, entre `-largo/2` y `largo/2`.
+    """
+    return d - largo * np.round(d / largo)
+
+
+def _expandir(a, inicio, conteo):
+    """
+    Expande rangos de índices sin ciclos de Python. Para cada elemento `a[k]` genera los pares `(a[k], inicio[k] + m)` con `m` entre 0 y `conteo[k] - 1`.
+
+    Args:
+        a (array): Índices de origen
+        inicio (array): Primer índice de destino de cada origen
+        conteo (array): Cantidad de índices de destino de cada origen
+
+    Returns:
+        tuple: Dos arreglos con los índices de origen y de destino de cada par.
+
+    Example:
+        >>> _expandir(np.array([0, 1]), np.array([5, 7]), np.array([2, 1]))
+
+        >>> Produce (array([0, 0, 1]), array([5, 6, 7]))
+    """
+    conteo = np.maximum(conteo, 0)
+    total = int(conteo.sum())
+    if total == 0:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio
+    origen = np.repeat(a, conteo)
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(conteo) - conteo, conteo)
+    destino = np.repeat(inicio, conteo) + desplazamiento
+    return origen, destino
+
+
+def filtrar_contactos(pos, radios, i, j, caja=None):
+    """
+    Conserva solo los pares cuyos discos se tocan o se superponen, y los devuelve ordenados.
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2)
+        radios (array): Radios de los discos, de forma (N,)
+        i (array): Primer disco de cada par candidato
+        j (array): Segundo disco de cada par candidato
+        caja (tuple): Ancho y alto de la caja si los bordes son periódicos; las distancias se miden entonces a la imagen más cercana.
+
+    Returns:
+        array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+    """
+    dx = pos[j, 0] - pos[i, 0]
+    dy = pos[j, 1] - pos[i, 1]
+    if caja is not None:
+        dx = imagen_minima(dx, caja[0])
+        dy = imagen_minima(dy, caja[1])
+    d2 = dx**2 + dy**2
+    contacto = (d2 <= (radios[i] + radios[j])**2) & (d2 > 0)
+    return _canonicos(i[contacto], j[contacto])
+
+
+def _canonicos(i, j):
+    """
+    Ordena cada par como `(min, max)` y los pares en orden lexicográfico, en un arreglo de forma (M, 2).
+    """
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    orden = np.lexsort((j, i))
+    return np.stack((i[orden], j[orden]), axis=1)
+
+
+class RejillaCeldas:
+    """
+    Clase utilizada como fase amplia de la detección de colisiones mediante una lista de celdas.
+
+    Divide la caja en una cuadrícula de celdas de lado `tam_celda`. En cada llamada calcula la celda de todos los discos a la vez, los ordena por celda con NumPy y genera en bloque los pares candidatos de cada celda con sus vecinas. Solo se recorre la mitad de las celdas vecinas, de modo que cada par aparece una sola vez.
+    Con bordes periódicos las celdas cubren la caja exactamente (su lado puede ser algo mayor que `tam_celda`) y las vecinas de una celda del borde son las del lado opuesto.
+    """
+
+    # Mitad de las celdas vecinas; la celda propia se trata aparte
+    VECINAS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+    def __init__(self, ancho, altura, tam_celda, periodico=False):
+        """
+        Inicia la cuadrícula que cubre la caja.
+
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            tam_celda (float): Lado de cada celda. Debe ser al menos el diámetro del disco más grande.
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> RejillaCeldas(60, 60, 2)
+
+            >>> Crea una cuadrícula de 30x30 celdas de lado 2.
+        """
+        self.ancho = ancho
+        self.altura = altura
+        self.tam_celda = tam_celda
+        self.periodico = periodico
+        self.caja = (ancho, altura) if periodico else None
+        if periodico:
+            # La cuadrícula no puede sobresalir de la caja: la última celda es vecina de la primera
+            self.nx = max(1, int(ancho // tam_celda))
+            self.ny = max(1, int(altura // tam_celda))
+            self.lado_x = ancho / self.nx
+            self.lado_y = altura / self.ny
+        else:
+            self.nx = max(1, int(np.ceil(ancho / tam_celda)))
+            self.ny = max(1, int(np.ceil(altura / tam_celda)))
+            self.lado_x = self.lado_y = tam_celda
+        self.candidatos = 0
+        self.celdas_ocupadas = 0
+        self.medidor = NULA
+
+    def celdas(self, pos):
+        """
+        Calcula la celda de cada disco.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+
+        Returns:
+            tuple: Índices de columna y de fila de la celda de cada disco.
+        """
+        x = pos[:, 0] + self.ancho / 2
+        y = pos[:, 1] + self.altura / 2
+        if self.periodico:
+            x = np.mod(x, self.ancho)
+            y = np.mod(y, self.altura)
+        cx = np.floor(x / self.lado_x).astype(np.int64)
+        cy = np.floor(y / self.lado_y).astype(np.int64)
+        np.clip(cx, 0, self.nx - 1, out=cx)
+        np.clip(cy, 0, self.ny - 1, out=cy)
+        return cx, cy
+
+    def _vecinas(self, vx, vy):
+        """
+        Devuelve qué celdas `(vx, vy)` existen y la clave de las que existen. Con bordes periódicos todas existen: las de afuera se envuelven al lado opuesto.
+        """
+        if self.periodico:
+            return slice(None), (vx % self.nx) * self.ny + vy % self.ny
+        valido = (vx >= 0) & (vx < self.nx) & (vy >= 0) & (vy < self.ny)
+        return valido, vx[valido] * self.ny + vy[valido]
+
+    def _sin_repetidos(self, i, j, simetricos=True):
+        """
+        Con bordes periódicos y menos de tres celdas por lado, una misma celda puede ser vecina por los dos lados y un par aparecer dos veces. En ese caso deja cada par una sola vez.
+        """
+        if not self.periodico or min(self.nx, self.ny) >= 3:
+            return i, j
+        if simetricos:
+            i, j = np.minimum(i, j), np.maximum(i, j)
+        unicos = np.unique(np.stack((i, j), axis=1), axis=0)
+        return unicos[:, 0], unicos[:, 1]
+
+    def _ordenar(self, pos):
+        """
+        Ordena los discos por celda; cada celda ocupa un tramo contiguo del orden, que empieza en `inicio[celda]` y tiene `conteo[celda]` discos.
+        """
+        cx, cy = self.celdas(pos)
+        clave = cx * self.ny + cy
+        orden = np.argsort(clave, kind='stable')
+        conteo = np.bincount(clave, minlength=self.nx * self.ny)
+        inicio = np.cumsum(conteo) - conteo
+        return cx, cy, clave, orden, conteo, inicio
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+
+        Example:
+            >>> RejillaCeldas(10, 10, 2).pares(np.array([[0, 0], [1.5, 0], [4, 4]]), np.ones(3))
+
+            >>> Produce array([[0, 1]])
+        """
+        i, j = self.pares_candidatos(pos)
+        pares = filtrar_contactos(pos, radios, i, j, self.caja)
+        medidor = self.medidor
+        medidor.contar('candidatos', self.candidatos)
+        medidor.contar('contactos', len(pares))
+        medidor.contar('celdas_ocupadas', self.celdas_ocupadas)
+        medidor.marcar('pares')
+        return pares
+
+    def pares_candidatos(self, pos):
+        """
+        Genera los pares de discos que están en la misma celda o en celdas vecinas, cada par una sola vez, sin revisar si se tocan.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+
+        Returns:
+            tuple: Dos arreglos con el primer y el segundo disco de cada par candidato.
+        """
+        n = len(pos)
+        cx, cy, clave, orden, conteo, inicio = self._ordenar(pos)
+        self.celdas_ocupadas = int(np.count_nonzero(conteo))
+        self.medidor.marcar('rejilla')
+
+        k = np.arange(n)
+        cx_o, cy_o, clave_o = cx[orden], cy[orden], clave[orden]
+
+        # Pares dentro de la misma celda: cada disco con los que le siguen en su tramo
+        origenes, destinos = [], []
+        a, b = _expandir(k, k + 1, inicio[clave_o] + conteo[clave_o] - k - 1)
+        origenes.append(a)
+        destinos.append(b)
+
+        # Pares con las celdas vecinas
+        for dx, dy in self.VECINAS:
+            valido, vecina = self._vecinas(cx_o + dx, cy_o + dy)
+            a, b = _expandir(k[valido], inicio[vecina], conteo[vecina])
+            origenes.append(a)
+            destinos.append(b)
+
+        i, j = self._sin_repetidos(orden[np.concatenate(origenes)], orden[np.concatenate(destinos)])
+        self.candidatos = len(i)
+        return i, j
+
+    def pares_cruzados(self, pos_a, radios_a, pos_b, radios_b):
+        """
+        Encuentra los contactos entre dos grupos de discos distintos. La cuadrícula se arma con el grupo `b` y cada disco de `a` se compara con los de su celda y las 8 vecinas, por lo que el lado de la celda debe ser al menos la mayor suma de radios entre grupos.
+
+        Args:
+            pos_a (array): Posiciones de los discos del grupo a, de forma (Na, 2)
+            radios_a (array): Radios de los discos del grupo a
+            pos_b (array): Posiciones de los discos del grupo b, de forma (Nb, 2)
+            radios_b (array): Radios de los discos del grupo b
+
+        Returns:
+            tuple: Índices en `a` y en `b` de cada par en contacto.
+        """
+        _, _, _, orden, conteo, inicio = self._ordenar(pos_b)
+        cx, cy = self.celdas(pos_a)
+        k = np.arange(len(pos_a))
+        origenes, destinos = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                valido, vecina = self._vecinas(cx + dx, cy + dy)
+                a, b = _expandir(k[valido], inicio[vecina], conteo[vecina])
+                origenes.append(a)
+                destinos.append(b)
+        i, j = self._sin_repetidos(np.concatenate(origenes), orden[np.concatenate(destinos)], simetricos=False)
+        self.candidatos = len(i)
+        d = pos_b[j] - pos_a[i]
+        if self.periodico:
+            d = imagen_minima(d, np.array(self.caja))
+        d2 = (d**2).sum(axis=1)
+        contacto = (d2 <= (radios_a[i] + radios_b[j])**2) & (d2 > 0)
+        self.medidor.contar('candidatos', self.candidatos)
+        self.medidor.contar('contactos', int(np.count_nonzero(contacto)))
+        return i[contacto], j[contacto]
+
+
+class RejillaMultinivel:
+    """
+    Clase utilizada como fase amplia cuando los radios de los discos son muy distintos.
+
+    Con una sola cuadrícula, el lado de la celda debe ser el diámetro del disco más grande, y los discos chicos quedan amontonados en pocas celdas. Aquí cada disco se asigna a una clase de tamaño: la clase `l` agrupa los discos de diámetro entre `tam_base * 2**(l-1)` y `tam_base * 2**l`, y cada clase tiene su propia `RejillaCeldas` con celdas de lado `tam_base * 2**l`.
+    Los pares dentro de una misma clase se buscan en su cuadrícula; los pares entre una clase chica y una grande, con `RejillaCeldas.pares_cruzados` sobre la cuadrícula de la clase grande.
+    """
+
+    def __init__(self, ancho, altura, tam_base, periodico=False):
+        """
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            tam_base (float): Lado de las celdas de la clase más chica, normalmente el diámetro del disco más chico
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> RejillaMultinivel(100, 100, 0.2)
+
+            >>> Fase amplia para discos de diámetros entre 0.2 y, por ejemplo, 10: usa 7 clases de tamaño.
+        """
+        self.ancho = ancho
+        self.altura = altura
+        self.tam_base = tam_base
+        self.periodico = periodico
+        self.rejillas = {}
+        self.candidatos = 0
+        self.celdas_ocupadas = 0
+        self._medidor = NULA
+
+    @property
+    def medidor(self):
+        return self._medidor
+
+    @medidor.setter
+    def medidor(self, medidor):
+        self._medidor = medidor
+        for rejilla in self.rejillas.values():
+            rejilla.medidor = medidor
+
+    def _rejilla(self, nivel):
+        if nivel not in self.rejillas:
+            rejilla = RejillaCeldas(self.ancho, self.altura, self.tam_base * 2.0**nivel, self.periodico)
+            rejilla.medidor = self._medidor
+            self.rejillas[nivel] = rejilla
+        return self.rejillas[nivel]
+
+    def niveles(self, radios):
+        """
+        Devuelve la clase de tamaño de cada disco: el menor `l` tal que su diámetro cabe en una celda de lado `tam_base * 2**l`.
+        """
+        diametros = 2 * np.asarray(radios, dtype=float)
+        nivel = np.ceil(np.log2(np.maximum(diametros / self.tam_base, 1.0))).astype(np.int64)
+        nivel += self.tam_base * 2.0**nivel < diametros  # Corrige el redondeo de log2
+        return nivel
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+        """
+        nivel = self.niveles(radios)
+        grupos = [(l, np.flatnonzero(nivel == l)) for l in np.unique(nivel).tolist()]
+        candidatos = ocupadas = 0
+        primeros, segundos = [], []
+        for l, indices in grupos:
+            rejilla = self._rejilla(l)
+            p = rejilla.pares(pos[indices], radios[indices])
+            primeros.append(indices[p[:, 0]])
+            segundos.append(indices[p[:, 1]])
+            candidatos += rejilla.candidatos
+            ocupadas += rejilla.celdas_ocupadas
+        for a, (_, chicos) in enumerate(grupos):
+            for l, grandes in grupos[a + 1:]:
+                rejilla = self._rejilla(l)
+                i, j = rejilla.pares_cruzados(pos[chicos], radios[chicos], pos[grandes], radios[grandes])
+                primeros.append(chicos[i])
+                segundos.append(grandes[j])
+                candidatos += rejilla.candidatos
+        self.candidatos = candidatos
+        self.celdas_ocupadas = ocupadas
+        vacio = np.empty(0, dtype=np.int64)
+        pares = _canonicos(np.concatenate(primeros or [vacio]), np.concatenate(segundos or [vacio]))
+        self._medidor.marcar('pares')
+        return pares
+
+
+class RejillaIncremental(RejillaCeldas):
+    """
+    Clase utilizada como fase amplia mediante una lista de celdas que se conserva entre pasos.
+
+    Los discos se guardan ordenados por celda, igual que en `RejillaCeldas`, pero el orden no se rehace en cada llamada: solo se sacan y se vuelven a insertar, en su lugar, los discos cuya celda cambió desde el paso anterior. La lista de pares candidatos también se conserva: se le quitan los pares de los discos que cambiaron de celda y se le agregan los de sus nuevas celdas vecinas.
+    No hay arreglos por celda de la cuadrícula; las celdas se buscan en el orden con `np.searchsorted` y solo se recorren las ocupadas, de modo que las zonas vacías de la caja no cuestan nada.
+    """
+
+    # La celda propia y sus 8 vecinas
+    ALREDEDOR = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+    def __init__(self, ancho, altura, tam_celda, max_reubicados=0.125, periodico=False):
+        """
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            tam_celda (float): Lado de cada celda. Debe ser al menos el diámetro del disco más grande.
+            max_reubicados (float): Fracción de discos que cambiaron de celda a partir de la cual conviene volver a ordenar todo
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> RejillaIncremental(60, 60, 2)
+
+            >>> Cuadrícula de 30x30 celdas de lado 2 que se actualiza de un paso al siguiente.
+        """
+        super().__init__(ancho, altura, tam_celda, periodico)
+        self.max_reubicados = max_reubicados
+        self.claves = None
+        self.orden = None
+        self.ordenadas = None
+        self.reubicados = 0
+        self.reconstrucciones = 0
+        self._candidatos = None
+
+    def _reordenar(self, clave):
+        self.orden = np.argsort(clave, kind='stable')
+        self.ordenadas = clave[self.orden]
+        self.reconstrucciones += 1
+
+    def _reubicar(self, clave, movidos):
+        """
+        Saca del orden a los discos `movidos` y los inserta en el tramo de su nueva celda.
+        """
+        posicion = np.empty(len(self.orden), dtype=np.int64)
+        posicion[self.orden] = np.arange(len(self.orden))
+        orden = np.delete(self.orden, posicion[movidos])
+        ordenadas = np.delete(self.ordenadas, posicion[movidos])
+        movidos = movidos[np.argsort(clave[movidos], kind='stable')]
+        donde = np.searchsorted(ordenadas, clave[movidos])
+        self.orden = np.insert(orden, donde, movidos)
+        self.ordenadas = np.insert(ordenadas, donde, clave[movidos])
+
+    def _actualizar(self, pos):
+        """
+        Lleva el orden por celda y los pares candidatos a las posiciones actuales. Si pocos discos cambiaron de celda, solo se quitan sus pares candidatos y se agregan los de sus nuevas celdas vecinas; si no, se ordena todo de nuevo.
+        """
+        cx, cy = self.celdas(pos)
+        clave = cx * self.ny + cy
+        if self.claves is None or len(clave) != len(self.claves):
+            movidos = None
+        else:
+            movidos = np.flatnonzero(clave != self.claves)
+            if len(movidos) > self.max_reubicados * len(clave):
+                movidos = None
+        self.claves = clave
+        if movidos is None:
+            self.reubicados = len(clave)
+            self._reordenar(clave)
+            self._candidatos = self._generar() if len(clave) else (np.empty(0, dtype=np.int64),) * 2
+        elif len(movidos):
+            self.reubicados = len(movidos)
+            self._reubicar(clave, movidos)
+            self._cambiarCandidatos(cx, cy, movidos)
+            self.celdas_ocupadas = int(np.count_nonzero(np.diff(self.ordenadas))) + 1
+        else:
+            self.reubicados = 0
+
+    def _cambiarCandidatos(self, cx, cy, movidos):
+        """
+        Quita los pares candidatos de los discos `movidos` y agrega los de las 9 celdas alrededor de su nueva celda.
+        """
+        es_movido = np.zeros(len(cx), dtype=bool)
+        es_movido[movidos] = True
+        i, j = self._candidatos
+        quedan = ~(es_movido[i] | es_movido[j])
+        # Las 9 celdas alrededor de cada disco movido, todas a la vez
+        vx = (cx[movidos, None] + self.ALREDEDOR[:, 0]).ravel()
+        vy = (cy[movidos, None] + self.ALREDEDOR[:, 1]).ravel()
+        valido, vecina = self._vecinas(vx, vy)
+        inicio = np.searchsorted(self.ordenadas, vecina, 'left')
+        fin = np.searchsorted(self.ordenadas, vecina, 'right')
+        a, b = _expandir(np.repeat(movidos, len(self.ALREDEDOR))[valido], inicio, fin - inicio)
+        b = self.orden[b]
+        # Un par entre dos discos movidos aparece desde ambos; se conserva una sola vez
+        conservar = (b != a) & (~es_movido[b] | (a < b))
+        self._candidatos = (np.concatenate((i[quedan], a[conservar])), np.concatenate((j[quedan], b[conservar])))
+
+    def _generar(self):
+        """
+        Genera los pares candidatos a partir del orden por celda, recorriendo solo las celdas ocupadas.
+        """
+        ordenadas = self.ordenadas
+        n = len(ordenadas)
+        inicio = np.flatnonzero(np.diff(ordenadas, prepend=-1))
+        ocupadas = ordenadas[inicio]
+        conteo = np.diff(np.append(inicio, n))
+        self.celdas_ocupadas = len(ocupadas)
+        celda = np.repeat(np.arange(len(ocupadas)), conteo)  # celda ocupada de cada posición del orden
+
+        k = np.arange(n)
+        origenes, destinos = [], []
+        a, b = _expandir(k, k + 1, inicio[celda] + conteo[celda] - k - 1)
+        origenes.append(a)
+        destinos.append(b)
+
+        cx, cy = ocupadas // self.ny, ocupadas % self.ny
+        for dx, dy in self.VECINAS:
+            valido, vecina = self._vecinas(cx + dx, cy + dy)
+            indice = np.zeros(len(ocupadas), dtype=np.int64)
+            indice[valido] = np.minimum(np.searchsorted(ocupadas, vecina), len(ocupadas) - 1)
+            existe = np.zeros(len(ocupadas), dtype=bool)
+            existe[valido] = ocupadas[indice[valido]] == vecina
+            a, b = _expandir(k, inicio[indice][celda], np.where(existe, conteo[indice], 0)[celda])
+            origenes.append(a)
+            destinos.append(b)
+
+        return self.orden[np.concatenate(origenes)], self.orden[np.concatenate(destinos)]
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen. Da el mismo resultado que `RejillaCeldas.pares`.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+        """
+        self._actualizar(pos)
+        self.medidor.marcar('rejilla')
+        i, j = self._sin_repetidos(*self._candidatos)
+        self.candidatos = len(i)
+        pares = filtrar_contactos(pos, radios, i, j, self.caja)
+        medidor = self.medidor
+        medidor.contar('candidatos', self.candidatos)
+        medidor.contar('contactos', len(pares))
+        medidor.contar('celdas_ocupadas', self.celdas_ocupadas)
+        medidor.marcar('pares')
+        return pares
+
+
+class ListaVerlet:
+    """
+    Clase utilizada como fase amplia mediante una lista de vecinos de Verlet.
+
+    La lista guarda todos los pares de discos cuya separación entre bordes es a lo sumo `piel`, buscados con una lista de celdas. Mientras ningún disco se haya movido más de `piel / 2` desde que se armó la lista, ningún par fuera de ella puede haber llegado a tocarse, así que en cada paso solo se revisan los pares de la lista. Cuando el desplazamiento máximo supera `piel / 2`, la lista se vuelve a armar.
+    Una piel más grande reconstruye menos veces pero revisa más pares en cada paso.
+    """
+
+    def __init__(self, ancho, altura, radios, piel, periodico=False):
+        """
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            radios (array): Radios de los discos
+            piel (float): Distancia extra entre bordes hasta la que se guardan pares en la lista
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> ListaVerlet(60, 60, np.ones(250), 2)
+
+            >>> Guarda los pares de discos a menos de 4 entre centros y la reconstruye cuando un disco se movió más de 1.
+        """
+        if piel <= 0:
+            raise ValueError("La piel debe ser positiva")
+        self.piel = float(piel)
+        self.rejilla = fase_amplia_para(ancho, altura, np.asarray(radios, dtype=float) + self.piel / 2, periodico=periodico)
+        self.caja = (ancho, altura) if periodico else None
+        self.lista = np.empty((0, 2), dtype=np.int64)
+        self.referencia = None
+        self.reconstrucciones = 0
+        self.candidatos = 0
+        self.celdas_ocupadas = 0
+        self._medidor = NULA
+
+    @property
+    def medidor(self):
+        return self._medidor
+
+    @medidor.setter
+    def medidor(self, medidor):
+        self._medidor = medidor
+        self.rejilla.medidor = medidor
+
+    def _desactualizada(self, pos):
+        if self.referencia is None or self.referencia.shape != pos.shape:
+            return True
+        d = pos - self.referencia
+        if self.caja is not None:
+            d = imagen_minima(d, np.array(self.caja))
+        d2 = (d**2).sum(axis=1)
+        return 4 * float(d2.max(initial=0)) > self.piel**2
+
+    def reconstruir(self, pos, radios):
+        """
+        Arma la lista con los pares a menos de `piel` entre bordes y guarda las posiciones actuales como referencia.
+        """
+        medidor = self.rejilla.medidor
+        self.rejilla.medidor = NULA
+        self.lista = self.rejilla.pares(pos, radios + self.piel / 2)
+        self.rejilla.medidor = medidor
+        self.celdas_ocupadas = self.rejilla.celdas_ocupadas
+        self.referencia = pos.copy()
+        self.reconstrucciones += 1
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen, reconstruyendo la lista solo si hace falta.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+        """
+        if self._desactualizada(pos):
+            self.reconstruir(pos, radios)
+        self._medidor.marcar('rejilla')
+        i, j = self.lista[:, 0], self.lista[:, 1]
+        dx = pos[j, 0] - pos[i, 0]
+        dy = pos[j, 1] - pos[i, 1]
+        if self.caja is not None:
+            dx = imagen_minima(dx, self.caja[0])
+            dy = imagen_minima(dy, self.caja[1])
+        d2 = dx**2 + dy**2
+        contacto = (d2 <= (radios[i] + radios[j])**2) & (d2 > 0)
+        pares = self.lista[contacto]  # la lista ya está en orden canónico
+        self.candidatos = len(self.lista)
+        medidor = self._medidor
+        medidor.contar('candidatos', self.candidatos)
+        medidor.contar('contactos', len(pares))
+        medidor.contar('celdas_ocupadas', self.celdas_ocupadas)
+        medidor.marcar('pares')
+        return pares
+
+
+class BarridoEjes:
+    """
+    Clase utilizada como fase amplia mediante barrido y poda (*sweep and prune*) a lo largo del lado más largo de la caja.
+
+    Cada disco ocupa el intervalo `[x - r, x + r]` sobre el eje de barrido. Los discos se mantienen ordenados por el extremo izquierdo de su intervalo; recorriendo ese orden, los candidatos de cada disco son los siguientes cuyo extremo izquierdo no pasa de su extremo derecho, y se encuentran todos a la vez con `np.searchsorted`. No hay cuadrícula, así que el costo no depende del área de la caja sino de los discos y de cuántos se superponen sobre el eje: conviene en cajas muy alargadas y en gases muy diluidos.
+    El orden se conserva entre pasos. Como los discos avanzan poco en un paso, el orden anterior ya está casi ordenado, y el ordenamiento estable de NumPy (timsort), que aprovecha los tramos ya ordenados, lo corrige en tiempo casi lineal.
+    """
+
+    def __init__(self, ancho, altura, periodico=False):
+        """
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> BarridoEjes(10000, 5)
+
+            >>> Barre a lo largo del eje x de una caja de 10000x5.
+        """
+        self.ancho = ancho
+        self.altura = altura
+        self.periodico = periodico
+        self.caja = (ancho, altura) if periodico else None
+        self.eje = 0 if ancho >= altura else 1
+        self.largo = ancho if self.eje == 0 else altura
+        self.orden = None
+        self.desordenados = 0
+        self.candidatos = 0
+        self.celdas_ocupadas = 0
+        self.medidor = NULA
+
+    def _ordenar(self, izquierdos):
+        """
+        Lleva `orden` al orden actual de los extremos izquierdos, partiendo del orden del paso anterior.
+        """
+        if self.orden is None or len(self.orden) != len(izquierdos):
+            self.orden = np.argsort(izquierdos, kind='stable')
+            self.desordenados = len(izquierdos)
+            return
+        previos = izquierdos[self.orden]
+        self.desordenados = int(np.count_nonzero(previos[1:] < previos[:-1]))
+        if self.desordenados:
+            self.orden = self.orden[np.argsort(previos, kind='stable')]
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+        """
+        centro = pos[:, self.eje]
+        if self.periodico:
+            centro = np.mod(centro + self.largo / 2, self.largo) - self.largo / 2
+        izquierdos = centro - radios
+        self._ordenar(izquierdos)
+        orden = self.orden
+        izquierdos = izquierdos[orden]
+        derechos = (centro + radios)[orden]
+        self.medidor.marcar('rejilla')
+
+        # Cada disco con los siguientes del orden cuyo intervalo empieza antes de que termine el suyo
+        k = np.arange(len(orden))
+        fin = np.searchsorted(izquierdos, derechos, 'right')
+        a, b = _expandir(k, k + 1, fin - k - 1)
+        origenes, destinos = [a], [b]
+        if self.periodico and len(orden):
+            # Intervalos que pasan el borde derecho y alcanzan a los primeros discos del orden
+            fin = np.minimum(np.searchsorted(izquierdos, derechos - self.largo, 'right'), k)
+            a, b = _expandir(k, np.zeros_like(k), fin)
+            origenes.append(a)
+            destinos.append(b)
+        i = orden[np.concatenate(origenes)]
+        j = orden[np.concatenate(destinos)]
+        if self.periodico and len(orden) and 2 * (derechos - izquierdos).max() > self.largo:
+            # En una caja más angosta que dos diámetros un par puede aparecer por los dos lados
+            unicos = np.unique(np.stack((np.minimum(i, j), np.maximum(i, j)), axis=1), axis=0)
+            i, j = unicos[:, 0], unicos[:, 1]
+        self.candidatos = len(i)
+        pares = filtrar_contactos(pos, radios, i, j, self.caja)
+        medidor = self.medidor
+        medidor.contar('candidatos', self.candidatos)
+        medidor.contar('contactos', len(pares))
+        medidor.marcar('pares')
+        return pares
+
+
+def _intercalar(v):
+    """
+    Separa los 16 bits menos significativos de cada entero dejando un cero entre cada par de bits, para armar códigos de Morton.
+    """
+    v = v.astype(np.int64) & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def _solapan(lo_a, hi_a, lo_b, hi_b, largo=None):
+    """
+    Indica qué intervalos `[lo_a, hi_a]` y `[lo_b, hi_b]` se superponen. Si `largo` no es None el eje es periódico y también se prueban las copias del segundo intervalo desplazadas en un largo.
+    """
+    solapan = (lo_a <= hi_b) & (lo_b <= hi_a)
+    if largo is not None:
+        for desplazamiento in (-largo, largo):
+            solapan |= (lo_a <= hi_b + desplazamiento) & (lo_b + desplazamiento <= hi_a)
+    return solapan
+
+
+class ArbolCuaternario:
+    """
+    Clase utilizada como fase amplia mediante un árbol cuaternario (*quadtree*) adaptativo.
+
+    Cada nodo es un cuadrante de la caja; un nodo con más de `capacidad` discos se divide en cuatro, así que las zonas densas quedan cubiertas por hojas chicas y las vacías por hojas grandes, y ninguna hoja guarda más de `capacidad` discos sin importar cuánto varíe la densidad. Con la cuadrícula fija, en cambio, un cúmulo de discos cae en pocas celdas y los pares de cada celda crecen con el cuadrado de los discos que tiene.
+    El árbol se arma de nuevo en cada paso, en bloque y sin recorrer nodos con Python: cada disco recibe el código de Morton de su posición, que intercala los bits de sus coordenadas, y al ordenar por ese código los discos de cada cuadrante, a cualquier profundidad, quedan contiguos. Las hojas se deciden nivel por nivel agrupando los códigos por prefijo.
+    Los pares candidatos son los de una misma hoja y los de hojas cuyas cajas envolventes (ajustadas a sus discos, con sus radios) se superponen.
+    """
+
+    def __init__(self, ancho, altura, capacidad=16, profundidad=16, periodico=False):
+        """
+        Args:
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            capacidad (int): Cantidad máxima de discos por hoja, salvo en la profundidad máxima
+            profundidad (int): Profundidad máxima del árbol, a lo sumo 16
+            periodico (bool): Si los bordes de la caja son periódicos
+
+        Example:
+            >>> ArbolCuaternario(100, 100, capacidad=8)
+
+            >>> Divide la caja de 100x100 hasta que ninguna hoja tenga más de 8 discos.
+        """
+        if not 0 <= profundidad <= 16:
+            raise ValueError(f"La profundidad debe estar entre 0 y 16, no {profundidad}")
+        self.ancho = ancho
+        self.altura = altura
+        self.capacidad = max(1, int(capacidad))
+        self.profundidad = profundidad
+        self.periodico = periodico
+        self.caja = (ancho, altura) if periodico else None
+        self.hojas = 0
+        self.niveles = 0
+        self.candidatos = 0
+        self.celdas_ocupadas = 0
+        self.medidor = NULA
+
+    def _armar(self, pos):
+        """
+        Ordena los discos por código de Morton y reparte el orden en hojas.
+
+        Returns:
+            tuple: El orden de los discos, el inicio de cada hoja en ese orden y la cantidad de discos de cada hoja.
+        """
+        # Los cuadrantes son cuadrados: la raíz es el cuadrado del lado mayor de la caja
+        lado = 1 << self.profundidad
+        escala = lado / max(self.ancho, self.altura)
+        ix = np.clip(((pos[:, 0] + self.ancho / 2) * escala).astype(np.int64), 0, lado - 1)
+        iy = np.clip(((pos[:, 1] + self.altura / 2) * escala).astype(np.int64), 0, lado - 1)
+        codigos = _intercalar(ix) | (_intercalar(iy) << 1)
+        orden = np.argsort(codigos, kind='stable')
+        codigos = codigos[orden]
+
+        inicios, cuentas = [], []
+        pendientes = np.arange(len(orden))
+        nivel = 0
+        while len(pendientes):
+            # Cuadrantes del nivel: discos pendientes con el mismo prefijo del código
+            prefijos = codigos[pendientes] >> (2 * (self.profundidad - nivel))
+            inicio = np.flatnonzero(np.r_[True, prefijos[1:] != prefijos[:-1]])
+            cuenta = np.diff(np.r_[inicio, len(pendientes)])
+            hoja = (cuenta <= self.capacidad) | (nivel == self.profundidad)
+            inicios.append(pendientes[inicio[hoja]])
+            cuentas.append(cuenta[hoja])
+            pendientes = pendientes[np.repeat(~hoja, cuenta)]
+            nivel += 1
+        self.niveles = nivel
+        inicios = np.concatenate(inicios) if inicios else np.empty(0, dtype=np.int64)
+        cuentas = np.concatenate(cuentas) if cuentas else np.empty(0, dtype=np.int64)
+        por_inicio = np.argsort(inicios)
+        return orden, inicios[por_inicio], cuentas[por_inicio]
+
+    def pares(self, pos, radios):
+        """
+        Encuentra todos los pares de discos que se tocan o se superponen.
+
+        Args:
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            radios (array): Radios de los discos, de forma (N,)
+
+        Returns:
+            array: Arreglo de forma (M, 2) con los pares `(i, j)` en contacto, con `i < j` y en orden lexicográfico.
+        """
+        orden, inicios, cuentas = self._armar(pos)
+        n, hojas = len(orden), len(inicios)
+        self.hojas = self.celdas_ocupadas = hojas
+        p = pos[orden]
+        r = radios[orden]
+        bajos, altos = p - r[:, None], p + r[:, None]
+        self.medidor.marcar('rejilla')
+
+        # Pares dentro de cada hoja
+        k = np.arange(n)
+        fin = np.repeat(inicios + cuentas, cuentas)
+        origenes, destinos = _expandir(k, k + 1, fin - k - 1)
+        origenes, destinos = [origenes], [destinos]
+
+        if hojas > 1:
+            # Cajas envolventes de las hojas y barrido en x para hallar las que se superponen
+            caja_bajo = np.stack([np.minimum.reduceat(bajos[:, e], inicios) for e in (0, 1)], axis=1)
+            caja_alto = np.stack([np.maximum.reduceat(altos[:, e], inicios) for e in (0, 1)], axis=1)
+            por_x = np.argsort(caja_bajo[:, 0], kind='stable')
+            izquierdos = caja_bajo[por_x, 0]
+            h = np.arange(hojas)
+            fin = np.searchsorted(izquierdos, caja_alto[por_x, 0], 'right')
+            a, b = _expandir(h, h + 1, fin - h - 1)
+            if self.periodico:
+                fin = np.minimum(np.searchsorted(izquierdos, caja_alto[por_x, 0] - self.ancho, 'right'), h)
+                a2, b2 = _expandir(h, np.zeros_like(h), fin)
+                a, b = np.r_[a, a2], np.r_[b, b2]
+                if 2 * (caja_alto[:, 0] - caja_bajo[:, 0]).max() >= self.ancho:
+                    # Con hojas tan anchas como media caja un par de hojas puede aparecer por los dos lados
+                    unicos = np.unique(np.stack((np.minimum(a, b), np.maximum(a, b)), axis=1), axis=0)
+                    a, b = unicos[:, 0], unicos[:, 1]
+            a, b = por_x[a], por_x[b]
+            altura = self.altura if self.periodico else None
+            cerca = _solapan(caja_bajo[a, 1], caja_alto[a, 1], caja_bajo[b, 1], caja_alto[b, 1], altura)
+            a, b = a[cerca], b[cerca]
+
+            # Cada disco de una hoja contra los de la otra, si su intervalo alcanza la caja de la otra hoja
+            par, i = _expandir(np.arange(len(a)), inicios[a], cuentas[a])
+            otra = b[par]
+            ancho = self.ancho if self.periodico else None
+            alcanza = (_solapan(bajos[i, 0], altos[i, 0], caja_bajo[otra, 0], caja_alto[otra, 0], ancho)
+                       & _solapan(bajos[i, 1], altos[i, 1], caja_bajo[otra, 1], caja_alto[otra, 1], altura))
+            i, otra = i[alcanza], otra[alcanza]
+            i, j = _expandir(i, inicios[otra], cuentas[otra])
+            origenes.append(i)
+            destinos.append(j)
+
+        i = orden[np.concatenate(origenes)]
+        j = orden[np.concatenate(destinos)]
+        self.candidatos = len(i)
+        pares = filtrar_contactos(pos, radios, i, j, self.caja)
+        medidor = self.medidor
+        medidor.contar('candidatos', self.candidatos)
+        medidor.contar('contactos', len(pares))
+        medidor.contar('celdas_ocupadas', self.celdas_ocupadas)
+        medidor.marcar('pares')
+        return pares
+
+
+DETECCIONES = ('celdas', 'incremental', 'verlet', 'barrido', 'arbol', 'auto')
+
+
+def elegir_deteccion(ancho, altura, radios):
+    """
+    Elige entre la cuadrícula (`'celdas'`) y el barrido (`'barrido'`) comparando una estimación del trabajo de cada una para discos repartidos de manera uniforme.
+    La cuadrícula recorre todas sus celdas en cada paso y revisa, para cada disco, los discos de su celda y de 4 vecinas; el barrido no tiene celdas, pero revisa todos los discos cuyo intervalo se superpone sobre el eje de barrido, una franja que atraviesa toda la caja. El barrido gana en cajas muy alargadas y en gases muy diluidos.
+
+    Args:
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        radios (array): Radios de los discos
+
+    Returns:
+        str: `'celdas'` o `'barrido'`.
+
+    Example:
+        >>> elegir_deteccion(10000, 4, np.ones(5000))
+
+        >>> Produce 'barrido'
+    """
+    radios = np.asarray(radios, dtype=float)
+    n = len(radios)
+    if n == 0:
+        return 'celdas'
+    lado = 2 * float(radios.max()) or 1.0
+    area = ancho * altura
+    celdas = np.ceil(ancho / lado) * np.ceil(altura / lado)
+    # Pares candidatos esperados: discos por unidad de área por el área revisada alrededor de cada disco
+    candidatos_celdas = n * (n / area) * 4.5 * lado**2
+    candidatos_barrido = n * (n / area) * 2 * float(radios.mean()) * min(ancho, altura)
+    costo_celdas = celdas + n + candidatos_celdas
+    costo_barrido = 2 * n + candidatos_barrido
+    return 'barrido' if costo_barrido < costo_celdas else 'celdas'
+
+
+def fase_amplia_para(ancho, altura, radios, deteccion='celdas', piel=None, periodico=False):
+    """
+    Elige la fase amplia según los radios. Si el diámetro mayor es a lo sumo el doble del menor, una sola `RejillaCeldas` con celdas del diámetro mayor es lo más rápido; si no, se usa una `RejillaMultinivel`.
+    Con `deteccion='incremental'` la cuadrícula única es una `RejillaIncremental`, y con `deteccion='verlet'` la cuadrícula se usa solo para armar una `ListaVerlet`. Con `deteccion='barrido'` se usa un `BarridoEjes` y con `deteccion='arbol'` un `ArbolCuaternario`, que no necesitan una cuadrícula fija, y con `deteccion='auto'` `elegir_deteccion` decide entre la cuadrícula y el barrido según la forma de la caja y la densidad.
+
+    Args:
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        radios (array): Radios de los discos
+        deteccion (str): `'celdas'`, `'incremental'`, `'verlet'`, `'barrido'`, `'arbol'` o `'auto'`
+        piel (float): Piel de la lista de Verlet. Si es None, el diámetro del disco más chico.
+        periodico (bool): Si los bordes de la caja son periódicos
+
+    Returns:
+        RejillaCeldas | RejillaIncremental | RejillaMultinivel | ListaVerlet | BarridoEjes | ArbolCuaternario: La fase amplia.
+    """
+    if deteccion not in DETECCIONES:
+        raise ValueError(f"Detección desconocida: {deteccion!r}. Opciones: {', '.join(DETECCIONES)}")
+    radios = np.asarray(radios, dtype=float)
+    r_max = float(radios.max(initial=0))
+    r_min = float(radios.min(initial=r_max))
+    if deteccion == 'auto':
+        deteccion = elegir_deteccion(ancho, altura, radios)
+    if deteccion == 'barrido':
+        return BarridoEjes(ancho, altura, periodico)
+    if deteccion == 'arbol':
+        return ArbolCuaternario(ancho, altura, periodico=periodico)
+    if deteccion == 'verlet':
+        return ListaVerlet(ancho, altura, radios, piel if piel is not None else (2 * r_min or 1.0), periodico)
+    if r_min <= 0 or r_max <= 2 * r_min:
+        if deteccion == 'incremental':
+            return RejillaIncremental(ancho, altura, 2 * r_max or 1.0, periodico=periodico)
+        return RejillaCeldas(ancho, altura, 2 * r_max or 1.0, periodico)
+    return RejillaMultinivel(ancho, altura, 2 * r_min, periodico)
+
+
+def holgura_separacion(dtype, escala):
+    """
+    Distancia extra con la que se separan dos discos que chocaron: cuatro unidades de redondeo de una coordenada de tamaño `escala`. En doble precisión es 0, porque el redondeo es despreciable frente a lo que avanza un disco en un paso, y así los resultados no cambian.
+
+    Args:
+        dtype (type): Tipo de punto flotante de las posiciones
+        escala (float): Valor absoluto de la coordenada más grande
+
+    Returns:
+        float: La holgura.
+    """
+    if np.dtype(dtype) == np.float64:
+        return 0.0
+    return 4 * float(np.finfo(dtype).eps) * float(escala)
+
+
+def resolver_pares(pos, vel, radios, pares, masas=None, caja=None, iguales=None, holgura=None):
+    """
+    Resuelve los choques de los pares indicados, uno por uno y en el orden dado, con la misma física que `Disco.colisionDiscos`: choque elástico en la dirección radial, manteniendo las velocidades tangenciales, y separación de los discos superpuestos.
+    Si todas las masas son iguales (o no se indican), las velocidades radiales simplemente se intercambian. Si no, se usa la fórmula general del choque elástico, y cada disco se aparta una fracción de la superposición inversa a su masa, de modo que el centro de masa no se mueve.
+    Como cada choque modifica los discos de inmediato, la distancia de cada par se vuelve a comprobar antes de resolverlo.
+    Con posiciones en precisión simple, al guardar las posiciones separadas el redondeo puede dejar a los discos todavía en contacto y hacerlos chocar otra vez en el paso siguiente; por eso se los separa además una `holgura` de unas pocas unidades de redondeo (ver `holgura_separacion`).
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2). Se modifica en el lugar.
+        vel (array): Velocidades de los discos, de forma (N, 2). Se modifica en el lugar.
+        radios (array): Radios de los discos, de forma (N,)
+        pares (array): Pares `(i, j)` a resolver, de forma (M, 2)
+        masas (array): Masas de los discos, de forma (N,). Si es None, todas son iguales.
+        caja (tuple): Ancho y alto de la caja si los bordes son periódicos; cada par choca entonces con la imagen más cercana del otro disco.
+        iguales (bool): Si todas las masas son iguales. Si es None se averigua recorriendo `masas`; quien resuelve pocos pares sobre arreglos grandes puede calcularlo una sola vez y pasarlo.
+        holgura (float): Holgura de separación. Si es None se calcula con `holgura_separacion` a partir de la coordenada más grande de `pos`.
+
+    Returns:
+        int: Cantidad de choques resueltos.
+    """
+    if iguales is None:
+        iguales = masas is None or not len(masas) or masas.min() == masas.max()
+    if iguales:
+        masas = None
+    if holgura is None:
+        holgura = holgura_separacion(pos.dtype, np.abs(pos).max(initial=0))
+    choques = 0
+    for i, j in pares.tolist():
+        x1, y1 = pos[i].tolist()
+        x2, y2 = pos[j].tolist()
+        dx = x2 - x1
+        dy = y2 - y1
+        if caja is not None:
+            dx -= caja[0] * round(dx / caja[0])
+            dy -= caja[1] * round(dy / caja[1])
+        distancia = np.sqrt(dx**2 + dy**2)
+        suma_radios = radios[i] + radios[j]
+        if not (distancia <= suma_radios and distancia > 0):
+            continue
+
+        # Vector radial y tangencial unitarios
+        rx = dx / distancia
+        ry = dy / distancia
+        tx = -ry
+        ty = rx
+
+        vx1, vy1 = vel[i].tolist()
+        vx2, vy2 = vel[j].tolist()
+        v1r = vx1 * rx + vy1 * ry
+        v1t = vx1 * tx + vy1 * ty
+        v2r = vx2 * rx + vy2 * ry
+        v2t = vx2 * tx + vy2 * ty
+
+        if masas is None:
+            # Masas iguales: las velocidades radiales se intercambian
+            v1r_new, v2r_new = v2r, v1r
+            fraccion1 = fraccion2 = 0.5
+        else:
+            m1 = masas[i]
+            m2 = masas[j]
+            v1r_new = ((m1 - m2) * v1r + 2 * m2 * v2r) / (m1 + m2)
+            v2r_new = ((m2 - m1) * v2r + 2 * m1 * v1r) / (m1 + m2)
+            fraccion1 = m2 / (m1 + m2)
+            fraccion2 = m1 / (m1 + m2)
+        vel[i] = (v1r_new * rx + v1t * tx, v1r_new * ry + v1t * ty)
+        vel[j] = (v2r_new * rx + v2t * tx, v2r_new * ry + v2t * ty)
+
+        # Separar discos para evitar superposición
+        overlap = suma_radios - distancia + holgura
+        pos[i] = (x1 - overlap * fraccion1 * rx, y1 - overlap * fraccion1 * ry)
+        pos[j] = (x2 + overlap * fraccion2 * rx, y2 + overlap * fraccion2 * ry)
+        choques += 1
+    return choques
+
+
+def rondas_sin_conflicto(pares):
+    """
+    Reparte los pares en rondas en las que ningún disco aparece dos veces, de modo que todos los pares de una ronda se pueden resolver a la vez.
+    Cada ronda es un emparejamiento maximal: se eligen los pares cuya prioridad es la menor entre todos los pares que comparten alguno de sus discos, se descartan los que tocan a un disco ya elegido y se repite hasta que no quedan pares compatibles. La prioridad de un par es una mezcla fija de sus dos índices, así que el reparto depende solo del conjunto de pares y no del orden en que se encontraron.
+
+    Args:
+        pares (array): Pares `(i, j)` de forma (M, 2)
+
+    Returns:
+        list: Un arreglo de índices de `pares` por ronda, en orden creciente dentro de cada ronda.
+
+    Example:
+        >>> rondas_sin_conflicto(np.array([[0, 1], [1, 2], [2, 3]]))
+
+        >>> Produce [array([1]), array([0, 2])]: el par (1, 2) en una ronda y los pares (0, 1) y (2, 3), que no comparten discos, en otra.
+    """
+    m = len(pares)
+    if m == 0:
+        return []
+    discos, locales = np.unique(pares, return_inverse=True)
+    locales = locales.reshape(-1, 2)
+    mezcla = (pares[:, 0].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) ^ (pares[:, 1].astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F))
+    rango = np.empty(m, dtype=np.int64)
+    rango[np.argsort(mezcla, kind='stable')] = np.arange(m)
+
+    rondas = []
+    resto = np.arange(m)
+    while len(resto):
+        usado = np.zeros(len(discos), dtype=bool)
+        elegidos = []
+        candidatos = resto
+        while len(candidatos):
+            a, b = locales[candidatos, 0], locales[candidatos, 1]
+            r = rango[candidatos]
+            minimo = np.full(len(discos), m, dtype=np.int64)
+            np.minimum.at(minimo, a, r)
+            np.minimum.at(minimo, b, r)
+            gana = (minimo[a] == r) & (minimo[b] == r)
+            elegidos.append(candidatos[gana])
+            usado[a[gana]] = True
+            usado[b[gana]] = True
+            candidatos = candidatos[~gana & ~usado[a] & ~usado[b]]
+        ronda = np.sort(np.concatenate(elegidos))
+        rondas.append(ronda)
+        queda = np.ones(m, dtype=bool)
+        queda[ronda] = False
+        resto = resto[queda[resto]]
+    return rondas
+
+
+def resolver_lote(pos, vel, radios, pares, masas=None, caja=None, iguales=None, holgura=None):
+    """
+    Resuelve los choques de los pares indicados con la misma física que `resolver_pares`, pero con operaciones sobre arreglos en lugar de un ciclo de Python por par.
+    Los pares se reparten primero en rondas sin discos repetidos (`rondas_sin_conflicto`); los choques de una ronda no se afectan entre sí, así que se resuelven todos a la vez. Igual que en `resolver_pares`, la distancia de cada par se vuelve a comprobar al comienzo de su ronda. El resultado no depende del orden de los pares, pero no es idéntico al de `resolver_pares`, que los resuelve en el orden dado.
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2). Se modifica en el lugar.
+        vel (array): Velocidades de los discos, de forma (N, 2). Se modifica en el lugar.
+        radios (array): Radios de los discos, de forma (N,)
+        pares (array): Pares `(i, j)` a resolver, de forma (M, 2)
+        masas (array): Masas de los discos, de forma (N,). Si es None, todas son iguales.
+        caja (tuple): Ancho y alto de la caja si los bordes son periódicos
+        iguales (bool): Si todas las masas son iguales, como en `resolver_pares`
+        holgura (float): Holgura de separación, como en `resolver_pares`
+
+    Returns:
+        int: Cantidad de choques resueltos.
+    """
+    if iguales is None:
+        iguales = masas is None or not len(masas) or masas.min() == masas.max()
+    if iguales:
+        masas = None
+    if holgura is None:
+        holgura = holgura_separacion(pos.dtype, np.abs(pos).max(initial=0))
+    choques = 0
+    for ronda in rondas_sin_conflicto(pares):
+        i, j = pares[ronda, 0], pares[ronda, 1]
+        # Las cuentas se hacen en doble precisión, como en `resolver_pares`
+        p1 = pos[i].astype(np.float64)
+        p2 = pos[j].astype(np.float64)
+        d = p2 - p1
+        if caja is not None:
+            d = imagen_minima(d, np.array(caja))
+        distancia = np.sqrt((d**2).sum(axis=1))
+        suma_radios = radios[i].astype(np.float64) + radios[j]
+        contacto = (distancia <= suma_radios) & (distancia > 0)
+        if not contacto.all():
+            i, j, p1, p2, d = i[contacto], j[contacto], p1[contacto], p2[contacto], d[contacto]
+            distancia, suma_radios = distancia[contacto], suma_radios[contacto]
+        if len(i) == 0:
+            continue
+
+        # Vector radial y tangencial unitarios
+        r = d / distancia[:, None]
+        t = np.stack((-r[:, 1], r[:, 0]), axis=1)
+        v1 = vel[i].astype(np.float64)
+        v2 = vel[j].astype(np.float64)
+        v1r = (v1 * r).sum(axis=1)
+        v1t = (v1 * t).sum(axis=1)
+        v2r = (v2 * r).sum(axis=1)
+        v2t = (v2 * t).sum(axis=1)
+
+        if masas is None:
+            # Masas iguales: las velocidades radiales se intercambian
+            v1r_new, v2r_new = v2r, v1r
+            fraccion1 = fraccion2 = 0.5
+        else:
+            m1 = masas[i].astype(np.float64)
+            m2 = masas[j].astype(np.float64)
+            v1r_new = ((m1 - m2) * v1r + 2 * m2 * v2r) / (m1 + m2)
+            v2r_new = ((m2 - m1) * v2r + 2 * m1 * v1r) / (m1 + m2)
+            fraccion1 = m2 / (m1 + m2)
+            fraccion2 = m1 / (m1 + m2)
+        vel[i] = v1r_new[:, None] * r + v1t[:, None] * t
+        vel[j] = v2r_new[:, None] * r + v2t[:, None] * t
+
+        # Separar discos para evitar superposición
+        overlap = suma_radios - distancia + holgura
+        pos[i] = p1 - (overlap * fraccion1)[:, None] * r
+        pos[j] = p2 + (overlap * fraccion2)[:, None] * r
+        choques += len(i)
+    return choques
+
+
+RESOLUCIONES = {'secuencial': resolver_pares, 'lote': resolver_lote}
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""Colocación inicial de discos sin superposiciones. El módulo contiene las siguientes funciones:
+
+- `colocar_rejilla` - Muestreo por rechazo que solo compara con los discos de las celdas vecinas.
+- `colocar_lotes` - Muestreo por rechazo que genera y verifica candidatos en lotes vectorizados.
+- `colocar_red` - Red hexagonal con perturbación aleatoria; siempre tiene éxito hasta el empaquetamiento compacto.
+
+Todas reciben un generador `np.random.Generator` y devuelven los índices de los discos colocados junto con sus posiciones.
+"""
+
+import numpy as np
+
+from Colisiones import RejillaCeldas
+
+# Candidatos que se generan de una vez en el muestreo por rechazo disco por disco
+LOTE_RECHAZO = 16
+
+
+def _limites(ancho, altura, radios):
+    """
+    Devuelve los límites inferior y superior de las posiciones de cada disco para que quede dentro de la caja.
+    """
+    radios = np.asarray(radios, dtype=float)
+    bajo = np.stack((-ancho / 2 + radios, -altura / 2 + radios), axis=1)
+    alto = np.stack((ancho / 2 - radios, altura / 2 - radios), axis=1)
+    return bajo, alto
+
+
+def colocar_rejilla(n, ancho, altura, radios, rng, intentos=1000):
+    """
+    Coloca los discos uno por uno con muestreo por rechazo. Cada candidato solo se compara con los discos ya colocados en su celda y en las 8 celdas vecinas, en lugar de con todos.
+
+    Args:
+        n (int): Número de discos
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        radios (array): Radio de cada disco, de forma (n,)
+        rng (Generator): Generador de números aleatorios
+        intentos (int): Máximo de candidatos por disco antes de darlo por perdido
+
+    Returns:
+        tuple: Índices de los discos colocados y sus posiciones, de forma (m, 2).
+
+    Example:
+        >>> colocar_rejilla(100, 60, 60, np.ones(100), np.random.default_rng(0))
+
+        >>> Coloca 100 discos de radio 1 en una caja de 60x60.
+    """
+    radios = np.asarray(radios, dtype=float)
+    bajo, alto = _limites(ancho, altura, radios)
+    tam = 2 * float(radios.max(initial=0)) or 1.0
+    r = radios.tolist()
+    celdas = {}
+    posiciones = {}
+    colocados = []
+
+    def libre(i, x, y, cx, cy):
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for k in celdas.get((cx + dx, cy + dy), ()):
+                    xk, yk = posiciones[k]
+                    if (xk - x)**2 + (yk - y)**2 < (r[k] + r[i])**2:
+                        return False
+        return True
+
+    for i in range(n):
+        for intento in range(0, intentos, LOTE_RECHAZO):
+            candidatos = rng.uniform(bajo[i], alto[i], size=(min(LOTE_RECHAZO, intentos - intento), 2))
+            for x, y in candidatos.tolist():
+                cx = int(x // tam)
+                cy = int(y // tam)
+                if libre(i, x, y, cx, cy):
+                    posiciones[i] = (x, y)
+                    celdas.setdefault((cx, cy), []).append(i)
+                    colocados.append(i)
+                    break
+            if colocados and colocados[-1] == i:
+                break
+    return np.array(colocados, dtype=np.int64), np.array([posiciones[i] for i in colocados]).reshape(-1, 2)
+
+
+def colocar_lotes(n, ancho, altura, radios, rng, rondas=100, intentos=1000):
+    """
+    Coloca los discos generando candidatos en lotes. En cada ronda se proponen posiciones para todos los discos que faltan y se detectan los conflictos de forma vectorizada con `Colisiones.RejillaCeldas`: un candidato se descarta si toca a un disco ya colocado o a un candidato anterior del mismo lote.
+    Cuando faltan pocos discos, cada uno recibe varios candidatos por ronda, de modo que cada lote tiene alrededor de n candidatos.
+
+    Args:
+        n (int): Número de discos
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        radios (array): Radio de cada disco, de forma (n,)
+        rng (Generator): Generador de números aleatorios
+        rondas (int): Máximo de lotes antes de dar por perdidos los discos que falten
+        intentos (int): Máximo de candidatos por disco en una misma ronda
+
+    Returns:
+        tuple: Índices de los discos colocados y sus posiciones, de forma (m, 2).
+    """
+    radios = np.asarray(radios, dtype=float)
+    bajo, alto = _limites(ancho, altura, radios)
+    rejilla = RejillaCeldas(ancho, altura, 2 * float(radios.max(initial=0)) or 1.0)
+    colocados = np.empty(0, dtype=np.int64)
+    posiciones = np.empty((0, 2))
+    faltan = np.arange(n)
+    for _ in range(rondas):
+        if len(faltan) == 0:
+            break
+        copias = int(min(intentos, max(1, n // len(faltan))))
+        duenos = np.tile(faltan, copias)
+        candidatos = rng.uniform(bajo[duenos], alto[duenos])
+        todos = np.concatenate((colocados, duenos))
+        pares = rejilla.pares(np.concatenate((posiciones, candidatos)), radios[todos])
+
+        # Los índices desde len(colocados) son candidatos; en cada par se rechaza el segundo,
+        # aunque el primero también sea rechazado
+        m = len(colocados)
+        rechazado = np.zeros(len(duenos), dtype=bool)
+        rechazado[pares[:, 1][pares[:, 1] >= m] - m] = True
+
+        # Cada disco se queda con su primer candidato aceptado
+        aceptados = np.flatnonzero(~rechazado)
+        duenos_aceptados, primero = np.unique(duenos[aceptados], return_index=True)
+        colocados = np.concatenate((colocados, duenos_aceptados))
+        posiciones = np.concatenate((posiciones, candidatos[aceptados[primero]]))
+        faltan = np.setdiff1d(faltan, duenos_aceptados)
+    orden = np.argsort(colocados, kind='stable')
+    return colocados[orden], posiciones[orden]
+
+
+def _sitios_hexagonales(ancho_util, altura_util, a):
+    """
+    Genera los sitios de una red hexagonal de espaciado `a` dentro de un rectángulo de `ancho_util` por `altura_util` con esquina en el origen.
+    """
+    h = a * np.sqrt(3) / 2
+    filas = int(np.floor(altura_util / h + 1e-9)) + 1
+    sitios = []
+    for f in range(filas):
+        desplazamiento = a / 2 if f % 2 else 0.0
+        columnas = int(np.floor((ancho_util - desplazamiento) / a + 1e-9)) + 1
+        if columnas <= 0:
+            continue
+        x = desplazamiento + a * np.arange(columnas)
+        sitios.append(np.stack((x, np.full(columnas, f * h)), axis=1))
+    return np.concatenate(sitios) if sitios else np.empty((0, 2))
+
+
+def colocar_red(n, ancho, altura, radios, rng):
+    """
+    Coloca los discos en los sitios de una red hexagonal y los perturba al azar. El espaciado de la red es el mayor que deja lugar para los n discos, y la perturbación de cada disco es menor que la mitad del espacio libre entre vecinos, de modo que nunca hay superposiciones.
+    Siempre tiene éxito mientras los discos quepan en una red hexagonal compacta de espaciado igual al diámetro mayor.
+
+    Args:
+        n (int): Número de discos
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        radios (array): Radio de cada disco, de forma (n,)
+        rng (Generator): Generador de números aleatorios
+
+    Returns:
+        tuple: Índices de los discos colocados y sus posiciones, de forma (n, 2).
+
+    Example:
+        >>> colocar_red(200, 40, 40, np.ones(200), np.random.default_rng(0))
+
+        >>> Coloca los 200 discos que el muestreo por rechazo no logra colocar.
+    """
+    radios = np.asarray(radios, dtype=float)
+    r = float(radios.max(initial=0))
+    ancho_util = ancho - 2 * r
+    altura_util = altura - 2 * r
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 2))
+    if ancho_util < 0 or altura_util < 0 or len(_sitios_hexagonales(ancho_util, altura_util, 2 * r)) < n:
+        raise ValueError(f"No caben {n} discos de radio {r} en un espacio de {ancho}x{altura}")
+
+    # Búsqueda binaria del mayor espaciado con al menos n sitios
+    a_min, a_max = 2 * r, max(ancho_util, altura_util, 2 * r) + 2 * r
+    for _ in range(60):
+        a = (a_min + a_max) / 2
+        if len(_sitios_hexagonales(ancho_util, altura_util, a)) >= n:
+            a_min = a
+        else:
+            a_max = a
+    sitios = _sitios_hexagonales(ancho_util, altura_util, a_min)
+    sitios = sitios[rng.choice(len(sitios), size=n, replace=False)]
+
+    # Perturbación uniforme dentro de un círculo de radio (a - 2r) / 2
+    amplitud = (a_min - 2 * r) / 2 * np.sqrt(rng.uniform(0, 1, n))
+    angulo = rng.uniform(0, 2 * np.pi, n)
+    posiciones = sitios + np.stack((amplitud * np.cos(angulo), amplitud * np.sin(angulo)), axis=1)
+    posiciones += (-ancho_util / 2, -altura_util / 2)
+    bajo, alto = _limites(ancho, altura, radios)
+    posiciones = np.clip(posiciones, bajo, alto)
+    return np.arange(n), posiciones
+
+
+METODOS = {
+    'rejilla': colocar_rejilla,
+    'lotes': colocar_lotes,
+    'red': colocar_red,
+}
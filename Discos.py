@@ -7,9 +7,6 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import matplotlib.patches as patches
 import random
 
 class Disco:
@@ -259,10 +256,40 @@ class DiscoSimulation:
                     print(f"Advertencia: No se pudo colocar el disco {i+1} después de {Max} intentos")
 
 
+    def paso(self):
+        """
+        Avanza un paso de tiempo sin dibujar nada. Actualiza la posición de los discos, comprueba si existen choques y llama a las funciones pertinentes en cada caso. Cada par de discos se revisa una vez, es decir, N(N-1)/2 comprobaciones por paso.
+
+        Returns:
+            int: Cantidad de choques entre discos en el paso.
+
+        Example:
+            >>> for _ in range(1000):
+            >>>     sim.paso()
+
+            >>> Simula 1000 pasos sin abrir ninguna ventana.
+        """
+        # Mover todos los discos
+        for disco in self.discos:
+            disco.move(self.pasoTemp)
+            disco.check_colisionPared(self.ancho, self.altura)
+
+        # Verificar colisiones entre discos
+        choques = 0
+        for k in range(len(self.discos)):
+            for j in range(k + 1, len(self.discos)):
+                if self.discos[k].check_colisionDisco(self.discos[j]):
+                    choques += 1
+        return choques
+
     def animarMovimiento(self):
         """
         Anima la simulación. Calcula las posiciones de los discos. Maneja las colisiones. 
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.animation as animation
+        import matplotlib.patches as patches
+
         fig, ax = plt.subplots()
         ax.set_xlim(-self.ancho / 2, self.ancho / 2)
         ax.set_ylim(-self.altura / 2, self.altura / 2)
@@ -285,17 +312,9 @@ class DiscoSimulation:
         
         def animar(i):
             """
-            Calcula y renderiza cada uno de los frames. Actualiza la posición de los discos, comprueba si existen choques y llama a las funciones pertinentes en cada caso. Finalmente dibuja las posiciones actualizadas de cada disco.
+            Calcula y renderiza cada uno de los frames. Avanza un paso de la simulación y dibuja las posiciones actualizadas de cada disco.
             """
-            # Mover todos los discos
-            for disco in self.discos:
-                disco.move(self.pasoTemp)
-                disco.check_colisionPared(self.ancho, self.altura)
-
-            # Verificar colisiones entre discos (optimizado)
-            for k in range(len(self.discos)):
-                for j in range(k + 1, len(self.discos)):
-                    self.discos[k].check_colisionDisco(self.discos[j])
+            self.paso()
 
             # Actualizar posiciones visuales
             for idx, disco in enumerate(self.discos):
@@ -320,6 +339,8 @@ class DiscoSimulation:
             >>> sim.histograma(100) 
             >>> Dibuja el histograma con 100 columnas.
         """
+        import matplotlib.pyplot as plt
+
         posiciones_x = []
 
         for disco in self.discos:
@@ -336,7 +357,8 @@ class DiscoSimulation:
         plt.show() 
 
 
-sim = DiscoSimulation(100, 32, 32, 1, 0.03)
-sim.creacionDiscos()
-sim.animarMovimiento()
-sim.histograma(500)
+if __name__ == "__main__":
+    sim = DiscoSimulation(100, 32, 32, 1, 0.03)
+    sim.creacionDiscos()
+    sim.animarMovimiento()
+    sim.histograma(500)
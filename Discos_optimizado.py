@@ -1,25 +1,71 @@
 #!/usr/bin/env python
-"""Esta es una optimización del primer código, el módulo contiene las siguientes dos clases:
+"""Esta es una optimización del primer código, el módulo contiene las siguientes clases:
 
+- `EstadoDiscos` - Guarda el estado de todos los discos en arreglos contiguos de NumPy.
 - `Disco` - Representa a un disco dentro de la simulación.
 - `DiscoSimulation` - Genera, inicia y analiza la simulación.
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import matplotlib.patches as patches
-import random
+
+from Colisiones import DETECCIONES, RESOLUCIONES, envolver, fase_amplia_para, holgura_separacion, rebotar_paredes
+from Colocacion import METODOS as METODOS_COLOCACION
+from Eventos import MotorEventos
+from Histogramas import HistogramaAcumulado, HistogramaAcumulado2D
+from Instrumentacion import NULA, Instrumentacion
+from Integracion import INTEGRADORES, paso_adaptativo, paso_subpasos
+from Observables import Observables
+from PuntosControl import PuntosAutomaticos, cargar_punto, guardar_punto
+from Trayectorias import GrabadorTrayectoria
+
+# Cota de cada componente de la velocidad inicial de los discos
+VELOCIDAD_INICIAL = 3.0
+
+
+class EstadoDiscos:
+    """
+    Clase utilizada para guardar el estado de todos los discos como una estructura de arreglos.
+
+    Las posiciones, velocidades, radios y masas de los N discos se guardan en arreglos contiguos de NumPy, de modo que el sistema completo se puede avanzar con operaciones vectorizadas en lugar de recorrer objetos de Python uno por uno.
+    """
+
+    def __init__(self, posiciones, velocidades, radios, colores, masas=None, dtype=np.float64):
+        """
+        Inicia el estado a partir de las posiciones, velocidades, radios y colores de los discos.
+
+        Args:
+            posiciones (array): Arreglo de forma (N, 2) con las posiciones (x, y) de los discos
+            velocidades (array): Arreglo de forma (N, 2) con las velocidades (x, y) de los discos
+            radios (array): Arreglo de forma (N,) con el radio de cada disco
+            colores (list): Lista con el color de cada disco
+            masas (array): Arreglo de forma (N,) con la masa de cada disco. Si es None, la masa es proporcional al área: `radio**2`.
+            dtype (type): Tipo de punto flotante de todos los arreglos, `np.float64` o `np.float32`
+
+        Example:
+            >>> EstadoDiscos([[0, 0], [2, 2]], [[1, 0], [0, -1]], [1, 1], ["red", "blue"])
+
+            >>> Produce el estado de dos discos de radio 1
+        """
+        self.pos = np.array(posiciones, dtype=dtype).reshape(-1, 2)
+        self.vel = np.array(velocidades, dtype=dtype).reshape(-1, 2)
+        self.radios = np.array(radios, dtype=dtype).reshape(-1)
+        self.masas = self.radios**2 if masas is None else np.array(np.broadcast_to(masas, self.radios.shape), dtype=dtype)
+        self.colores = list(colores)
+
+    def __len__(self):
+        return len(self.radios)
+
 
 class Disco:
     """
     Clase utilizada para representar un disco.
 
-    Guarda la información propia del disco (posición, velocidad, radio y color).
+    Guarda la información propia del disco (posición, velocidad, radio, masa y color).
     Determina el movimiento de cada disco; actualiza su posición, comprueba y maneja las colisiones con paredes y con otros discos.
+    Los discos de una `DiscoSimulation` son vistas sobre su `EstadoDiscos`: no guardan datos propios, sino que leen y escriben la fila correspondiente de los arreglos de la simulación.
     """
 
-    def __init__(self, x_pos, y_pos, radio, color, x_vel, y_vel):
+    def __init__(self, x_pos, y_pos, radio, color, x_vel, y_vel, masa=None):
         """
         Inicia cada instancia de los discos. Crea además un historial de las posiciones tomadas por cada disco.
 
@@ -30,19 +76,106 @@ class Disco:
             color (string): Color del disco
             x_vel (float): Velocidad en x del disco
             y_vel (float): Velocidad en y del disco
+            masa (float): Masa del disco. Si es None, es `radio**2`.
             
         Example:
             >>> Disco(0, 0, 1, "red", 1, 2)
             
             >>> Produce una instancia de un disco rojo de radio 1, ubicado en el centro del cuadro, con velocidad (1, 2)
         """
-        self.x_pos = x_pos
-        self.y_pos = y_pos
-        self.radio = radio
-        self.color = color
-        self.x_vel = x_vel
-        self.y_vel = y_vel
-        self.x_poss = [x_pos]  
+        self._sim = None
+        self._i = 0
+        self._propio = EstadoDiscos([[x_pos, y_pos]], [[x_vel, y_vel]], [radio], [color], None if masa is None else [masa])
+        self._x_poss = [x_pos]
+
+    @classmethod
+    def _vista(cls, sim, i):
+        """
+        Crea un disco que no guarda datos propios, sino que lee y escribe la fila `i` del estado de la simulación.
+
+        Args:
+            sim (DiscoSimulation): Simulación dueña del estado
+            i (int): Índice del disco dentro del estado
+        """
+        disco = cls.__new__(cls)
+        disco._sim = sim
+        disco._i = i
+        disco._propio = None
+        disco._x_poss = None
+        return disco
+
+    @property
+    def _estado(self):
+        return self._propio if self._sim is None else self._sim.estado
+
+    @property
+    def x_pos(self):
+        return float(self._estado.pos[self._i, 0])
+
+    @x_pos.setter
+    def x_pos(self, valor):
+        self._estado.pos[self._i, 0] = valor
+
+    @property
+    def y_pos(self):
+        return float(self._estado.pos[self._i, 1])
+
+    @y_pos.setter
+    def y_pos(self, valor):
+        self._estado.pos[self._i, 1] = valor
+
+    @property
+    def x_vel(self):
+        return float(self._estado.vel[self._i, 0])
+
+    @x_vel.setter
+    def x_vel(self, valor):
+        self._estado.vel[self._i, 0] = valor
+
+    @property
+    def y_vel(self):
+        return float(self._estado.vel[self._i, 1])
+
+    @y_vel.setter
+    def y_vel(self, valor):
+        self._estado.vel[self._i, 1] = valor
+
+    @property
+    def radio(self):
+        return float(self._estado.radios[self._i])
+
+    @radio.setter
+    def radio(self, valor):
+        self._estado.radios[self._i] = valor
+
+    @property
+    def masa(self):
+        return float(self._estado.masas[self._i])
+
+    @masa.setter
+    def masa(self, valor):
+        self._estado.masas[self._i] = valor
+
+    @property
+    def color(self):
+        return self._estado.colores[self._i]
+
+    @color.setter
+    def color(self, valor):
+        self._estado.colores[self._i] = valor
+
+    @property
+    def x_poss(self):
+        """
+        Historial de posiciones en x del disco. Si el disco pertenece a una simulación, el historial se obtiene de la simulación.
+        """
+        if self._sim is None:
+            return self._x_poss
+        return self._sim.historialX(self._i)
+
+    def _actualizarHistorial(self):
+        if self._sim is None:
+            self._x_poss[-1] = self.x_pos
 
     def move(self, dt):
         """
@@ -68,7 +201,8 @@ class Disco:
         """
         self.x_pos += self.x_vel * dt 
         self.y_pos += self.y_vel * dt
-        self.x_poss.append(self.x_pos)
+        if self._sim is None:
+            self._x_poss.append(self.x_pos)
           
 
     def check_colisionPared(self, ancho, altura):
@@ -97,11 +231,11 @@ class Disco:
         if self.x_pos - self.radio <= -ancho / 2:
             self.x_vel = abs(self.x_vel)  # Rebote positivo
             self.x_pos = -ancho / 2 + self.radio + ancho/1000
-            self.x_poss[-1] = self.x_pos
+            self._actualizarHistorial()
         elif self.x_pos + self.radio >= ancho / 2:
             self.x_vel = -abs(self.x_vel)  # Rebote negativo
             self.x_pos = ancho / 2 - self.radio - ancho/1000
-            self.x_poss[-1] = self.x_pos
+            self._actualizarHistorial()
             
         if self.y_pos - self.radio <= -altura / 2:
             self.y_vel = abs(self.y_vel)
@@ -113,6 +247,7 @@ class Disco:
     def colisionDiscos(self, otro_disco):
         """
         Comprueba la colisión con otros discos. Cuando choca, intercambia las velocidades radiales de los discos, y mantiene la velocidad tangencial constante. Separa ligeramente ambos discos, para evitar errores.
+        Si las masas son distintas, las velocidades radiales siguen la fórmula general del choque elástico en una dimensión, y cada disco se aparta una fracción de la superposición inversa a su masa.
 
         Args:
             otro_disco (instance): El disco con el que se colisiona
@@ -162,9 +297,19 @@ class Disco:
             v2r = otro_disco.x_vel * rx + otro_disco.y_vel * ry
             v2t = otro_disco.x_vel * tx + otro_disco.y_vel * ty
             
-            # En colisión elástica de masas iguales, las velocidades radiales se intercambian
-            v1r_new = v2r
-            v2r_new = v1r
+            m1 = self.masa
+            m2 = otro_disco.masa
+            if m1 == m2:
+                # En colisión elástica de masas iguales, las velocidades radiales se intercambian
+                v1r_new = v2r
+                v2r_new = v1r
+                fraccion1 = fraccion2 = 0.5
+            else:
+                # Conservación del momento y de la energía en la dirección radial
+                v1r_new = ((m1 - m2) * v1r + 2 * m2 * v2r) / (m1 + m2)
+                v2r_new = ((m2 - m1) * v2r + 2 * m1 * v1r) / (m1 + m2)
+                fraccion1 = m2 / (m1 + m2)
+                fraccion2 = m1 / (m1 + m2)
             # Las velocidades angulares se mantienen
             v1t_new = v1t
             v2t_new = v2t
@@ -175,16 +320,17 @@ class Disco:
             otro_disco.x_vel = v2r_new * rx + v2t_new * tx
             otro_disco.y_vel = v2r_new * ry + v2t_new * ty
             
-            # Separar discos para evitar superposición
-            overlap = (self.radio + otro_disco.radio - distancia) / 2.0
-            self.x_pos -= overlap * rx
-            self.y_pos -= overlap * ry
-            otro_disco.x_pos += overlap * rx
-            otro_disco.y_pos += overlap * ry
+            # Separar discos para evitar superposición; en precisión simple, con una holgura por el redondeo
+            escala = max(abs(self.x_pos), abs(self.y_pos), abs(otro_disco.x_pos), abs(otro_disco.y_pos))
+            overlap = self.radio + otro_disco.radio - distancia + holgura_separacion(self._estado.pos.dtype, escala)
+            self.x_pos -= overlap * fraccion1 * rx
+            self.y_pos -= overlap * fraccion1 * ry
+            otro_disco.x_pos += overlap * fraccion2 * rx
+            otro_disco.y_pos += overlap * fraccion2 * ry
             
             #Actualizar historial de posiciones
-            self.x_poss[-1] = self.x_pos
-            otro_disco.x_poss[-1] = otro_disco.x_pos
+            self._actualizarHistorial()
+            otro_disco._actualizarHistorial()
             
             return True
         return False
@@ -194,7 +340,13 @@ class DiscoSimulation:
     Clase utilizada para genera e iniciar la simulación. Genera un histograma sobre las posiciones en el eje x por las cuales pasaron los discos durante toda la simulación. 
     """
     
-    def __init__(self, N, height, width, radio, dt):
+    MOTORES = ('pasos', 'eventos')
+    HISTOGRAMAS = ('x', 'y', 'xy', 'rapidez')
+    PRECISIONES = (np.dtype(np.float64), np.dtype(np.float32))
+
+    def __init__(self, N, height, width, radio, dt, motor='pasos', bins=500, histogramas=('x',), historial=False, semilla=None, masas=None,
+                 deteccion='celdas', piel=None, integrador='fijo', fraccion=0.25, max_subpasos=64, periodico=False,
+                 dtype=np.float64, resolucion='secuencial', rango_rapidez=None):
         """
         Inicia los parámetros que se mantienen constantes en la simulación.
 
@@ -202,24 +354,136 @@ class DiscoSimulation:
             N (int): Número de discos
             height (float): Altura del espacio limitado.
             width (float): Ancho del espacio limitado.
-            radio (float): Radio de los discos.
-            dt (float): Paso del tiempo.
+            radio (float | array): Radio de los discos, uno común o uno por disco (arreglo de forma (N,)).
+            dt (float): Paso del tiempo. Con el motor de eventos es el intervalo entre muestras.
+            motor (str): `'pasos'` avanza con un paso de tiempo fijo; `'eventos'` salta de choque en choque con `Eventos.MotorEventos` y toma muestras cada `dt`.
+            bins (int): Columnas de los histogramas acumulados. `histograma` puede dibujar cualquier divisor de este valor.
+            histogramas (tuple): Histogramas que se acumulan en cada paso: `'x'`, `'y'`, `'xy'` (conjunto de posiciones) y `'rapidez'`.
+            rango_rapidez (tuple): Rango (mínimo, máximo) del histograma de rapidez. Si es None va de 0 al doble de la rapidez máxima inicial, que cambia con la semilla; varias simulaciones que se comparan columna por columna deben usar el mismo rango.
+            historial (bool): Si es True, además se guarda el historial completo de posiciones en x de cada disco, lo que ocupa memoria proporcional a N por la cantidad de pasos.
+            semilla (int): Semilla del generador de números aleatorios `rng`. Con la misma semilla se obtienen los mismos discos.
+            masas (float | array): Masa de los discos, una común o una por disco. Si es None, la masa de cada disco es `radio**2` (discos de igual densidad).
+            deteccion (str): Fase amplia del motor de pasos: `'celdas'` arma la lista de celdas en cada paso; `'incremental'` la conserva entre pasos y solo reubica los discos que cambiaron de celda; `'verlet'` guarda una lista de vecinos con piel y solo la rearma cuando algún disco se movió más de media piel; `'barrido'` ordena los discos a lo largo del lado más largo de la caja y no usa cuadrícula, lo que conviene en cajas muy alargadas o gases muy diluidos; `'arbol'` usa un árbol cuaternario adaptativo, que conviene cuando los discos están muy agrupados; `'auto'` elige entre `'celdas'` y `'barrido'` según la forma de la caja y la densidad.
+            piel (float): Piel de la lista de Verlet. Si es None, el diámetro del disco más chico.
+            integrador (str): Con el motor de pasos, `'fijo'` integra con `dt`; `'adaptativo'` divide cada paso en los subpasos necesarios para que ningún disco avance más de `fraccion` de su radio por subpaso; `'subpasos'` divide el paso solo para los choques de los discos rápidos. En los dos últimos, `dt` es el intervalo entre muestras y puede ser mucho mayor.
+            fraccion (float): Avance máximo de un disco por subpaso, en radios del disco
+            max_subpasos (int): Cantidad máxima de subpasos por paso
+            dtype (type): Precisión del estado de los discos con el motor de pasos: `np.float64` o `np.float32`. En precisión simple las posiciones, velocidades, radios, masas, el historial y los cálculos de la cuadrícula ocupan la mitad de memoria; alcanza para visualizar y para histogramas, no para medir derivas muy chicas.
+            resolucion (str): Resolución de los choques del motor de pasos: `'secuencial'` resuelve los pares uno por uno, en orden; `'lote'` los reparte en rondas sin discos repetidos y resuelve cada ronda con operaciones sobre arreglos, lo que es mucho más rápido en cajas densas y no depende del orden de los pares.
+            periodico (bool): Con el motor de pasos, si es True la caja no tiene paredes: un disco que sale por un lado entra por el opuesto y los choques entre discos usan la imagen más cercana. Así una caja chica se comporta como una porción de un gas sin bordes.
 
         Example:
             >>> DiscoSimulation(500, 10, 10, 0.01, 0.5)
             
             >>> Crea una simulación con 500 discos de radio 0.01, ubicados dentro de un espacio limitado de 10x10. El paso del tiempo es de 0.5.
+
+            >>> DiscoSimulation(100, 60, 60, 1, 0.03, motor='eventos')
+
+            >>> Crea una simulación exacta dirigida por eventos, muestreada cada 0.03.
+
+            >>> DiscoSimulation(1000, 100, 100, np.random.default_rng(0).uniform(0.2, 3, 1000), 0.01)
+
+            >>> Crea una simulación con radios entre 0.2 y 3; los discos grandes son más pesados.
+
+            >>> DiscoSimulation(2000, 150, 150, 1, 0.2, integrador='subpasos')
+
+            >>> Toma una muestra cada 0.2; solo los discos que avanzan más de un cuarto de radio en ese tiempo se integran en subpasos.
+
+            >>> DiscoSimulation(400, 40, 40, 1, 0.03, periodico=True)
+
+            >>> Simula un gas sin paredes con bordes periódicos.
+
+            >>> DiscoSimulation(1000000, 3000, 3000, 1, 0.03, dtype=np.float32)
+
+            >>> Un millón de discos con el estado en precisión simple.
         """
+        if motor not in self.MOTORES:
+            raise ValueError(f"Motor desconocido: {motor!r}. Opciones: {', '.join(self.MOTORES)}")
+        if integrador not in INTEGRADORES:
+            raise ValueError(f"Integrador desconocido: {integrador!r}. Opciones: {', '.join(INTEGRADORES)}")
+        if resolucion not in RESOLUCIONES:
+            raise ValueError(f"Resolución desconocida: {resolucion!r}. Opciones: {', '.join(RESOLUCIONES)}")
+        if periodico and motor == 'eventos':
+            raise ValueError("Los bordes periódicos solo están disponibles con el motor de pasos")
+        dtype = np.dtype(dtype)
+        if dtype not in self.PRECISIONES:
+            raise ValueError(f"Precisión desconocida: {dtype}. Opciones: {', '.join(map(str, self.PRECISIONES))}")
+        if dtype != np.float64 and motor == 'eventos':
+            raise ValueError("El motor de eventos solo funciona en doble precisión")
+        for nombre in histogramas:
+            if nombre not in self.HISTOGRAMAS:
+                raise ValueError(f"Histograma desconocido: {nombre!r}. Opciones: {', '.join(self.HISTOGRAMAS)}")
+        radios = np.asarray(radio, dtype=float)
+        if radios.ndim and radios.shape != (N,):
+            raise ValueError(f"Se esperaba un radio común o {N} radios, no un arreglo de forma {radios.shape}")
         self.N = N  
         self.altura = height
         self.ancho = width
         self.radio = radio
+        self.radios = np.broadcast_to(radios, (N,)).copy()
+        self.masas = None if masas is None else np.broadcast_to(np.asarray(masas, dtype=float), (N,)).copy()
         self.pasoTemp = dt
-        self.discos = []
+        self.rng = np.random.default_rng(semilla)
+        self.motor = motor
+        self.tiempo = 0.0
+        self.paso_actual = 0
+        self.contadores = {'choques_discos': 0, 'choques_pared': 0, 'impulso_pared': 0.0}
+        self.grabador = None
+        self._eventos = None
+        self.dtype = dtype
+        self.estado = EstadoDiscos(np.empty((0, 2)), np.empty((0, 2)), np.empty(0), [], dtype=dtype)
+        self._discos = None
+        self.historial = historial
+        self._historial_x = []
+        self.bins = bins
+        self._nombres_histogramas = tuple(histogramas)
+        self.rango_rapidez = None if rango_rapidez is None else tuple(rango_rapidez)
+        self.histogramas = {}
+        self.deteccion = deteccion
+        self.piel = piel
+        self.resolucion = resolucion
+        self.resolver = RESOLUCIONES[resolucion]
+        self.periodico = periodico
+        self.caja = (width, height) if periodico else None
+        self.fase_amplia = fase_amplia_para(width, height, self.radios, deteccion, piel, periodico)
+        self.integrador = integrador
+        self.fraccion = fraccion
+        self.max_subpasos = max_subpasos
+        self.subpasos = 1
+        self.medidor = NULA
+        self.puntos_control = None
+        self.observables = None
 
-    def creacionDiscos(self):
+    @property
+    def discos(self):
+        """
+        Lista de discos de la simulación. Cada disco es una vista sobre una fila de `estado`, por lo que modificarlo modifica la simulación.
+        """
+        if self._discos is None or len(self._discos) != len(self.estado):
+            self._discos = [Disco._vista(self, i) for i in range(len(self.estado))]
+        return self._discos
+
+    def historialX(self, i):
+        """
+        Devuelve el historial de posiciones en x del disco `i`.
+
+        Args:
+            i (int): Índice del disco
+
+        Returns:
+            list: Posiciones en x del disco al final de cada paso, empezando por la posición inicial.
+        """
+        if not self.historial:
+            raise RuntimeError("El historial de posiciones está desactivado; cree la simulación con historial=True")
+        return [float(x[i]) for x in self._historial_x]
+
+    def creacionDiscos(self, metodo='rejilla'):
         """
         Intenta crear cada uno de los discos solicitados. Siempre procura que los discos no inicien superpuestos, en caso de no lograr esto, lo anuncia con un mensaje. Le asigna un color y el readio solicitado a cada disco.
+        Las posiciones se generan con una de las funciones de `Colocacion`; las velocidades y los colores se generan todos a la vez con `rng`.
+
+        Args:
+            metodo (str): `'rejilla'` (muestreo por rechazo comparando solo con las celdas vecinas), `'lotes'` (muestreo por rechazo en lotes vectorizados) o `'red'` (red hexagonal con perturbación; siempre tiene éxito hasta el empaquetamiento compacto).
 
         Example:
             >>> DiscoSimulation(100, 60, 60, 1, 0.5)
@@ -227,81 +491,376 @@ class DiscoSimulation:
             
             >>> DiscoSimulation(200, 40, 40, 1, 0.5)
             >>> Reproduce el siguiente mensaje unas cuantas veces: "Advertencia: No se pudo colocar el disco 200 después de 1000 intentos"
+
+            >>> DiscoSimulation(200, 40, 40, 1, 0.5).creacionDiscos('red')
+            >>> Coloca los 200 discos sin advertencias.
+        """
+        if metodo not in METODOS_COLOCACION:
+            raise ValueError(f"Método de colocación desconocido: {metodo!r}. Opciones: {', '.join(METODOS_COLOCACION)}")
+        radios = self.radios
+        indices, posiciones = METODOS_COLOCACION[metodo](self.N, self.ancho, self.altura, radios, self.rng)
+        if len(indices) < self.N:
+            perdidos = np.setdiff1d(np.arange(self.N), indices)
+            for i in perdidos.tolist():
+                print(f"Advertencia: No se pudo colocar el disco {i+1} con el método {metodo!r}")
+        n = len(indices)
+
+        velocidades = self.rng.uniform(-VELOCIDAD_INICIAL, VELOCIDAD_INICIAL, size=(n, 2))
+        # Asegurar velocidad mínima
+        lentos = np.all(np.abs(velocidades) < 0.5, axis=1)
+        while lentos.any():
+            velocidades[lentos] = self.rng.uniform(-VELOCIDAD_INICIAL, VELOCIDAD_INICIAL, size=(int(lentos.sum()), 2))
+            lentos = np.all(np.abs(velocidades) < 0.5, axis=1)
+        colores = self.rng.choice(['red', 'blue', 'green', 'pink', 'purple', 'orange'], size=n).tolist()
+
+        masas = None if self.masas is None else self.masas[indices]
+        self.estado = EstadoDiscos(posiciones, velocidades, radios[indices], colores, masas, self.dtype)
+        self._discos = None
+        self._eventos = None
+        self.tiempo = 0.0
+        self.paso_actual = 0
+        self.contadores = {'choques_discos': 0, 'choques_pared': 0, 'impulso_pared': 0.0}
+        self._historial_x = []
+        self._iniciarHistogramas()
+        self._registrarPaso()
+
+    def _iniciarHistogramas(self):
         """
-        Max = 1000
-        for i in range(self.N):
-            for intento in range(Max):
-                    x_pos = random.uniform(-self.ancho / 2 + self.radio, self.ancho / 2 - self.radio)
-                    y_pos = random.uniform(-self.altura / 2 + self.radio, self.altura / 2 - self.radio)
-                    color = random.choice(['red', 'blue', 'green', 'pink', 'purple', 'orange'])
-                    x_vel = random.uniform(-3, 3)
-                    y_vel = random.uniform(-3, 3)
-                    
-                    # Asegurar velocidad mínima
-                    while abs(x_vel) < 0.5 and abs(y_vel) < 0.5:
-                        x_vel = random.uniform(-3, 3)
-                        y_vel = random.uniform(-3, 3)
-
-                    disco = Disco(x_pos, y_pos, self.radio, color, x_vel, y_vel)
-                    
-                    # Verificar colisiones con discos existentes
-                    colision = False
-                    for other in self.discos:
-                        dist = np.sqrt((disco.x_pos - other.x_pos)**2 + (disco.y_pos - other.y_pos)**2)
-                        if dist < disco.radio + other.radio:
-                            colision = True
-                            break
-                    
-                    if not colision:
-                        self.discos.append(disco)
-                        break
-                    elif intento == Max - 1:
-                        print(f"Advertencia: No se pudo colocar el disco {i+1} después de {Max} intentos")
+        Crea los histogramas acumulados vacíos. Las posiciones cubren la caja; la rapidez cubre `rango_rapidez` o, si no se dio, va de 0 al doble de la rapidez máxima inicial.
+        """
+        rango_x = (-self.ancho / 2, self.ancho / 2)
+        rango_y = (-self.altura / 2, self.altura / 2)
+        rango_rapidez = self.rango_rapidez
+        if rango_rapidez is None:
+            rango_rapidez = (0, 2 * float(np.hypot(self.estado.vel[:, 0], self.estado.vel[:, 1]).max(initial=1.0)))
+        self.histogramas = {}
+        for nombre in self._nombres_histogramas:
+            if nombre == 'x':
+                self.histogramas[nombre] = HistogramaAcumulado(self.bins, rango_x)
+            elif nombre == 'y':
+                self.histogramas[nombre] = HistogramaAcumulado(self.bins, rango_y)
+            elif nombre == 'xy':
+                celdas = max(1, int(np.sqrt(self.bins)))
+                self.histogramas[nombre] = HistogramaAcumulado2D((celdas, celdas), rango_x, rango_y)
+            elif nombre == 'rapidez':
+                self.histogramas[nombre] = HistogramaAcumulado(self.bins, rango_rapidez)
+
+    def _registrarPaso(self):
+        """
+        Agrega el estado actual a los histogramas acumulados y, si están activados, al historial de posiciones y a la trayectoria grabada.
+        """
+        pos = self.estado.pos
+        if self.historial:
+            self._historial_x.append(pos[:, 0].copy())
+        if self.grabador is not None:
+            self.grabador.registrar(self.paso_actual, pos, self.estado.vel)
+        for nombre, hist in self.histogramas.items():
+            if nombre == 'x':
+                hist.agregar(pos[:, 0])
+            elif nombre == 'y':
+                hist.agregar(pos[:, 1])
+            elif nombre == 'xy':
+                hist.agregar(pos[:, 0], pos[:, 1])
+            elif nombre == 'rapidez':
+                hist.agregar(np.hypot(self.estado.vel[:, 0], self.estado.vel[:, 1]))
 
     def check_ColisionDisco(self):
         """
-        Optimiza la detección de colisiones entre discos usando hashing espacial.
-        Divide el espacio en una cuadrícula y solo verifica colisiones entre discos en celdas adyacentes.
+        Optimiza la detección de colisiones entre discos usando una lista de celdas vectorizada.
+        Divide el espacio en una cuadrícula y solo verifica colisiones entre discos en celdas adyacentes. La fase amplia (`fase_amplia`) entrega en bloque el arreglo de pares `(i, j)` que se superponen, y luego se resuelve cada choque.
         
         Example:
             >>> Con 250 discos, este método reduce significativamente el número de comparaciones.
+
+        Returns:
+            int: Cantidad de choques entre discos resueltos en el paso.
+        """
+        pares = self.fase_amplia.pares(self.estado.pos, self.estado.radios)
+        choques = self.resolver(self.estado.pos, self.estado.vel, self.estado.radios, pares, self.estado.masas, self.caja)
+        self.medidor.contar('choques_discos', choques)
+        self.medidor.marcar('resolver')
+        return choques
+
+    def moverDiscos(self):
+        """
+        Avanza todos los discos un paso de tiempo y maneja los choques con las paredes usando operaciones vectorizadas sobre `estado`.
+        Equivale a llamar `move` y `check_colisionPared` sobre cada disco, pero sin recorrerlos uno por uno. Con bordes periódicos no hay paredes: los discos que salieron de la caja se envuelven al lado opuesto.
+
+        Returns:
+            int: Cantidad de choques con las paredes en el paso.
+        """
+        self.estado.pos += self.estado.vel * self.pasoTemp
+        self.medidor.marcar('mover')
+        if self.periodico:
+            envolver(self.estado.pos, self.ancho, self.altura)
+            self.medidor.marcar('paredes')
+            return 0
+        rebotes, impulso = rebotar_paredes(self.estado.pos, self.estado.vel, self.estado.radios, self.ancho, self.altura,
+                                           self.estado.masas)
+        self.contadores['impulso_pared'] += impulso
+        self.medidor.contar('choques_pared', rebotes)
+        self.medidor.marcar('paredes')
+        return rebotes
+
+    def instrumentar(self, salida=None, formato=None, ventana=1000, cada=1):
+        """
+        Activa la medición del tiempo de cada fase del paso (mover, paredes, rejilla, pares, resolver, eventos, registro y dibujo) y de los contadores de pares candidatos, contactos, choques y celdas ocupadas.
+
+        Args:
+            salida (str): Archivo CSV o JSON por líneas donde se escribe un registro por paso. Si es None solo se guarda el resumen móvil.
+            formato (str): `'csv'` o `'json'`. Si es None se deduce de la extensión de `salida`.
+            ventana (int): Cantidad de pasos del resumen móvil
+            cada (int): Se escribe un registro cada `cada` pasos
+
+        Returns:
+            Instrumentacion: El medidor, que también queda guardado en `medidor`.
+
+        Example:
+            >>> sim.instrumentar()
+
+            >>> sim.avanzar(500)
+
+            >>> sim.medidor.resumen()
+
+            >>> Tiempo medio por fase y contadores medios de los últimos 500 pasos.
+        """
+        self.desinstrumentar()
+        self.medidor = Instrumentacion(salida, formato, ventana, cada)
+        self.fase_amplia.medidor = self.medidor
+        return self.medidor
+
+    def desinstrumentar(self):
+        """
+        Desactiva la instrumentación y cierra su archivo de salida. Devuelve el resumen móvil de los últimos pasos medidos.
+        """
+        resumen = self.medidor.resumen()
+        self.medidor.cerrar()
+        self.medidor = NULA
+        self.fase_amplia.medidor = NULA
+        return resumen
+
+    def observar(self, cada=100, salida=None, formato=None, bins=100):
+        """
+        Empieza a medir observables termodinámicos con `Observables.Observables`: presión sobre las paredes, tasa de choques, recorrido libre medio, temperatura, distancia a la distribución de Maxwell–Boltzmann y deriva de la energía y del momento. No guarda trayectorias; cada paso solo suma las rapideces a un histograma.
+
+        Args:
+            cada (int): Se emite un registro cada `cada` pasos
+            salida (str): Archivo CSV o JSON por líneas donde se escriben los registros
+            formato (str): `'csv'` o `'json'`. Si es None se deduce de la extensión de `salida`.
+            bins (int): Columnas del histograma de rapidez
+
+        Returns:
+            Observables: El objeto que acumula los observables, que también queda guardado en `observables`.
+
+        Example:
+            >>> sim.observar(cada=1000, salida='observables.csv')
+
+            >>> sim.avanzar(100000)
+
+            >>> sim.detenerObservacion()
+
+            >>> Escribe 100 registros con los promedios de cada tramo de 1000 pasos.
+        """
+        self.detenerObservacion()
+        self.observables = Observables(cada, salida, formato, bins)
+        self.observables.iniciar(self)
+        return self.observables
+
+    def detenerObservacion(self):
+        """
+        Deja de medir los observables y cierra su archivo de salida. Devuelve la lista de registros emitidos.
+        """
+        if self.observables is None:
+            return []
+        self.observables.cerrar()
+        registros = self.observables.registros
+        self.observables = None
+        return registros
+
+    def motorEventos(self):
+        """
+        Devuelve el motor de eventos de la simulación, creándolo a partir del estado actual si todavía no existe.
+
+        Returns:
+            MotorEventos: Motor que avanza los discos de choque en choque.
+        """
+        if self._eventos is None or self._eventos.estado is not self.estado:
+            self._eventos = MotorEventos(self.estado, self.ancho, self.altura)
+        return self._eventos
+
+    def grabarTrayectoria(self, directorio, cada=1, dtype=np.float32, cuadros_por_bloque=1000):
+        """
+        Empieza a grabar la trayectoria de todos los discos en disco con `Trayectorias.GrabadorTrayectoria`. El estado actual es el primer cuadro grabado.
+
+        Args:
+            directorio (str): Directorio donde se guarda la trayectoria
+            cada (int): Se graba un cuadro cada `cada` pasos
+            dtype (type): Tipo de dato de los cuadros grabados
+            cuadros_por_bloque (int): Cantidad de cuadros de cada archivo de bloque
+
+        Returns:
+            GrabadorTrayectoria: El grabador, que también queda guardado en `grabador`.
+
+        Example:
+            >>> sim.grabarTrayectoria('corrida', cada=10)
+
+            >>> sim.avanzar(100000)
+
+            >>> sim.detenerGrabacion()
+
+            >>> Graba 10001 cuadros que luego se leen con `Trayectorias.LectorTrayectoria('corrida')`.
+        """
+        self.detenerGrabacion()
+        metadatos = {
+            'N': self.N,
+            'ancho': self.ancho,
+            'altura': self.altura,
+            'dt': self.pasoTemp,
+            'motor': self.motor,
+            'colores': self.estado.colores,
+        }
+        self.grabador = GrabadorTrayectoria(directorio, self.estado.radios, cada=cada, dtype=dtype,
+                                            cuadros_por_bloque=cuadros_por_bloque, metadatos=metadatos)
+        self.grabador.registrar(self.paso_actual, self.estado.pos, self.estado.vel)
+        return self.grabador
+
+    def detenerGrabacion(self):
+        """
+        Termina la grabación de la trayectoria, si hay una en curso, y cierra sus archivos.
         """
-        tam_celda = 2 * self.radio  # tamaño ideal para hashing según busqueda en internet
-        grid = {}
-
-        # Insertar discos en celdas
-        for i, d in enumerate(self.discos):
-            celda_x = int(d.x_pos // tam_celda)
-            celda_y = int(d.y_pos // tam_celda)
-            celda = (celda_x, celda_y)
-
-            if celda not in grid:
-                grid[celda] = []
-            grid[celda].append(i)
-
-        # Celdas vecinas (como si fuera una matriz)
-        vecinos = [
-            (0, 0), (1, 0), (-1, 0),
-            (0, 1), (0, -1),
-            (1, 1), (1, -1),
-            (-1, 1), (-1, -1),
-        ]
-
-        # Detectar colisiones solo con discos cercanos
-        for celda, lista_indices in grid.items():
-            for dx, dy in vecinos:
-                celda_vecina = (celda[0] + dx, celda[1] + dy)         
-                if celda_vecina in grid:
-                    indices_vecinos = grid[celda_vecina]
-                    for i in lista_indices:
-                        for j in indices_vecinos:
-                            if i < j:  # evitar doble cálculo
-                                self.discos[i].colisionDiscos(self.discos[j])
-
-    def animarMovimiento(self):
+        if self.grabador is not None:
+            self.grabador.cerrar()
+            self.grabador = None
+
+    def guardarPuntoControl(self, ruta):
+        """
+        Guarda el estado completo de la simulación con `PuntosControl.guardar_punto`: discos, generador de números aleatorios, tiempo, paso, contadores, histogramas y, con el motor de eventos, su cola de eventos.
+
+        Args:
+            ruta (str): Archivo de destino, normalmente con extensión `.npz`
+
+        Example:
+            >>> sim.guardarPuntoControl('corrida.npz')
+
+            >>> sim = DiscoSimulation.cargarPuntoControl('corrida.npz')
+
+            >>> La simulación cargada continúa exactamente igual que la original.
+        """
+        guardar_punto(self, ruta)
+
+    @staticmethod
+    def cargarPuntoControl(ruta):
+        """
+        Crea una simulación a partir de un punto de control guardado con `guardarPuntoControl`.
+
+        Returns:
+            DiscoSimulation: La simulación, lista para seguir avanzando.
+        """
+        return cargar_punto(ruta)
+
+    def puntosControlAutomaticos(self, ruta, cada_pasos=None, cada_segundos=None):
+        """
+        Guarda un punto de control durante `avanzar` cada `cada_pasos` pasos o cada `cada_segundos` segundos, lo que ocurra primero. Con `ruta=None` se desactivan.
+
+        Args:
+            ruta (str): Archivo de destino. Puede contener `{paso}`, por ejemplo `'punto_{paso}.npz'`, para conservar todos los puntos de control.
+            cada_pasos (int): Pasos entre puntos de control
+            cada_segundos (float): Segundos de reloj entre puntos de control
+
+        Returns:
+            PuntosAutomaticos: El objeto que decide cuándo guardar, que también queda guardado en `puntos_control`.
+
+        Example:
+            >>> sim.puntosControlAutomaticos('corrida.npz', cada_segundos=600)
+
+            >>> sim.avanzar(10**7)
+
+            >>> Sobrescribe corrida.npz cada 10 minutos; si el proceso se corta, se reanuda desde ahí.
+        """
+        self.puntos_control = None if ruta is None else PuntosAutomaticos(ruta, cada_pasos, cada_segundos, self.paso_actual)
+        return self.puntos_control
+
+    def avanzar(self, pasos=1):
+        """
+        Avanza la simulación sin dibujarla. En cada paso mueve los discos, maneja los choques con las paredes y entre discos, y suma el estado a los histogramas acumulados. La cantidad de choques se acumula en `contadores`.
+        Con el motor de eventos, cada paso procesa todos los choques exactos que ocurren durante `pasoTemp` y guarda el estado al final del intervalo. Con los integradores `'adaptativo'` y `'subpasos'`, cada paso se divide en subpasos según la rapidez de los discos; `subpasos` guarda cuántos usó el último paso.
+
+        Args:
+            pasos (int): Cantidad de pasos de tiempo a simular.
+
+        Example:
+            >>> sim.avanzar(1000)
+
+            >>> Simula 1000 pasos de tiempo sin abrir ninguna ventana.
+        """
+        medidor = self.medidor
+        for _ in range(pasos):
+            medidor.iniciarPaso(self.paso_actual + 1)
+            if self.motor == 'eventos':
+                eventos = self.motorEventos()
+                discos_antes, pared_antes, impulso_antes = eventos.choques_discos, eventos.choques_pared, eventos.impulso_pared
+                eventos.avanzarHasta(eventos.t + self.pasoTemp)
+                self.contadores['choques_pared'] += eventos.choques_pared - pared_antes
+                self.contadores['impulso_pared'] += eventos.impulso_pared - impulso_antes
+                self.contadores['choques_discos'] += eventos.choques_discos - discos_antes
+                medidor.contar('choques_pared', eventos.choques_pared - pared_antes)
+                medidor.contar('choques_discos', eventos.choques_discos - discos_antes)
+                medidor.marcar('eventos')
+            elif self.integrador == 'fijo':
+                self.contadores['choques_pared'] += self.moverDiscos()
+                self.contadores['choques_discos'] += self.check_ColisionDisco()
+            else:
+                paso = paso_adaptativo if self.integrador == 'adaptativo' else paso_subpasos
+                rebotes, impulso, choques, self.subpasos = paso(self.estado, self.pasoTemp, self.ancho, self.altura,
+                                                                self.fase_amplia, self.fraccion, self.max_subpasos, medidor,
+                                                                self.periodico, self.resolver)
+                self.contadores['choques_pared'] += rebotes
+                self.contadores['impulso_pared'] += impulso
+                self.contadores['choques_discos'] += choques
+            self.tiempo += self.pasoTemp
+            self.paso_actual += 1
+            self._registrarPaso()
+            if self.observables is not None:
+                self.observables.registrar(self)
+            medidor.marcar('registro')
+            if self.puntos_control is not None:
+                self.puntos_control.revisar(self)
+
+    RENDERIZADOS = ('coleccion', 'parches')
+
+    def animarMovimiento(self, modo='coleccion', subpasos=1, cuadros=500, intervalo=10, separado=False):
         """
         Anima la simulación. Calcula las posiciones de los discos. Maneja las colisiones usando optimización de hashing espacial.
+        Con `modo='coleccion'` todos los discos se dibujan como una sola `EllipseCollection` y cada cuadro solo reemplaza su arreglo de posiciones, en lugar de mover un `patches.Circle` por disco (`modo='parches'`). Así se pueden ver decenas de miles de discos con fluidez.
+
+        Args:
+            modo (str): `'coleccion'` o `'parches'`
+            subpasos (int): Pasos de la simulación que se calculan por cada cuadro dibujado
+            cuadros (int): Cuadros de la animación antes de repetirse
+            intervalo (float): Milisegundos entre cuadros
+            separado (bool): Si es True, la física corre en otro proceso con `Monitor.FisicaEnProceso`, tan rápido como puede, y la ventana dibuja el último cuadro publicado en memoria compartida, saltando los que no alcanza a dibujar; `subpasos` es entonces la cantidad de pasos entre cuadros publicados. La animación dura hasta que se cierra la ventana, y al cerrarla la simulación queda en el estado al que llegó la física. Solo se dibuja con `modo='coleccion'`.
+
+        Returns:
+            FuncAnimation: La animación, para poder guardarla o seguir usándola después de `plt.show()`. Con `separado=True`, un diccionario con los cuadros dibujados, saltados y descartados.
+
+        Example:
+            >>> sim.animarMovimiento(subpasos=10)
+
+            >>> Dibuja un cuadro cada 10 pasos de tiempo.
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.animation as animation
+
+        if modo not in self.RENDERIZADOS:
+            raise ValueError(f"Modo desconocido: {modo!r}. Opciones: {', '.join(self.RENDERIZADOS)}")
+        if subpasos < 1:
+            raise ValueError("subpasos debe ser al menos 1")
+        if separado:
+            from Monitor import FisicaEnProceso, mirar
+
+            with FisicaEnProceso(self, subpasos) as fisica:
+                return mirar(fisica.anillo, intervalo, f'Colisión de discos en 2D optimizado\n{self.N} discos')
+
         fig, ax = plt.subplots()
         ax.set_xlim(-self.ancho / 2, self.ancho / 2)
         ax.set_ylim(-self.altura / 2, self.altura / 2)
@@ -310,46 +869,62 @@ class DiscoSimulation:
         ax.set_xlabel('X')
         ax.set_ylabel('Y')
 
-        patches_list = []
-        for disco in self.discos:
-            circle = patches.Circle((disco.x_pos, disco.y_pos), radius=disco.radio, color=disco.color, alpha=0.7)
-            ax.add_patch(circle)
-            patches_list.append(circle)
+        if modo == 'coleccion':
+            from matplotlib.collections import EllipseCollection
+
+            diametros = 2 * self.estado.radios
+            coleccion = EllipseCollection(diametros, diametros, np.zeros(len(diametros)), units='xy',
+                                          offsets=self.estado.pos, offset_transform=ax.transData,
+                                          facecolors=self.estado.colores, alpha=0.7)
+            ax.add_collection(coleccion)
+            artistas = [coleccion]
+
+            def dibujar():
+                coleccion.set_offsets(self.estado.pos)
+        else:
+            import matplotlib.patches as patches
+
+            artistas = []
+            for (x_pos, y_pos), radio, color in zip(self.estado.pos, self.estado.radios, self.estado.colores):
+                circle = patches.Circle((x_pos, y_pos), radius=radio, color=color, alpha=0.7)
+                ax.add_patch(circle)
+                artistas.append(circle)
+
+            def dibujar():
+                for circle, centro in zip(artistas, self.estado.pos.tolist()):
+                    circle.center = centro
 
         def init():
             """
             Inicializa la posición inicial de los discos.
             """
-            return patches_list
+            return artistas
         
         def animar(i):
             """
-            Calcula y renderiza cada uno de los frames. Actualiza la posición de los discos, comprueba si existen choques y llama a las funciones pertinentes en cada caso. Finalmente dibuja las posiciones actualizadas de cada disco.
+            Calcula y renderiza cada uno de los frames. Avanza `subpasos` pasos de la simulación, con sus choques, y dibuja las posiciones actualizadas de los discos.
             """
-            # Mover todos los discos
-            for disco in self.discos:
-                disco.move(self.pasoTemp)
-                disco.check_colisionPared(self.ancho, self.altura)
-
-            # Verificar colisiones entre discos usando optimización
-            self.check_ColisionDisco()
+            # Mover todos los discos y verificar colisiones usando optimización
+            self.avanzar(subpasos)
 
             # Actualizar posiciones visuales
-            for idx, disco in enumerate(self.discos):
-                patches_list[idx].center = (disco.x_pos, disco.y_pos)
+            dibujar()
+            self.medidor.marcar('dibujo')
 
-            return patches_list
+            return artistas
 
-        ani = animation.FuncAnimation(fig, animar, init_func=init, frames=500, interval=10, blit=True, repeat=True)
+        ani = animation.FuncAnimation(fig, animar, init_func=init, frames=cuadros, interval=intervalo, blit=True, repeat=True)
         plt.show()
+        return ani
 
 
     def histograma(self, bins = 50):
         """
         Dibuja el histograma correspondiente a las posiciones en x de todos los discos.
+        Se dibuja a partir del histograma acumulado `histogramas['x']`, sin copiar posiciones; si la simulación guarda el historial completo, se usa el historial.
         
         Args:
-            bins (int): Cantidad de columnas del histograma.
+            bins (int): Cantidad de columnas del histograma. Sin historial debe dividir a `self.bins`.
 
         Example:
             >>> Teniendo una instancia sim de DiscoSimulation
@@ -357,13 +932,17 @@ class DiscoSimulation:
             >>> sim.histograma(100) 
             >>> Dibuja el histograma con 100 columnas.
         """
-        posiciones_x = []
-
-        for disco in self.discos:
-            posiciones_x.extend(disco.x_poss)
+        import matplotlib.pyplot as plt
 
         plt.figure(figsize=(10, 6))
-        plt.hist(posiciones_x, bins=bins, density=True, alpha=0.7, color='red', edgecolor='black')
+        if self.historial:
+            posiciones_x = np.concatenate(self._historial_x) if self._historial_x else []
+            plt.hist(posiciones_x, bins=bins, density=True, alpha=0.7, color='red', edgecolor='black')
+        else:
+            if 'x' not in self.histogramas:
+                raise RuntimeError("La simulación no acumula el histograma 'x'")
+            hist = self.histogramas['x'].reagrupar(bins)
+            plt.hist(hist.bordes[:-1], bins=hist.bordes, weights=hist.conteos, density=True, alpha=0.7, color='red', edgecolor='black')
         
         plt.xlabel('Posición en el eje X')
         plt.ylabel('Frecuencia')
@@ -373,7 +952,214 @@ class DiscoSimulation:
         plt.show() 
 
 
-sim = DiscoSimulation(250, 60, 60, 1, 0.03)
-sim.creacionDiscos()
-sim.animarMovimiento()
-sim.histograma(500)
\ No newline at end of file
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos. Sin argumentos reproduce la simulación de ejemplo con 250 discos. Los subcomandos son:
+
+    - `run`: corre una simulación con los parámetros indicados, con animación o sin abrir ventanas (`--headless`).
+    - `ensemble`: corre varias réplicas con semillas distintas en paralelo y guarda la media y la banda de confianza de los histogramas.
+    - `export`: dibuja cuadros PNG o NPZ con el backend Agg, de una trayectoria grabada o de una simulación nueva, en varios procesos.
+
+    Args:
+        argv (list): Argumentos de la línea de comandos. Si es None se usan los de `sys.argv`.
+
+    Example:
+        >>> python -m Discos_optimizado run --n 5000 --steps 100000 --headless
+
+        >>> Simula 5000 discos durante 100000 pasos sin importar matplotlib e imprime un resumen.
+
+        >>> python -m Discos_optimizado run --reanudar corrida.npz --steps 100000 --headless --punto-control corrida.npz --control-segundos 600
+
+        >>> Continúa la corrida guardada y vuelve a guardarla cada 10 minutos y al terminar.
+
+        >>> python -m Discos_optimizado run --n 20000 --steps 1000000 --headless --publicar discos --subpasos 10
+
+        >>> Publica un cuadro cada 10 pasos; `python -m Monitor discos` abre un visor que se puede cerrar y volver a abrir sin detener la simulación.
+
+        >>> python -m Discos_optimizado ensemble --replicas 64 --steps 5000 --salida ensamble.json
+
+        >>> Corre 64 réplicas en todos los núcleos y guarda los resultados agregados.
+
+        >>> python -m Discos_optimizado export --desde corrida --cada 10 --salida cuadros
+
+        >>> Dibuja uno de cada 10 cuadros de la trayectoria grabada en corrida, sin abrir ventanas.
+    """
+    import argparse
+    import json
+    import time
+
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument('--n', type=int, default=250, help='Número de discos')
+    comunes.add_argument('--altura', type=float, default=60, help='Altura del espacio limitado')
+    comunes.add_argument('--ancho', type=float, default=60, help='Ancho del espacio limitado')
+    comunes.add_argument('--radio', type=float, default=1, help='Radio de los discos')
+    comunes.add_argument('--dt', type=float, default=0.03, help='Paso del tiempo')
+    comunes.add_argument('--motor', choices=DiscoSimulation.MOTORES, default='pasos', help='Motor de la simulación')
+    comunes.add_argument('--colocacion', choices=tuple(METODOS_COLOCACION), default='rejilla', help='Método de colocación inicial de los discos')
+    comunes.add_argument('--semilla', type=int, default=None, help='Semilla del generador de números aleatorios')
+    comunes.add_argument('--steps', type=int, default=500, help='Pasos a simular sin animación')
+    comunes.add_argument('--deteccion', choices=DETECCIONES, default='celdas', help='Fase amplia de la detección de choques')
+    comunes.add_argument('--piel', type=float, default=None, help='Piel de la lista de Verlet')
+    comunes.add_argument('--integrador', choices=INTEGRADORES, default='fijo', help='Integración del motor de pasos')
+    comunes.add_argument('--fraccion', type=float, default=0.25, help='Avance máximo por subpaso, en radios del disco')
+    comunes.add_argument('--periodico', action='store_true', help='Bordes periódicos en lugar de paredes (motor de pasos)')
+    comunes.add_argument('--precision', choices=('float64', 'float32'), default='float64', help='Precisión del estado de los discos (motor de pasos)')
+    comunes.add_argument('--resolucion', choices=tuple(RESOLUCIONES), default='secuencial', help='Resolución de los choques: par por par o por rondas vectorizadas')
+    comunes.add_argument('--bins', type=int, default=500, help='Columnas del histograma')
+
+    parser = argparse.ArgumentParser(prog='python -m Discos_optimizado', description='Simulación de colisiones de discos en un espacio limitado.')
+    subparsers = parser.add_subparsers(dest='comando')
+    run = subparsers.add_parser('run', parents=[comunes], help='Corre una simulación con los parámetros indicados.')
+    run.add_argument('--headless', action='store_true', help='Simula sin animación ni gráficos (no importa matplotlib)')
+    run.add_argument('--trayectoria', metavar='DIRECTORIO', help='Graba la trayectoria en este directorio')
+    run.add_argument('--cada', type=int, default=1, help='Graba un cuadro de la trayectoria cada tantos pasos')
+    run.add_argument('--instrumentar', metavar='ARCHIVO', nargs='?', const='', default=None, help='Mide el tiempo de cada fase; con ARCHIVO (.csv o .jsonl) escribe un registro por paso')
+    run.add_argument('--observables', metavar='ARCHIVO', nargs='?', const='', default=None, help='Mide presión, tasa de choques, recorrido libre, temperatura y derivas; con ARCHIVO (.csv o .jsonl) escribe cada registro')
+    run.add_argument('--cada-observables', type=int, default=100, help='Pasos entre registros de observables')
+    run.add_argument('--render', choices=DiscoSimulation.RENDERIZADOS, default='coleccion', help='Forma de dibujar los discos en la animación')
+    run.add_argument('--subpasos', type=int, default=1, help='Pasos de la simulación por cuadro de la animación')
+    run.add_argument('--punto-control', metavar='ARCHIVO', help='Guarda puntos de control en este archivo (puede contener {paso}) y uno al terminar')
+    run.add_argument('--control-pasos', type=int, default=None, help='Pasos entre puntos de control automáticos')
+    run.add_argument('--control-segundos', type=float, default=None, help='Segundos entre puntos de control automáticos')
+    run.add_argument('--reanudar', metavar='ARCHIVO', help='Continúa la simulación guardada en este punto de control en lugar de crear una nueva')
+    run.add_argument('--franjas', type=int, default=None, help='Reparte la caja en tantas franjas, una por proceso (solo con --headless)')
+    run.add_argument('--separado', action='store_true', help='Corre la física en otro proceso y dibuja desde memoria compartida, saltando cuadros si hace falta')
+    run.add_argument('--publicar', metavar='NOMBRE', help='Publica un cuadro cada --subpasos pasos en memoria compartida, para mirarlo con python -m Monitor NOMBRE (solo con --headless)')
+    ensemble = subparsers.add_parser('ensemble', parents=[comunes], help='Corre réplicas independientes en paralelo y agrega sus histogramas.')
+    ensemble.add_argument('--replicas', type=int, default=8, help='Cantidad de réplicas')
+    ensemble.add_argument('--procesos', type=int, default=None, help='Procesos trabajadores (por defecto, todos los núcleos)')
+    ensemble.add_argument('--confianza', type=float, default=0.95, help='Nivel de confianza de las bandas')
+    ensemble.add_argument('--salida', metavar='ARCHIVO', help='Guarda el resumen del ensamble en este archivo JSON')
+    export = subparsers.add_parser('export', parents=[comunes], help='Dibuja cuadros PNG o NPZ sin interfaz gráfica, de una trayectoria grabada o de una simulación nueva.')
+    export.add_argument('--desde', metavar='DIRECTORIO', help='Trayectoria grabada de la que se toman los cuadros; sin esta opción se simulan --steps pasos')
+    export.add_argument('--salida', metavar='DIRECTORIO', default='cuadros', help='Directorio donde se guardan los cuadros')
+    export.add_argument('--formato', choices=('png', 'npz'), default='png', help='Formato de los cuadros')
+    export.add_argument('--cada', type=int, default=1, help='Exporta un cuadro cada tantos cuadros (o pasos)')
+    export.add_argument('--procesos', type=int, default=None, help='Procesos que dibujan (por defecto, todos los núcleos)')
+    export.add_argument('--dpi', type=int, default=100, help='Resolución de los cuadros')
+    args = parser.parse_args(argv)
+    if getattr(args, 'franjas', None):
+        if not args.headless:
+            parser.error("--franjas solo funciona con --headless")
+        incompatibles = [opcion for opcion, activa in (('--trayectoria', args.trayectoria), ('--observables', args.observables is not None),
+                                                        ('--instrumentar', args.instrumentar is not None),
+                                                        ('--control-pasos/--control-segundos', args.control_pasos or args.control_segundos),
+                                                        ('--publicar', args.publicar), ('--periodico', args.periodico),
+                                                        ('--deteccion ' + args.deteccion, args.deteccion != 'celdas'),
+                                                        ('--integrador ' + args.integrador, args.integrador != 'fijo'),
+                                                        ('--motor ' + args.motor, args.motor != 'pasos')) if activa]
+        if incompatibles:
+            parser.error(f"--franjas no admite {', '.join(incompatibles)}")
+
+    if args.comando is None:
+        sim = DiscoSimulation(250, 60, 60, 1, 0.03)
+        sim.creacionDiscos()
+        sim.animarMovimiento()
+        sim.histograma(500)
+        return
+
+    if args.comando == 'ensemble':
+        from Ensamble import ejecutar_ensamble
+
+        parametros = {'N': args.n, 'height': args.altura, 'width': args.ancho, 'radio': args.radio,
+                      'dt': args.dt, 'motor': args.motor, 'bins': args.bins, 'deteccion': args.deteccion, 'piel': args.piel,
+                      'integrador': args.integrador, 'fraccion': args.fraccion, 'periodico': args.periodico,
+                      'dtype': args.precision, 'resolucion': args.resolucion}
+        inicio = time.perf_counter()
+        resultado = ejecutar_ensamble(parametros, replicas=args.replicas, pasos=args.steps, semilla=args.semilla,
+                                      procesos=args.procesos, metodo=args.colocacion)
+        duracion = time.perf_counter() - inicio
+        print(f"{len(resultado)} réplicas de {args.steps} pasos en {duracion:.2f} s")
+        for clave, (media, desviacion) in resultado.contadores().items():
+            print(f"  {clave}: {media:.1f} ± {desviacion:.1f}")
+        if args.salida:
+            with open(args.salida, 'w') as archivo:
+                json.dump(resultado.resumen(args.confianza), archivo)
+        return
+
+    if args.comando == 'export':
+        from Exportacion import exportar_simulacion, exportar_trayectoria
+
+        inicio = time.perf_counter()
+        if args.desde:
+            rutas = exportar_trayectoria(args.desde, args.salida, args.formato, cada=args.cada,
+                                         procesos=args.procesos, dpi=args.dpi)
+        else:
+            sim = DiscoSimulation(args.n, args.altura, args.ancho, args.radio, args.dt, motor=args.motor, semilla=args.semilla,
+                                  deteccion=args.deteccion, piel=args.piel, integrador=args.integrador, fraccion=args.fraccion,
+                                  periodico=args.periodico, dtype=args.precision, resolucion=args.resolucion)
+            sim.creacionDiscos(args.colocacion)
+            rutas = exportar_simulacion(sim, args.salida, args.steps, args.formato, cada=args.cada,
+                                        procesos=args.procesos, dpi=args.dpi)
+        duracion = time.perf_counter() - inicio
+        print(f"{len(rutas)} cuadros en {args.salida} en {duracion:.2f} s")
+        return
+
+    if args.reanudar:
+        sim = DiscoSimulation.cargarPuntoControl(args.reanudar)
+    else:
+        sim = DiscoSimulation(args.n, args.altura, args.ancho, args.radio, args.dt, motor=args.motor, semilla=args.semilla,
+                              deteccion=args.deteccion, piel=args.piel, integrador=args.integrador, fraccion=args.fraccion,
+                              periodico=args.periodico, dtype=args.precision, resolucion=args.resolucion)
+        sim.creacionDiscos(args.colocacion)
+    if args.punto_control and (args.control_pasos or args.control_segundos):
+        sim.puntosControlAutomaticos(args.punto_control, args.control_pasos, args.control_segundos)
+    if args.trayectoria:
+        sim.grabarTrayectoria(args.trayectoria, cada=args.cada)
+    if args.instrumentar is not None:
+        sim.instrumentar(args.instrumentar or None)
+    if args.observables is not None:
+        sim.observar(args.cada_observables, args.observables or None)
+    if args.headless and args.franjas:
+        from Dominios import SimulacionParalela
+
+        inicio = time.perf_counter()
+        with SimulacionParalela(sim, args.franjas) as paralela:
+            paralela.avanzar(args.steps)
+        duracion = time.perf_counter() - inicio
+        print(f"{len(sim.estado)} discos en {args.franjas} franjas, {args.steps} pasos en {duracion:.2f} s ({args.steps / duracion:.1f} pasos/s)")
+    elif args.headless and args.publicar:
+        from Monitor import AnilloCuadros
+
+        inicio = time.perf_counter()
+        with AnilloCuadros.para(sim, nombre=args.publicar) as anillo:
+            restantes = args.steps
+            while restantes > 0:
+                sim.avanzar(min(args.subpasos, restantes))
+                anillo.publicar(sim)
+                restantes -= args.subpasos
+            publicados = anillo.escritos
+        duracion = time.perf_counter() - inicio
+        print(f"{len(sim.estado)} discos, {args.steps} pasos en {duracion:.2f} s ({args.steps / duracion:.1f} pasos/s), {publicados} cuadros publicados")
+    elif args.headless:
+        inicio = time.perf_counter()
+        sim.avanzar(args.steps)
+        duracion = time.perf_counter() - inicio
+        print(f"{len(sim.estado)} discos, {args.steps} pasos en {duracion:.2f} s ({args.steps / duracion:.1f} pasos/s)")
+    else:
+        sim.animarMovimiento(args.render, args.subpasos, separado=args.separado)
+        sim.histograma(args.bins)
+    sim.detenerGrabacion()
+    if args.punto_control:
+        sim.guardarPuntoControl(args.punto_control.format(paso=sim.paso_actual))
+    if args.observables is not None:
+        registros = sim.detenerObservacion()
+        if registros:
+            ultimo = registros[-1]
+            print(f"Observables en el paso {ultimo['paso']}: kT = {ultimo['temperatura']:.4g}, P = {ultimo['presion']:.4g}, "
+                  f"Z = {ultimo['compresibilidad']:.3f}, choques por disco = {ultimo['tasa_choques']:.4g}/t, "
+                  f"recorrido libre = {ultimo['recorrido_libre']:.4g}, distancia a Maxwell–Boltzmann = {ultimo['distancia_mb']:.3f}, "
+                  f"deriva de la energía = {ultimo['deriva_energia']:.2e}")
+    if args.instrumentar is not None:
+        resumen = sim.desinstrumentar()
+        if resumen['pasos']:
+            print(f"Tiempo por paso: {resumen['segundos_por_paso'] * 1e3:.3f} ms en {resumen['pasos']} pasos")
+            for fase, valores in resumen['fases'].items():
+                if valores['media']:
+                    print(f"  {fase:>9}: {valores['media'] * 1e3:8.3f} ms ({valores['fraccion']:.1%})")
+            for nombre, media in resumen['contadores'].items():
+                print(f"  {nombre:>16}: {media:.1f} por paso")
+
+
+if __name__ == "__main__":
+    main()
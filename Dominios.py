@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""Descomposición de dominio en memoria compartida para simular un solo sistema muy grande. El módulo contiene la siguiente clase:
+
+- `SimulacionParalela` - Divide la caja de una `DiscoSimulation` en franjas verticales, cada una a cargo de un proceso.
+
+El estado de los discos vive en arreglos de `multiprocessing.shared_memory`, de modo que ningún proceso copia las posiciones de los demás. Cada proceso mueve sus discos, entrega a las franjas vecinas los discos que cruzaron el borde (migración) y recibe de la franja de la derecha los discos cercanos al borde (celdas fantasma). Los choques entre franjas vecinas se resuelven en dos fases, primero las franjas pares y luego las impares, así dos procesos nunca modifican el mismo disco al mismo tiempo.
+"""
+
+import multiprocessing as mp
+import os
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from Colisiones import RESOLUCIONES, fase_amplia_para, holgura_separacion, rebotar_paredes
+from Histogramas import HistogramaAcumulado, HistogramaAcumulado2D
+from Instrumentacion import NULA
+
+_VACIO = np.empty(0, dtype=np.int64)
+
+
+def _franja_de(x, ancho, franjas):
+    """
+    Devuelve la franja a la que pertenece cada posición en x.
+    """
+    ancho_franja = ancho / franjas
+    return np.clip(np.floor((x + ancho / 2) / ancho_franja).astype(np.int64), 0, franjas - 1)
+
+
+def _intercambiar(k, izquierda, derecha, hacia_izquierda, hacia_derecha):
+    """
+    Envía un arreglo de índices a cada franja vecina y recibe los suyos. Las franjas pares envían primero y las impares reciben primero, para que ningún par de procesos quede esperando al otro.
+    """
+    de_izquierda = de_derecha = _VACIO
+    if k % 2 == 0:
+        if izquierda is not None:
+            izquierda.send(hacia_izquierda)
+        if derecha is not None:
+            derecha.send(hacia_derecha)
+    if izquierda is not None:
+        de_izquierda = izquierda.recv()
+    if derecha is not None:
+        de_derecha = derecha.recv()
+    if k % 2 == 1:
+        if izquierda is not None:
+            izquierda.send(hacia_izquierda)
+        if derecha is not None:
+            derecha.send(hacia_derecha)
+    return de_izquierda, de_derecha
+
+
+def _crear_histogramas(especificaciones):
+    histogramas = {}
+    for nombre, (tipo, argumentos) in especificaciones.items():
+        histogramas[nombre] = HistogramaAcumulado2D(*argumentos) if tipo == '2d' else HistogramaAcumulado(*argumentos)
+    return histogramas
+
+
+def _trabajador(k, franjas, nombres, n, dtype, resolucion, iguales, holgura, propios, ancho, altura, dt, especificaciones, padre,
+                izquierda, derecha, barrera):
+    """
+    Ciclo principal de un proceso trabajador: espera órdenes del proceso padre y simula los pasos pedidos sobre los discos de su franja.
+    """
+    memorias = [SharedMemory(name=nombre) for nombre in nombres]
+    pos = np.ndarray((n, 2), dtype=dtype, buffer=memorias[0].buf)
+    vel = np.ndarray((n, 2), dtype=dtype, buffer=memorias[1].buf)
+    radios = np.ndarray((n,), dtype=dtype, buffer=memorias[2].buf)
+    masas = np.ndarray((n,), dtype=dtype, buffer=memorias[3].buf)
+    resolver = RESOLUCIONES[resolucion]
+
+    ancho_franja = ancho / franjas
+    x0 = -ancho / 2 + k * ancho_franja
+    banda = 2 * float(radios.max(initial=0))
+    # La rejilla cubre la franja más la banda fantasma de la derecha
+    centro = x0 + (ancho_franja + banda) / 2
+    rejilla = fase_amplia_para(ancho_franja + banda, altura, radios)
+    histogramas = _crear_histogramas(especificaciones)
+
+    try:
+        while True:
+            orden, argumento = padre.recv()
+            if orden == 'cerrar':
+                break
+            contadores = {'choques_discos': 0, 'choques_pared': 0, 'impulso_pared': 0.0}
+            for _ in range(argumento):
+                # Mover los discos propios y rebotar en las paredes
+                p = pos[propios]
+                v = vel[propios]
+                p += v * dt
+                rebotes, impulso = rebotar_paredes(p, v, radios[propios], ancho, altura, masas[propios])
+                contadores['choques_pared'] += rebotes
+                contadores['impulso_pared'] += impulso
+                pos[propios] = p
+                vel[propios] = v
+
+                # Migración de los discos que cruzaron a otra franja
+                franja = _franja_de(p[:, 0], ancho, franjas)
+                de_izquierda, de_derecha = _intercambiar(k, izquierda, derecha, propios[franja < k], propios[franja > k])
+                propios = np.concatenate((propios[franja == k], de_izquierda, de_derecha))
+
+                # Celdas fantasma: discos de la franja derecha que pueden tocar a los propios
+                cerca = propios[pos[propios, 0] < x0 + banda]
+                _, fantasmas = _intercambiar(k, izquierda, derecha, cerca, _VACIO)
+
+                # Choques en dos fases para no modificar el mismo disco desde dos procesos
+                for fase in (0, 1):
+                    if k % 2 == fase:
+                        locales = np.concatenate((propios, fantasmas))
+                        p_local = pos[locales] - (centro, 0.0)
+                        pares = rejilla.pares(p_local, radios[locales])
+                        pares = pares[pares[:, 0] < len(propios)]
+                        contadores['choques_discos'] += resolver(pos, vel, radios, locales[pares], masas,
+                                                                 iguales=iguales, holgura=holgura)
+                    barrera.wait()
+
+                for nombre, hist in histogramas.items():
+                    if nombre == 'x':
+                        hist.agregar(pos[propios, 0])
+                    elif nombre == 'y':
+                        hist.agregar(pos[propios, 1])
+                    elif nombre == 'xy':
+                        hist.agregar(pos[propios, 0], pos[propios, 1])
+                    elif nombre == 'rapidez':
+                        hist.agregar(np.hypot(vel[propios, 0], vel[propios, 1]))
+
+            padre.send((contadores, {nombre: (hist.conteos, hist.fuera) for nombre, hist in histogramas.items()}, len(propios)))
+            histogramas = _crear_histogramas(especificaciones)
+    finally:
+        del pos, vel, radios, masas
+        for memoria in memorias:
+            memoria.close()
+
+
+class SimulacionParalela:
+    """
+    Clase utilizada para simular una `DiscoSimulation` muy grande repartida entre varios procesos.
+
+    Mientras está abierta, los arreglos de `sim.estado` son vistas sobre la memoria compartida que usan los procesos, por lo que el padre puede leer el estado (por ejemplo, para dibujarlo) entre llamadas a `avanzar`. Los histogramas acumulados por cada franja se suman a `sim.histogramas` al terminar cada llamada.
+    Los resultados son estadísticamente equivalentes a los del motor serie, pero no idénticos: los choques de cada paso se resuelven por franjas, en otro orden.
+    """
+
+    def __init__(self, sim, franjas=None):
+        """
+        Copia el estado de la simulación a memoria compartida y arranca un proceso por franja.
+
+        Args:
+            sim (DiscoSimulation): Simulación con los discos ya creados, con el motor de pasos, la lista de celdas y el integrador de paso fijo, sin grabación, observables, instrumentación, puntos de control automáticos ni historial activos
+            franjas (int): Cantidad de franjas (y de procesos). Si es None se usan todos los núcleos, siempre que cada franja mida al menos dos diámetros.
+
+        Example:
+            >>> with SimulacionParalela(sim, franjas=8) as paralela:
+            >>>     paralela.avanzar(10000)
+
+            >>> Simula 10000 pasos repartiendo la caja en 8 franjas.
+        """
+        if sim.motor != 'pasos':
+            raise ValueError("La simulación paralela solo admite el motor de pasos")
+        if sim.periodico:
+            raise ValueError("La simulación paralela no admite bordes periódicos")
+        if sim.deteccion != 'celdas':
+            raise ValueError("La simulación paralela usa su propia lista de celdas por franja; no admite otra detección")
+        if sim.integrador != 'fijo':
+            raise ValueError("La simulación paralela solo admite el integrador de paso fijo")
+        activos = [nombre for nombre, activo in (('la grabación de la trayectoria', sim.grabador is not None),
+                                                 ('los observables', sim.observables is not None),
+                                                 ('la instrumentación', sim.medidor is not NULA),
+                                                 ('los puntos de control automáticos', sim.puntos_control is not None),
+                                                 ('el historial', sim.historial)) if activo]
+        if activos:
+            raise ValueError(f"La simulación paralela no alimenta {', '.join(activos)}; desactívelos antes de repartir la caja")
+        diametro = 2 * float(sim.estado.radios.max(initial=0))
+        maximo = max(1, int(sim.ancho // (2 * diametro))) if diametro else os.cpu_count()
+        if franjas is None:
+            franjas = min(os.cpu_count() or 1, maximo)
+        if franjas > maximo:
+            raise ValueError(f"Con un ancho de {sim.ancho} caben a lo sumo {maximo} franjas de dos diámetros")
+
+        self.sim = sim
+        self.franjas = franjas
+        n = len(sim.estado)
+        self._memorias = []
+        vistas = []
+        for arreglo in (sim.estado.pos, sim.estado.vel, sim.estado.radios, sim.estado.masas):
+            memoria = SharedMemory(create=True, size=max(arreglo.nbytes, 1))
+            vista = np.ndarray(arreglo.shape, dtype=arreglo.dtype, buffer=memoria.buf)
+            vista[...] = arreglo
+            self._memorias.append(memoria)
+            vistas.append(vista)
+        sim.estado.pos, sim.estado.vel, sim.estado.radios, sim.estado.masas = vistas
+
+        especificaciones = {}
+        for nombre, hist in sim.histogramas.items():
+            if isinstance(hist, HistogramaAcumulado2D):
+                especificaciones[nombre] = ('2d', (hist.bins, hist.rango_x, hist.rango_y))
+            else:
+                especificaciones[nombre] = ('1d', (hist.bins, hist.rango))
+
+        contexto = mp.get_context()
+        barrera = contexto.Barrier(franjas)
+        vecinos = [contexto.Pipe() for _ in range(franjas - 1)]
+        self._conexiones = []
+        self._procesos = []
+        nombres = [memoria.name for memoria in self._memorias]
+        # El reparto inicial se decide aquí: un proceso que arranca tarde podría ver discos ya movidos por sus vecinos
+        franja = _franja_de(sim.estado.pos[:, 0], sim.ancho, franjas)
+        # Las masas no cambian y las posiciones no salen de la caja: ambos datos se calculan una vez y no se vuelven
+        # a recorrer los arreglos completos, que además otras franjas están escribiendo
+        masas = sim.estado.masas
+        iguales = not len(masas) or bool(masas.min() == masas.max())
+        holgura = holgura_separacion(sim.estado.pos.dtype, max(sim.ancho, sim.altura) / 2)
+        for k in range(franjas):
+            padre, hijo = contexto.Pipe()
+            izquierda = vecinos[k - 1][1] if k > 0 else None
+            derecha = vecinos[k][0] if k < franjas - 1 else None
+            proceso = contexto.Process(target=_trabajador, daemon=True,
+                                       args=(k, franjas, nombres, n, sim.estado.pos.dtype, sim.resolucion, iguales, holgura,
+                                             np.flatnonzero(franja == k), sim.ancho, sim.altura, sim.pasoTemp,
+                                             especificaciones, hijo, izquierda, derecha, barrera))
+            proceso.start()
+            self._conexiones.append(padre)
+            self._procesos.append(proceso)
+        self.discos_por_franja = [0] * franjas
+
+    def avanzar(self, pasos=1):
+        """
+        Simula `pasos` pasos de tiempo en todas las franjas y actualiza el tiempo, los contadores y los histogramas de la simulación.
+
+        Args:
+            pasos (int): Cantidad de pasos de tiempo
+        """
+        for conexion in self._conexiones:
+            conexion.send(('avanzar', pasos))
+        for k, conexion in enumerate(self._conexiones):
+            contadores, conteos, propios = conexion.recv()
+            for clave, valor in contadores.items():
+                self.sim.contadores[clave] += valor
+            for nombre, (valores, fuera) in conteos.items():
+                self.sim.histogramas[nombre].conteos += valores
+                self.sim.histogramas[nombre].fuera += fuera
+            self.discos_por_franja[k] = propios
+        self.sim.tiempo += pasos * self.sim.pasoTemp
+        self.sim.paso_actual += pasos
+
+    def cerrar(self):
+        """
+        Detiene los procesos, devuelve a la simulación una copia normal de su estado y libera la memoria compartida.
+        """
+        if not self._procesos:
+            return
+        for conexion in self._conexiones:
+            conexion.send(('cerrar', None))
+        for proceso in self._procesos:
+            proceso.join()
+        estado = self.sim.estado
+        estado.pos, estado.vel = estado.pos.copy(), estado.vel.copy()
+        estado.radios, estado.masas = estado.radios.copy(), estado.masas.copy()
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+        self._procesos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
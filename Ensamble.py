@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""Ejecución de ensambles de réplicas independientes en paralelo. El módulo contiene:
+
+- `rango_rapidez_ensamble` - Rango común del histograma de rapidez de todas las réplicas.
+- `ejecutar_replica` - Corre una réplica sin interfaz gráfica y devuelve solo resultados compactos.
+- `ejecutar_ensamble` - Reparte las réplicas entre procesos con `ProcessPoolExecutor`.
+- `ResultadoEnsamble` - Junta los resultados de las réplicas en medias y bandas de confianza.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from Discos_optimizado import VELOCIDAD_INICIAL, DiscoSimulation
+from Histogramas import HistogramaAcumulado2D
+
+
+def semillas_replicas(replicas, semilla=None):
+    """
+    Genera semillas independientes para cada réplica a partir de una semilla base, con `np.random.SeedSequence`.
+
+    Args:
+        replicas (int): Cantidad de réplicas
+        semilla (int): Semilla base. Si es None se usa entropía del sistema.
+
+    Returns:
+        list: Una semilla entera por réplica.
+    """
+    return [int(hijo.generate_state(1)[0]) for hijo in np.random.SeedSequence(semilla).spawn(replicas)]
+
+
+def rango_rapidez_ensamble():
+    """
+    Devuelve el rango común del histograma de rapidez de las réplicas: de 0 al doble de la mayor rapidez inicial posible, que depende solo de la distribución de las velocidades iniciales y no de la semilla.
+    """
+    return (0.0, 2 * float(np.hypot(VELOCIDAD_INICIAL, VELOCIDAD_INICIAL)))
+
+
+def ejecutar_replica(parametros, semilla, pasos, metodo='rejilla'):
+    """
+    Corre una réplica completa sin animación. Se ejecuta en un proceso trabajador, por lo que solo devuelve datos compactos: los conteos de los histogramas acumulados y los contadores de choques.
+
+    Args:
+        parametros (dict): Argumentos de `DiscoSimulation` (sin la semilla)
+        semilla (int): Semilla de la réplica
+        pasos (int): Pasos a simular
+        metodo (str): Método de colocación inicial
+
+    Returns:
+        dict: Semilla, cantidad de discos, conteos y bordes de cada histograma, contadores y duración.
+    """
+    inicio = time.perf_counter()
+    sim = DiscoSimulation(**parametros, semilla=semilla)
+    sim.creacionDiscos(metodo)
+    sim.avanzar(pasos)
+    histogramas = {}
+    for nombre, hist in sim.histogramas.items():
+        bordes = (hist.bordes_x, hist.bordes_y) if isinstance(hist, HistogramaAcumulado2D) else (hist.bordes,)
+        histogramas[nombre] = (hist.conteos, bordes)
+    return {
+        'semilla': semilla,
+        'discos': len(sim.estado),
+        'histogramas': histogramas,
+        'contadores': dict(sim.contadores),
+        'duracion': time.perf_counter() - inicio,
+    }
+
+
+class ResultadoEnsamble:
+    """
+    Clase utilizada para juntar los resultados de todas las réplicas de un ensamble.
+
+    Cada réplica aporta su histograma normalizado como densidad; el ensamble calcula la media por columna y una banda de confianza con el error estándar de la media. Para eso las columnas de todas las réplicas deben coincidir.
+    """
+
+    def __init__(self, parametros, pasos, replicas):
+        """
+        Args:
+            parametros (dict): Argumentos de `DiscoSimulation` comunes a todas las réplicas
+            pasos (int): Pasos simulados por réplica
+            replicas (list): Resultados de `ejecutar_replica`
+
+        Raises:
+            ValueError: Si algún histograma no tiene los mismos bordes en todas las réplicas.
+        """
+        self.parametros = parametros
+        self.pasos = pasos
+        self.replicas = replicas
+        for nombre, (_, bordes) in (replicas[0]['histogramas'].items() if replicas else ()):
+            for replica in replicas[1:]:
+                otros = replica['histogramas'][nombre][1]
+                if len(otros) != len(bordes) or not all(np.array_equal(a, b) for a, b in zip(otros, bordes)):
+                    raise ValueError(f"Los bordes del histograma {nombre!r} de la réplica con semilla {replica['semilla']} "
+                                     "no coinciden con los de la primera réplica; use el mismo rango en todas")
+
+    def __len__(self):
+        return len(self.replicas)
+
+    @property
+    def semillas(self):
+        return [r['semilla'] for r in self.replicas]
+
+    def bordes(self, nombre):
+        """
+        Devuelve los bordes de las columnas del histograma `nombre`.
+        """
+        return self.replicas[0]['histogramas'][nombre][1]
+
+    def densidades(self, nombre):
+        """
+        Devuelve la densidad de cada réplica para el histograma `nombre`, en un arreglo con una fila por réplica.
+        """
+        filas = []
+        for replica in self.replicas:
+            conteos, bordes = replica['histogramas'][nombre]
+            area = np.diff(bordes[0]) if len(bordes) == 1 else np.outer(np.diff(bordes[0]), np.diff(bordes[1]))
+            total = conteos.sum()
+            filas.append(conteos / (total * area) if total else np.zeros(conteos.shape))
+        return np.array(filas)
+
+    def media(self, nombre):
+        """
+        Devuelve la densidad media del histograma `nombre` entre réplicas.
+        """
+        return self.densidades(nombre).mean(axis=0)
+
+    def banda(self, nombre, confianza=0.95):
+        """
+        Devuelve la banda de confianza de la densidad media del histograma `nombre`, usando la aproximación normal del error estándar de la media.
+
+        Args:
+            nombre (str): Nombre del histograma
+            confianza (float): Nivel de confianza de la banda
+
+        Returns:
+            tuple: Límites inferior y superior de la banda en cada columna.
+
+        Example:
+            >>> bajo, alto = resultado.banda('x')
+
+            >>> Banda del 95 % para el histograma de posiciones en x.
+        """
+        densidades = self.densidades(nombre)
+        media = densidades.mean(axis=0)
+        if len(densidades) < 2:
+            return media, media
+        error = densidades.std(axis=0, ddof=1) / np.sqrt(len(densidades))
+        z = NormalDist().inv_cdf(0.5 + confianza / 2)
+        return media - z * error, media + z * error
+
+    def contadores(self):
+        """
+        Devuelve la media y la desviación estándar de cada contador de choques entre réplicas.
+
+        Returns:
+            dict: Para cada contador, un par (media, desviación).
+        """
+        resumen = {}
+        for clave in self.replicas[0]['contadores']:
+            valores = np.array([r['contadores'][clave] for r in self.replicas], dtype=float)
+            resumen[clave] = (float(valores.mean()), float(valores.std(ddof=1)) if len(valores) > 1 else 0.0)
+        return resumen
+
+    def resumen(self, confianza=0.95):
+        """
+        Devuelve un diccionario serializable a JSON con los parámetros, las semillas, los contadores y, para cada histograma, los bordes, la media y la banda de confianza.
+        """
+        histogramas = {}
+        for nombre in self.replicas[0]['histogramas']:
+            bajo, alto = self.banda(nombre, confianza)
+            histogramas[nombre] = {
+                'bordes': [b.tolist() for b in self.bordes(nombre)],
+                'media': self.media(nombre).tolist(),
+                'banda_inferior': bajo.tolist(),
+                'banda_superior': alto.tolist(),
+            }
+        return {
+            'parametros': self.parametros,
+            'pasos': self.pasos,
+            'semillas': self.semillas,
+            'confianza': confianza,
+            'contadores': self.contadores(),
+            'histogramas': histogramas,
+        }
+
+
+def ejecutar_ensamble(parametros, replicas=8, pasos=1000, semilla=None, semillas=None, procesos=None, metodo='rejilla'):
+    """
+    Corre varias réplicas independientes de la misma configuración en paralelo, una por proceso, y junta sus resultados.
+
+    Args:
+        parametros (dict): Argumentos de `DiscoSimulation` (`N`, `height`, `width`, `radio`, `dt` y opcionales), sin la semilla. Si no incluye `rango_rapidez`, se usa `rango_rapidez_ensamble()` para que las columnas de rapidez coincidan entre réplicas.
+        replicas (int): Cantidad de réplicas
+        pasos (int): Pasos a simular por réplica
+        semilla (int): Semilla base de la que se derivan las semillas de las réplicas
+        semillas (list): Semillas explícitas de cada réplica; si se dan, reemplazan a `replicas` y `semilla`
+        procesos (int): Cantidad de procesos trabajadores. Si es None se usan todos los núcleos.
+        metodo (str): Método de colocación inicial
+
+    Returns:
+        ResultadoEnsamble: Resultados de todas las réplicas, en el orden de las semillas.
+
+    Example:
+        >>> ejecutar_ensamble({'N': 250, 'height': 60, 'width': 60, 'radio': 1, 'dt': 0.03}, replicas=64, pasos=5000, semilla=1)
+
+        >>> Corre 64 réplicas de 5000 pasos repartidas entre todos los núcleos.
+    """
+    if semillas is None:
+        semillas = semillas_replicas(replicas, semilla)
+    semillas = list(semillas)
+    parametros = {'rango_rapidez': rango_rapidez_ensamble(), **parametros}
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        resultados = list(ejecutor.map(ejecutar_replica, [parametros] * len(semillas), semillas,
+                                       [pasos] * len(semillas), [metodo] * len(semillas)))
+    return ResultadoEnsamble(parametros, pasos, resultados)
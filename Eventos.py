@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+"""Dinámica molecular dirigida por eventos. El módulo contiene la siguiente clase:
+
+- `MotorEventos` - Avanza los discos de choque en choque, calculando de forma exacta el instante de cada colisión.
+"""
+
+import heapq
+from itertools import chain
+from math import sqrt
+
+import numpy as np
+
+from Colisiones import RejillaCeldas
+
+# Códigos de evento para los choques con las paredes y los cruces de celda
+PARED_X = -1
+PARED_Y = -2
+CELDA_X = -3
+CELDA_Y = -4
+
+# Desplazamientos de la celda propia y sus 8 vecinas
+VECINDAD = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+class MotorEventos:
+    """
+    Clase utilizada para simular los discos de forma exacta, dirigida por eventos.
+
+    En lugar de avanzar con un paso de tiempo fijo, predice de forma analítica el instante del próximo choque de cada disco (con otro disco o con una pared) y guarda las predicciones en una cola de prioridad. La simulación salta directamente de un evento al siguiente. Los choques ocurren exactamente en el contacto, por lo que no hay superposiciones que corregir y la energía se conserva.
+
+    Las predicciones que quedan obsoletas porque alguno de sus discos chocó antes se descartan de forma perezosa al salir de la cola, comparando el contador de choques de cada disco.
+
+    Para no comparar cada disco con todos los demás, la caja se divide en celdas (`Colisiones.RejillaCeldas`) de lado al menos el diámetro mayor, y cada disco solo se compara con los de su celda y las 8 vecinas. El paso de un disco a otra celda es un evento más de la cola: al cruzar, el disco se compara con los discos de su nueva vecindad. Cada disco guarda además el instante al que corresponde su posición (`tiempos`): un evento solo mueve a los discos que participan en él, y todas las posiciones se ponen al día recién al final de `avanzarHasta`. Así cada evento cuesta lo mismo sin importar cuántos discos haya.
+    """
+
+    def __init__(self, estado, ancho, altura, discos_por_celda=2, predecir=True):
+        """
+        Inicia el motor sobre el estado de los discos y predice los primeros eventos.
+
+        Args:
+            estado (EstadoDiscos): Estado de los discos. Sus arreglos se modifican en el lugar.
+            ancho (float): Ancho del espacio limitado
+            altura (float): Alto del espacio limitado
+            discos_por_celda (float): Discos por celda buscados en gases diluidos. Celdas más grandes producen menos cruces pero más comparaciones por predicción; el lado nunca es menor que el diámetro mayor.
+            predecir (bool): Si es False la cola queda vacía, para restaurarla después con `restaurar`
+
+        Example:
+            >>> MotorEventos(sim.estado, sim.ancho, sim.altura)
+
+            >>> Crea un motor de eventos para los discos de la simulación sim.
+        """
+        self.estado = estado
+        self.ancho = ancho
+        self.altura = altura
+        self.t = 0.0
+        n = len(estado)
+        self.conteo = np.zeros(n, dtype=np.int64)
+        self.tiempos = np.zeros(n)
+        self.choques_discos = 0
+        self.choques_pared = 0
+        self.cruces = 0
+        self.impulso_pared = 0.0
+        self.pares_revisados = 0
+        diametro = 2 * float(estado.radios.max(initial=0))
+        tam_celda = max(diametro, np.sqrt(discos_por_celda * ancho * altura / max(n, 1))) or 1.0
+        self.rejilla = RejillaCeldas(ancho, altura, tam_celda)
+        self.ubicar()
+        self.cola = []
+        if predecir:
+            self.reiniciarCola()
+
+    def ubicar(self, celdas=None):
+        """
+        Asigna a cada disco su celda. Si `celdas` es None se calcula a partir de las posiciones; si no, se usa tal cual, por ejemplo la de un punto de control.
+
+        Args:
+            celdas (array): Columna y fila de la celda de cada disco, de forma (N, 2)
+        """
+        if celdas is None:
+            celdas = np.stack(self.rejilla.celdas(self.estado.pos), axis=1)
+        self.celdas = np.array(celdas, dtype=np.int64).reshape(-1, 2)
+        self.ocupantes = {}
+        for i, celda in enumerate(map(tuple, self.celdas.tolist())):
+            self.ocupantes.setdefault(celda, set()).add(i)
+
+    def sincronizar(self):
+        """
+        Lleva la posición de todos los discos al instante actual `t`.
+        """
+        self.estado.pos += self.estado.vel * (self.t - self.tiempos)[:, None]
+        self.tiempos[:] = self.t
+
+    def reiniciarCola(self):
+        """
+        Descarta todas las predicciones y vuelve a predecir los eventos de todos los discos a partir del estado actual. Los choques entre discos se predicen en bloque sobre los pares candidatos de la cuadrícula.
+        """
+        self.sincronizar()
+        self.ubicar()
+        pos = self.estado.pos
+        vel = self.estado.vel
+        radios = self.estado.radios
+        i, j = self.rejilla.pares_candidatos(pos)
+        self.pares_revisados += len(i)
+        t = self._tiemposChoque(pos[j] - pos[i], vel[j] - vel[i], radios[i] + radios[j])
+
+        # El próximo choque de cada disco, contando cada par desde sus dos discos
+        a, b, t = np.r_[i, j], np.r_[j, i], np.r_[t, t]
+        finito = np.isfinite(t)
+        a, b, t = a[finito], b[finito], t[finito]
+        orden = np.lexsort((t, a))
+        primero = orden[np.r_[True, a[orden][1:] != a[orden][:-1]]] if len(orden) else orden
+        conteo = self.conteo
+        self.cola = [(self.t + float(tk), ak, bk, conteo[ak], conteo[bk])
+                     for tk, ak, bk in zip(t[primero].tolist(), a[primero].tolist(), b[primero].tolist())]
+        for k in range(len(self.estado)):
+            self._predecirPared(k)
+            self._predecirCelda(k)
+        heapq.heapify(self.cola)
+
+    def restaurar(self, t, conteo, cola, celdas=None):
+        """
+        Restaura el motor tal como estaba, a partir de los datos de un punto de control. Las posiciones del estado deben corresponder al instante `t`. Sin `celdas` se predice todo de nuevo.
+        """
+        self.t = t
+        self.tiempos[:] = t
+        self.conteo = np.array(conteo, dtype=np.int64)
+        if celdas is None:
+            self.reiniciarCola()
+            return
+        self.ubicar(celdas)
+        # La cola se restaura tal cual (ya cumple el orden de montículo), sin volver a predecir
+        self.cola = list(cola)
+
+    def _posicion(self, i):
+        """
+        Posición del disco `i` en el instante actual, sin modificar el estado.
+        """
+        dt = self.t - self.tiempos.item(i)
+        pos = self.estado.pos.item
+        vel = self.estado.vel.item
+        return pos(i, 0) + vel(i, 0) * dt, pos(i, 1) + vel(i, 1) * dt
+
+    def _mover(self, i):
+        """
+        Lleva la posición del disco `i` al instante actual.
+        """
+        self.estado.pos[i] = self._posicion(i)
+        self.tiempos[i] = self.t
+
+    @staticmethod
+    def _tiemposChoque(dr, dv, contacto):
+        """
+        Tiempo hasta el contacto de cada par, o infinito si el par no choca. `dr` y `dv` son la posición y la velocidad relativas y `contacto` la suma de los radios.
+        """
+        b = np.einsum('ij,ij->i', dr, dv)
+        dvdv = np.einsum('ij,ij->i', dv, dv)
+        c = np.einsum('ij,ij->i', dr, dr) - contacto**2
+        d = b * b - dvdv * c
+        # Solo chocan los pares que se acercan y cuyas trayectorias se cruzan
+        candidato = (b < 0) & (d >= 0)
+        t = np.full(len(b), np.inf)
+        t[candidato] = np.maximum(c[candidato] / (-b[candidato] + np.sqrt(d[candidato])), 0.0)
+        return t
+
+    def _vecinos(self, i, desplazamientos=VECINDAD):
+        """
+        Devuelve los discos de las celdas desplazadas en `desplazamientos` respecto de la celda de `i` (por defecto la propia y sus 8 vecinas), sin `i`, ordenados para que la predicción no dependa del orden de los conjuntos.
+        """
+        cx, cy = self.celdas[i].tolist()
+        ocupantes = self.ocupantes
+        grupos = [ocupantes[c] for c in ((cx + dx, cy + dy) for dx, dy in desplazamientos) if c in ocupantes]
+        return sorted(j for j in chain.from_iterable(grupos) if j != i)
+
+    def _predecirPared(self, i):
+        """
+        Predice el próximo choque del disco `i` con alguna pared.
+        """
+        x, y = self._posicion(i)
+        vx, vy = self.estado.vel[i].tolist()
+        r = self.estado.radios[i].item()
+        mejor = np.inf
+        tipo = PARED_X
+        for p, v, largo, codigo in ((x, vx, self.ancho, PARED_X), (y, vy, self.altura, PARED_Y)):
+            if v > 0:
+                t = (largo / 2 - r - p) / v
+            elif v < 0:
+                t = (-largo / 2 + r - p) / v
+            else:
+                continue
+            if t < mejor:
+                mejor = max(t, 0.0)
+                tipo = codigo
+        if mejor < np.inf:
+            heapq.heappush(self.cola, (self.t + mejor, i, tipo, self.conteo[i], 0))
+
+    def _predecirCelda(self, i):
+        """
+        Predice el instante en que el centro del disco `i` pasa a otra celda.
+        """
+        x, y = self._posicion(i)
+        vx, vy = self.estado.vel[i].tolist()
+        cx, cy = self.celdas[i].tolist()
+        rejilla = self.rejilla
+        mejor = np.inf
+        tipo = CELDA_X
+        for p, v, celda, origen, lado, cuantas, codigo in (
+                (x, vx, cx, -self.ancho / 2, rejilla.lado_x, rejilla.nx, CELDA_X),
+                (y, vy, cy, -self.altura / 2, rejilla.lado_y, rejilla.ny, CELDA_Y)):
+            if v > 0 and celda < cuantas - 1:
+                t = (origen + (celda + 1) * lado - p) / v
+            elif v < 0 and celda > 0:
+                t = (origen + celda * lado - p) / v
+            else:
+                continue
+            if t < mejor:
+                mejor = max(t, 0.0)
+                tipo = codigo
+        if mejor < np.inf:
+            heapq.heappush(self.cola, (self.t + mejor, i, tipo, self.conteo[i], 0))
+
+    def _predecirDiscos(self, i, desplazamientos=VECINDAD):
+        """
+        Predice el próximo choque del disco `i` con otro disco de las celdas indicadas. Solo se guarda el más cercano en el tiempo; si ese compañero cambia de trayectoria antes, la predicción se repite al salir de la cola.
+
+        Las celdas tienen pocos discos, así que el cálculo se hace disco por disco con escalares de Python: con tan pocos elementos, el costo fijo de cada operación de NumPy sería mayor que el del cálculo.
+        """
+        vecinos = self._vecinos(i, desplazamientos)
+        if not vecinos:
+            return
+        self.pares_revisados += len(vecinos)
+        pos = self.estado.pos.item
+        vel = self.estado.vel.item
+        radio = self.estado.radios.item
+        tiempo = self.tiempos.item
+        ahora = self.t
+        x, y = self._posicion(i)
+        vx, vy = vel(i, 0), vel(i, 1)
+        r = radio(i)
+        mejor = np.inf
+        pareja = -1
+        for j in vecinos:
+            ux, uy = vel(j, 0), vel(j, 1)
+            dt = ahora - tiempo(j)
+            dx = pos(j, 0) + ux * dt - x
+            dy = pos(j, 1) + uy * dt - y
+            wx, wy = ux - vx, uy - vy
+            b = dx * wx + dy * wy
+            if b >= 0:
+                continue  # Se alejan
+            c = dx * dx + dy * dy - (r + radio(j)) ** 2
+            d = b * b - (wx * wx + wy * wy) * c
+            if d < 0:
+                continue  # Sus trayectorias no se cruzan
+            t = c / (-b + sqrt(d))
+            if t < mejor:
+                mejor = t
+                pareja = j
+        if pareja >= 0:
+            heapq.heappush(self.cola, (ahora + max(mejor, 0.0), i, pareja, self.conteo[i], self.conteo[pareja]))
+
+    def _predecir(self, i):
+        self._predecirDiscos(i)
+        self._predecirPared(i)
+        self._predecirCelda(i)
+
+    def _cruzar(self, i, eje):
+        """
+        Pasa el disco `i` a la celda vecina en la dirección de su velocidad a lo largo de `eje`.
+
+        Returns:
+            tuple: Desplazamientos, respecto de la nueva celda, de las 3 celdas que entran en la vecindad del disco.
+        """
+        paso = 1 if self.estado.vel[i, eje] > 0 else -1
+        anterior = tuple(self.celdas[i].tolist())
+        self.celdas[i, eje] += paso
+        nueva = tuple(self.celdas[i].tolist())
+        ocupantes = self.ocupantes
+        ocupantes[anterior].discard(i)
+        if not ocupantes[anterior]:
+            del ocupantes[anterior]
+        ocupantes.setdefault(nueva, set()).add(i)
+        if eje == 0:
+            return tuple((paso, d) for d in (-1, 0, 1))
+        return tuple((d, paso) for d in (-1, 0, 1))
+
+    def _chocarDiscos(self, i, j):
+        """
+        Resuelve el choque elástico entre dos discos en contacto. Con masas iguales se intercambian las componentes normales de sus velocidades; en general, cada disco recibe un impulso normal inverso a su masa.
+        """
+        pos = self.estado.pos
+        vel = self.estado.vel
+        m1 = self.estado.masas[i]
+        m2 = self.estado.masas[j]
+        n = pos[j] - pos[i]
+        n /= np.sqrt(n @ n)
+        impulso = (vel[j] - vel[i]) @ n
+        vel[i] += (2 * m2 / (m1 + m2)) * impulso * n
+        vel[j] -= (2 * m1 / (m1 + m2)) * impulso * n
+
+    def avanzarHasta(self, t_final):
+        """
+        Procesa todos los eventos anteriores a `t_final` y deja los discos en sus posiciones en ese instante.
+
+        Args:
+            t_final (float): Instante hasta el cual se simula.
+
+        Example:
+            >>> motor.avanzarHasta(10.0)
+
+            >>> Simula hasta el tiempo 10, pasando por todos los choques intermedios.
+        """
+        cola = self.cola
+        conteo = self.conteo
+        while cola and cola[0][0] <= t_final:
+            t, i, j, conteo_i, conteo_j = heapq.heappop(cola)
+            if conteo_i != conteo[i]:
+                continue  # El disco ya chocó y tiene predicciones nuevas
+            self.t = max(self.t, t)
+            if j >= 0 and conteo_j != conteo[j]:
+                # El compañero cambió de trayectoria: volver a predecir
+                self._predecirDiscos(i)
+                continue
+
+            if j <= CELDA_X:
+                # Cruce de celda: la trayectoria no cambia, así que las predicciones con los discos que siguen
+                # siendo vecinos valen y solo hace falta revisar las celdas que entran en la vecindad
+                nuevas = self._cruzar(i, 0 if j == CELDA_X else 1)
+                self.cruces += 1
+                self._predecirDiscos(i, nuevas)
+                self._predecirCelda(i)
+                continue
+
+            self._mover(i)
+            if j < 0:
+                eje = 0 if j == PARED_X else 1
+                self.impulso_pared += 2 * self.estado.masas[i] * abs(self.estado.vel[i, eje])
+                self.estado.vel[i, eje] = -self.estado.vel[i, eje]
+                self.choques_pared += 1
+            else:
+                self._mover(j)
+                self._chocarDiscos(i, j)
+                conteo[j] += 1
+                self.choques_discos += 1
+            conteo[i] += 1
+            self._predecir(i)
+            if j >= 0:
+                self._predecir(j)
+
+        self.t = max(self.t, t_final)
+        self.sincronizar()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""Exportación de cuadros a archivos sin interfaz gráfica. El módulo contiene las siguientes funciones:
+
+- `exportar_trayectoria` - Dibuja los cuadros de una trayectoria grabada, repartidos entre varios procesos.
+- `exportar_simulacion` - Avanza una simulación y dibuja sus cuadros en procesos aparte mientras la física sigue corriendo.
+
+Los cuadros se dibujan con el backend Agg de matplotlib, sin `pyplot` ni ventanas, y se guardan como `cuadro_000000.png`, `cuadro_000001.png`, ... (o `.npz` con la imagen RGBA en el arreglo `imagen`). Los nombres son consecutivos, así que se pueden unir en un video, por ejemplo con `ffmpeg -i cuadro_%06d.png video.mp4`.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Trayectorias import LectorTrayectoria
+
+FORMATOS = ('png', 'npz')
+
+# Estado de cada proceso trabajador: se crea una sola vez por proceso en `_iniciar`
+_LIENZO = None
+_LECTOR = None
+
+
+class _Lienzo:
+    """
+    Figura de matplotlib con el backend Agg y una `EllipseCollection` con todos los discos, que se reutiliza para cada cuadro.
+    """
+
+    def __init__(self, ancho, altura, radios, colores, salida, formato, dpi, tamano):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import EllipseCollection
+        from matplotlib.figure import Figure
+
+        self.salida = salida
+        self.formato = formato
+        self.dpi = dpi
+        self.figura = Figure(figsize=tamano, dpi=dpi)
+        self.lienzo = FigureCanvasAgg(self.figura)
+        ax = self.figura.add_subplot()
+        ax.set_xlim(-ancho / 2, ancho / 2)
+        ax.set_ylim(-altura / 2, altura / 2)
+        ax.set_aspect('equal')
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        self.ax = ax
+        self.n_discos = len(radios)
+        diametros = 2 * np.asarray(radios, dtype=float)
+        self.coleccion = EllipseCollection(diametros, diametros, np.zeros(len(diametros)), units='xy',
+                                           offsets=np.zeros((len(diametros), 2)), offset_transform=ax.transData,
+                                           facecolors=colores or 'tab:blue', alpha=0.7)
+        ax.add_collection(self.coleccion)
+
+    def dibujar(self, k, pos, paso):
+        """
+        Dibuja las posiciones `pos` y guarda el cuadro número `k`.
+        """
+        self.coleccion.set_offsets(pos)
+        self.ax.set_title(f'Colisión de discos en 2D\n{self.n_discos} discos, paso {paso}')
+        ruta = os.path.join(self.salida, f'cuadro_{k:06d}.{self.formato}')
+        if self.formato == 'png':
+            # Compresión mínima: codificar el PNG cuesta más que dibujar los discos
+            self.figura.savefig(ruta, dpi=self.dpi, pil_kwargs={'compress_level': 1})
+        else:
+            self.lienzo.draw()
+            np.savez_compressed(ruta, imagen=np.asarray(self.lienzo.buffer_rgba()), paso=paso)
+        return ruta
+
+
+def _iniciar(configuracion, directorio=None):
+    """
+    Inicializador de cada proceso trabajador: crea su figura y, si se exporta una trayectoria, la abre.
+    """
+    global _LIENZO, _LECTOR
+    _LIENZO = _Lienzo(**configuracion)
+    _LECTOR = LectorTrayectoria(directorio) if directorio is not None else None
+
+
+def _exportar_cuadros(trabajos):
+    """
+    Dibuja una lista de cuadros `(k, cuadro de la trayectoria)` leídos del lector del proceso.
+    """
+    return [_LIENZO.dibujar(k, _LECTOR[cuadro][:, 0:2], _LECTOR.paso(cuadro)) for k, cuadro in trabajos]
+
+
+def _exportar_posiciones(k, pos, paso):
+    return _LIENZO.dibujar(k, pos, paso)
+
+
+def _preparar(salida, formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r}. Opciones: {', '.join(FORMATOS)}")
+    os.makedirs(salida, exist_ok=True)
+
+
+def exportar_trayectoria(directorio, salida, formato='png', cada=1, inicio=0, fin=None, procesos=None,
+                         dpi=100, tamano=(6, 6), por_tarea=None):
+    """
+    Dibuja los cuadros de una trayectoria grabada con `Trayectorias.GrabadorTrayectoria`. Cada proceso abre la trayectoria mapeada en memoria y crea su figura una sola vez, y recibe los cuadros en grupos para que la comunicación entre procesos sea mínima.
+
+    Args:
+        directorio (str): Directorio de la trayectoria
+        salida (str): Directorio donde se guardan los cuadros
+        formato (str): `'png'` o `'npz'`
+        cada (int): Se exporta uno de cada `cada` cuadros de la trayectoria
+        inicio (int): Primer cuadro de la trayectoria a exportar
+        fin (int): Cuadro de la trayectoria donde se termina (sin incluirlo). Si es None se exporta hasta el final.
+        procesos (int): Cantidad de procesos. Si es None se usan todos los núcleos.
+        dpi (int): Resolución de los cuadros
+        tamano (tuple): Tamaño de la figura en pulgadas
+        por_tarea (int): Cuadros que se envían juntos a un proceso. Si es None se eligen para repartir el trabajo en partes parejas.
+
+    Returns:
+        list: Rutas de los cuadros exportados, en orden.
+
+    Example:
+        >>> exportar_trayectoria('corrida', 'cuadros', cada=10, procesos=8)
+
+        >>> Dibuja uno de cada 10 cuadros de la trayectoria corrida usando 8 procesos.
+    """
+    _preparar(salida, formato)
+    lector = LectorTrayectoria(directorio)
+    meta = lector.metadatos
+    pos0 = lector[0][:, 0:2] if len(lector) else np.zeros((0, 2))
+    ancho = meta.get('ancho') or 2 * float(np.abs(pos0[:, 0]).max(initial=1)) + 2 * float(lector.radios.max(initial=0))
+    altura = meta.get('altura') or 2 * float(np.abs(pos0[:, 1]).max(initial=1)) + 2 * float(lector.radios.max(initial=0))
+    configuracion = {'ancho': ancho, 'altura': altura, 'radios': lector.radios, 'colores': meta.get('colores'),
+                     'salida': salida, 'formato': formato, 'dpi': dpi, 'tamano': tamano}
+
+    cuadros = list(range(inicio, len(lector) if fin is None else min(fin, len(lector)), max(1, int(cada))))
+    trabajos = list(enumerate(cuadros))
+    procesos = procesos or os.cpu_count() or 1
+    por_tarea = por_tarea or max(1, len(trabajos) // (4 * procesos))
+    grupos = [trabajos[a:a + por_tarea] for a in range(0, len(trabajos), por_tarea)]
+    rutas = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(configuracion, directorio)) as ejecutor:
+        for hechas in ejecutor.map(_exportar_cuadros, grupos):
+            rutas.extend(hechas)
+    return rutas
+
+
+def exportar_simulacion(sim, salida, pasos, formato='png', cada=1, procesos=None, dpi=100, tamano=(6, 6)):
+    """
+    Avanza la simulación `pasos` pasos y exporta un cuadro cada `cada` pasos, empezando por el estado actual. Si `pasos` no es múltiplo de `cada`, también se exporta el cuadro del último paso. La física corre en este proceso; cada cuadro se copia y se dibuja en un proceso aparte, con a lo sumo dos cuadros pendientes por proceso.
+
+    Args:
+        sim (DiscoSimulation): Simulación con los discos ya creados
+        salida (str): Directorio donde se guardan los cuadros
+        pasos (int): Pasos a simular
+        formato (str): `'png'` o `'npz'`
+        cada (int): Se exporta un cuadro cada `cada` pasos
+        procesos (int): Cantidad de procesos que dibujan. Si es None se usan todos los núcleos.
+        dpi (int): Resolución de los cuadros
+        tamano (tuple): Tamaño de la figura en pulgadas
+
+    Returns:
+        list: Rutas de los cuadros exportados, en orden.
+
+    Example:
+        >>> exportar_simulacion(sim, 'cuadros', 10000, cada=5)
+
+        >>> Simula 10000 pasos y exporta 2001 cuadros.
+    """
+    _preparar(salida, formato)
+    cada = max(1, int(cada))
+    procesos = procesos or os.cpu_count() or 1
+    configuracion = {'ancho': sim.ancho, 'altura': sim.altura, 'radios': sim.estado.radios.copy(),
+                     'colores': list(sim.estado.colores), 'salida': salida, 'formato': formato, 'dpi': dpi,
+                     'tamano': tamano}
+    rutas = []
+    pendientes = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(configuracion,)) as ejecutor:
+        # Si `pasos` no es múltiplo de `cada`, el último tramo es más corto y termina con su propio cuadro
+        tramos = [0] + [cada] * (pasos // cada) + ([pasos % cada] if pasos % cada else [])
+        for k, tramo in enumerate(tramos):
+            if tramo:
+                sim.avanzar(tramo)
+            pendientes.append(ejecutor.submit(_exportar_posiciones, k, sim.estado.pos.copy(), sim.paso_actual))
+            if len(pendientes) >= 2 * procesos:
+                rutas.append(pendientes.pop(0).result())
+        rutas.extend(futuro.result() for futuro in pendientes)
+    return rutas
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""Histogramas acumulados en línea, con memoria fija. El módulo contiene las siguientes clases:
+
+- `HistogramaAcumulado` - Histograma de una magnitud con columnas fijas.
+- `HistogramaAcumulado2D` - Histograma conjunto de dos magnitudes con columnas fijas.
+"""
+
+import numpy as np
+
+
+def _indices(valores, bins, rango):
+    """
+    Calcula la columna de cada valor. Igual que `np.histogram`, el borde derecho de la última columna se incluye en ella. Los valores fuera del rango reciben el índice -1.
+    """
+    bajo, alto = rango
+    valores = np.asarray(valores, dtype=float)
+    indices = np.floor((valores - bajo) * (bins / (alto - bajo))).astype(np.int64)
+    indices[indices >= bins] = bins - 1
+    indices[(valores < bajo) | (valores > alto)] = -1
+    return indices
+
+
+class HistogramaAcumulado:
+    """
+    Clase utilizada para acumular el histograma de una magnitud a lo largo de la simulación.
+
+    Las columnas se fijan al crearlo, de modo que cada paso solo suma los conteos nuevos con `np.bincount`. La memoria ocupada depende de la cantidad de columnas y no de la duración de la simulación.
+    """
+
+    def __init__(self, bins, rango):
+        """
+        Inicia un histograma vacío.
+
+        Args:
+            bins (int): Cantidad de columnas
+            rango (tuple): Límites (mínimo, máximo) del histograma
+
+        Example:
+            >>> HistogramaAcumulado(500, (-30, 30))
+
+            >>> Crea un histograma de 500 columnas entre -30 y 30.
+        """
+        self.bins = bins
+        self.rango = (float(rango[0]), float(rango[1]))
+        self.bordes = np.linspace(self.rango[0], self.rango[1], bins + 1)
+        self.conteos = np.zeros(bins, dtype=np.int64)
+        self.fuera = 0
+
+    def agregar(self, valores):
+        """
+        Suma al histograma un arreglo de valores.
+
+        Args:
+            valores (array): Valores a contar. Los que quedan fuera del rango se cuentan en `fuera`.
+        """
+        indices = _indices(valores, self.bins, self.rango)
+        dentro = indices >= 0
+        self.fuera += int(len(indices) - np.count_nonzero(dentro))
+        self.conteos += np.bincount(indices[dentro], minlength=self.bins)
+
+    @property
+    def total(self):
+        return int(self.conteos.sum())
+
+    def densidad(self):
+        """
+        Devuelve el histograma normalizado como densidad de probabilidad, igual que `plt.hist(..., density=True)`.
+
+        Returns:
+            array: Densidad de cada columna.
+        """
+        total = self.total
+        if total == 0:
+            return np.zeros(self.bins)
+        return self.conteos / (total * np.diff(self.bordes))
+
+    def reagrupar(self, bins):
+        """
+        Devuelve un histograma con menos columnas, sumando columnas vecinas.
+
+        Args:
+            bins (int): Cantidad de columnas del nuevo histograma. Debe dividir a la cantidad actual.
+
+        Returns:
+            HistogramaAcumulado: Histograma con `bins` columnas y los mismos conteos totales.
+
+        Example:
+            >>> HistogramaAcumulado(500, (-30, 30)).reagrupar(50)
+
+            >>> Produce un histograma de 50 columnas, cada una con la suma de 10 columnas originales.
+        """
+        if bins == self.bins:
+            return self
+        if bins <= 0 or self.bins % bins:
+            raise ValueError(f"No se pueden reagrupar {self.bins} columnas en {bins}; la cantidad debe dividir a {self.bins}")
+        nuevo = HistogramaAcumulado(bins, self.rango)
+        nuevo.conteos = self.conteos.reshape(bins, -1).sum(axis=1)
+        nuevo.fuera = self.fuera
+        return nuevo
+
+
+class HistogramaAcumulado2D:
+    """
+    Clase utilizada para acumular el histograma conjunto de dos magnitudes, por ejemplo las posiciones (x, y).
+
+    Igual que `HistogramaAcumulado`, las columnas se fijan al crearlo y cada paso solo suma conteos.
+    """
+
+    def __init__(self, bins, rango_x, rango_y):
+        """
+        Inicia un histograma vacío.
+
+        Args:
+            bins (tuple): Cantidad de columnas en cada eje
+            rango_x (tuple): Límites (mínimo, máximo) del primer eje
+            rango_y (tuple): Límites (mínimo, máximo) del segundo eje
+
+        Example:
+            >>> HistogramaAcumulado2D((60, 60), (-30, 30), (-30, 30))
+
+            >>> Crea un histograma de 60x60 celdas que cubre una caja de 60x60.
+        """
+        self.bins = (int(bins[0]), int(bins[1]))
+        self.rango_x = (float(rango_x[0]), float(rango_x[1]))
+        self.rango_y = (float(rango_y[0]), float(rango_y[1]))
+        self.bordes_x = np.linspace(self.rango_x[0], self.rango_x[1], self.bins[0] + 1)
+        self.bordes_y = np.linspace(self.rango_y[0], self.rango_y[1], self.bins[1] + 1)
+        self.conteos = np.zeros(self.bins, dtype=np.int64)
+        self.fuera = 0
+
+    def agregar(self, valores_x, valores_y):
+        """
+        Suma al histograma los pares de valores (x, y).
+
+        Args:
+            valores_x (array): Valores del primer eje
+            valores_y (array): Valores del segundo eje
+        """
+        bx, by = self.bins
+        ix = _indices(valores_x, bx, self.rango_x)
+        iy = _indices(valores_y, by, self.rango_y)
+        dentro = (ix >= 0) & (iy >= 0)
+        self.fuera += int(len(ix) - np.count_nonzero(dentro))
+        self.conteos += np.bincount(ix[dentro] * by + iy[dentro], minlength=bx * by).reshape(bx, by)
+
+    @property
+    def total(self):
+        return int(self.conteos.sum())
+
+    def densidad(self):
+        """
+        Devuelve el histograma normalizado como densidad de probabilidad.
+
+        Returns:
+            array: Densidad de cada celda, de forma `bins`.
+        """
+        total = self.total
+        if total == 0:
+            return np.zeros(self.bins)
+        area = np.outer(np.diff(self.bordes_x), np.diff(self.bordes_y))
+        return self.conteos / (total * area)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""Instrumentación por fases del ciclo de la simulación. El módulo contiene las siguientes clases:
+
+- `Instrumentacion` - Mide el tiempo de cada fase de un paso y acumula contadores; guarda un resumen móvil y, opcionalmente, escribe un registro por paso en CSV o JSON.
+- `InstrumentacionNula` - Objeto nulo con la misma interfaz que no hace nada. Es el que usa la simulación cuando la instrumentación está desactivada.
+
+Las fases se delimitan con marcas: `marcar(fase)` suma a esa fase el tiempo transcurrido desde la marca anterior. Así cada paso cuesta una lectura del reloj por fase, y nada más que una llamada vacía cuando la instrumentación está desactivada.
+"""
+
+import csv
+import json
+import time
+from collections import deque
+
+FASES = ('mover', 'paredes', 'rejilla', 'pares', 'resolver', 'eventos', 'registro', 'dibujo')
+CONTADORES = ('candidatos', 'contactos', 'choques_discos', 'choques_pared', 'celdas_ocupadas')
+
+
+class InstrumentacionNula:
+    """
+    Clase utilizada cuando la instrumentación está desactivada. Todos sus métodos aceptan los mismos argumentos que los de `Instrumentacion` y no hacen nada.
+    """
+
+    activa = False
+
+    def iniciarPaso(self, paso):
+        pass
+
+    def marcar(self, fase):
+        pass
+
+    def contar(self, nombre, valor):
+        pass
+
+    def resumen(self):
+        return {}
+
+    def cerrar(self):
+        pass
+
+
+NULA = InstrumentacionNula()
+
+
+class Instrumentacion:
+    """
+    Clase utilizada para medir dónde se va el tiempo de cada paso.
+
+    Cada paso produce un registro con el tiempo de cada fase en segundos y el valor de cada contador. Los últimos `ventana` registros se guardan en memoria para `resumen`; si se indica `salida`, además se escribe un registro cada `cada` pasos en un archivo CSV o JSON por líneas.
+    Un paso se cierra cuando empieza el siguiente (o al llamar a `resumen` o `cerrar`), de modo que las marcas hechas después de `avanzar`, como la de la fase `dibujo` en la animación, cuentan en el mismo paso.
+    """
+
+    activa = True
+
+    def __init__(self, salida=None, formato=None, ventana=1000, cada=1):
+        """
+        Args:
+            salida (str): Archivo donde se escribe el registro de cada paso. Si es None solo se guarda el resumen móvil.
+            formato (str): `'csv'` o `'json'` (un objeto JSON por línea). Si es None se deduce de la extensión de `salida`.
+            ventana (int): Cantidad de pasos que se guardan para el resumen móvil
+            cada (int): Se escribe un registro cada `cada` pasos
+
+        Example:
+            >>> medidor = sim.instrumentar('fases.csv', cada=10)
+
+            >>> sim.avanzar(1000)
+
+            >>> medidor.resumen()['fases']['resolver']['fraccion']
+
+            >>> Fracción del tiempo de cada paso que se va en resolver los choques.
+        """
+        if formato is None and salida is not None:
+            formato = 'json' if str(salida).endswith(('.json', '.jsonl')) else 'csv'
+        if formato not in (None, 'csv', 'json'):
+            raise ValueError(f"Formato desconocido: {formato!r}. Opciones: csv, json")
+        self.formato = formato
+        self.cada = max(1, int(cada))
+        self.registros = deque(maxlen=ventana)
+        self.pasos = 0
+        self._paso = None
+        self._tiempos = dict.fromkeys(FASES, 0)
+        self._contadores = dict.fromkeys(CONTADORES, 0)
+        self._ultima = None
+        self._archivo = open(salida, 'w', newline='') if salida is not None else None
+        self._escritor = None
+        if self._archivo is not None and formato == 'csv':
+            self._escritor = csv.writer(self._archivo)
+            self._escritor.writerow(['paso'] + [f't_{fase}' for fase in FASES] + list(CONTADORES))
+
+    def iniciarPaso(self, paso):
+        """
+        Cierra el paso anterior, si lo hay, y empieza a medir el paso `paso`.
+        """
+        if self._paso is not None:
+            self._terminarPaso()
+        self._paso = paso
+        self._ultima = time.perf_counter_ns()
+
+    def marcar(self, fase):
+        """
+        Suma a `fase` el tiempo transcurrido desde la marca anterior.
+        """
+        ahora = time.perf_counter_ns()
+        if self._ultima is not None:
+            self._tiempos[fase] += ahora - self._ultima
+        self._ultima = ahora
+
+    def contar(self, nombre, valor):
+        """
+        Suma `valor` al contador `nombre` del paso actual.
+        """
+        self._contadores[nombre] += valor
+
+    def _terminarPaso(self):
+        registro = {'paso': self._paso}
+        for fase in FASES:
+            registro[fase] = self._tiempos[fase] * 1e-9
+            self._tiempos[fase] = 0
+        for nombre in CONTADORES:
+            registro[nombre] = self._contadores[nombre]
+            self._contadores[nombre] = 0
+        self.registros.append(registro)
+        self.pasos += 1
+        self._paso = None
+        self._ultima = None
+        if self._archivo is not None and self.pasos % self.cada == 0:
+            if self._escritor is not None:
+                self._escritor.writerow([registro['paso']] + [registro[f] for f in FASES] + [registro[c] for c in CONTADORES])
+            else:
+                self._archivo.write(json.dumps(registro) + '\n')
+
+    def resumen(self):
+        """
+        Resume los pasos de la ventana móvil.
+
+        Returns:
+            dict: Cantidad de pasos; para cada fase, el tiempo medio y máximo por paso y la fracción del tiempo total; y para cada contador, su media por paso.
+        """
+        if self._paso is not None:
+            self._terminarPaso()
+        n = len(self.registros)
+        if n == 0:
+            return {'pasos': 0, 'fases': {}, 'contadores': {}}
+        totales = {fase: sum(r[fase] for r in self.registros) for fase in FASES}
+        total = sum(totales.values()) or 1.0
+        fases = {fase: {'media': totales[fase] / n,
+                        'max': max(r[fase] for r in self.registros),
+                        'fraccion': totales[fase] / total} for fase in FASES}
+        contadores = {nombre: sum(r[nombre] for r in self.registros) / n for nombre in CONTADORES}
+        return {'pasos': n, 'segundos_por_paso': total / n, 'fases': fases, 'contadores': contadores}
+
+    def cerrar(self):
+        """
+        Cierra el paso en curso y el archivo de salida.
+        """
+        if self._paso is not None:
+            self._terminarPaso()
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
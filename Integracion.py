@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""Integración con paso de tiempo adaptativo para el motor de pasos. El módulo contiene las siguientes funciones:
+
+- `subpasos_necesarios` - Calcula en cuántos subpasos hay que dividir un paso para que ningún disco avance más que una fracción de su radio.
+- `pares_rapidos` - Encuentra los pares que incluyen a un disco rápido y que pueden llegar a tocarse durante el paso.
+- `paso_adaptativo` - Avanza un paso dividiéndolo en subpasos iguales para todos los discos.
+- `paso_subpasos` - Avanza un paso en el que solo los choques de los discos rápidos se revisan en cada subpaso.
+
+En ambos casos `dt` sigue siendo el intervalo entre muestras de la simulación; el paso con que se integra se elige en cada paso a partir de la rapidez de los discos, de modo que un disco rápido no atraviese a otro ni produzca superposiciones grandes.
+"""
+
+import numpy as np
+
+from Colisiones import RejillaCeldas, _canonicos, envolver, imagen_minima, rebotar_paredes, resolver_pares
+from Instrumentacion import NULA
+
+INTEGRADORES = ('fijo', 'adaptativo', 'subpasos')
+
+# Hasta esta cantidad de discos rápidos, `pares_rapidos` los compara directamente con todos los discos
+MAX_DIRECTOS = 16
+
+
+def _bordes(estado, ancho, altura, periodico):
+    """
+    Choques con las paredes o, con bordes periódicos, envoltura de las posiciones. Devuelve los rebotes y el impulso transferido a las paredes.
+    """
+    if periodico:
+        envolver(estado.pos, ancho, altura)
+        return 0, 0.0
+    return rebotar_paredes(estado.pos, estado.vel, estado.radios, ancho, altura, estado.masas)
+
+
+def _avance_relativo(vel, radios, dt):
+    """
+    Distancia que recorre cada disco en `dt`, medida en radios del propio disco.
+    """
+    return np.hypot(vel[:, 0], vel[:, 1]) * dt / radios
+
+
+def subpasos_necesarios(vel, radios, dt, fraccion, maximo):
+    """
+    Calcula en cuántos subpasos iguales hay que dividir `dt` para que ningún disco avance más de `fraccion` de su radio en un subpaso.
+
+    Args:
+        vel (array): Velocidades de los discos, de forma (N, 2)
+        radios (array): Radios de los discos, de forma (N,)
+        dt (float): Paso de tiempo a dividir
+        fraccion (float): Avance máximo por subpaso, en radios del disco
+        maximo (int): Cantidad máxima de subpasos
+
+    Returns:
+        int: Cantidad de subpasos, entre 1 y `maximo`.
+    """
+    if len(radios) == 0:
+        return 1
+    necesarios = int(np.ceil(_avance_relativo(vel, radios, dt).max() / fraccion))
+    return min(max(1, necesarios), maximo)
+
+
+def pares_rapidos(pos, vel, radios, dt, rapidos, ancho, altura, periodico=False):
+    """
+    Encuentra los pares de discos con al menos un disco rápido que pueden tocarse durante `dt`: aquellos cuya distancia no supera la suma de sus radios más lo que ambos pueden recorrer en `dt`.
+
+    Args:
+        pos (array): Posiciones de los discos, de forma (N, 2)
+        vel (array): Velocidades de los discos, de forma (N, 2)
+        radios (array): Radios de los discos, de forma (N,)
+        dt (float): Duración del paso
+        rapidos (array): Índices de los discos rápidos
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        periodico (bool): Si los bordes de la caja son periódicos
+
+    Returns:
+        array: Arreglo de forma (M, 2) con los pares `(i, j)`, con `i < j` y en orden lexicográfico.
+    """
+    alcance = radios + np.hypot(vel[:, 0], vel[:, 1]) * dt
+    if len(rapidos) <= MAX_DIRECTOS:
+        # Pocos discos rápidos: compararlos con todos cuesta menos que ordenar todos los discos en una cuadrícula
+        dx = pos[None, :, 0] - pos[rapidos, None, 0]
+        dy = pos[None, :, 1] - pos[rapidos, None, 1]
+        if periodico:
+            dx = imagen_minima(dx, ancho)
+            dy = imagen_minima(dy, altura)
+        a, j = np.nonzero(dx**2 + dy**2 <= (alcance[rapidos, None] + alcance[None, :])**2)
+    else:
+        rejilla = RejillaCeldas(ancho, altura, float(alcance[rapidos].max() + alcance.max()), periodico)
+        a, j = rejilla.pares_cruzados(pos[rapidos], alcance[rapidos], pos, alcance)
+    i = rapidos[a]
+    es_rapido = np.zeros(len(pos), dtype=bool)
+    es_rapido[rapidos] = True
+    # Un par entre dos discos rápidos aparece desde ambos; se conserva una sola vez
+    conservar = (i != j) & (~es_rapido[j] | (i < j))
+    return _canonicos(i[conservar], j[conservar])
+
+
+def paso_adaptativo(estado, dt, ancho, altura, fase_amplia, fraccion=0.25, maximo=64, medidor=NULA, periodico=False,
+                    resolver=resolver_pares):
+    """
+    Avanza `dt` en subpasos iguales para todos los discos. La cantidad de subpasos se elige a partir de la rapidez máxima, de modo que ningún disco avance más de `fraccion` de su radio en un subpaso. Cada subpaso es un paso completo: mover, paredes, fase amplia y choques.
+
+    Args:
+        estado (EstadoDiscos): Estado de los discos. Se modifica en el lugar.
+        dt (float): Duración del paso
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        fase_amplia (RejillaCeldas): Fase amplia de la simulación
+        fraccion (float): Avance máximo por subpaso, en radios del disco
+        maximo (int): Cantidad máxima de subpasos
+        medidor (Instrumentacion): Medidor de las fases del paso
+        periodico (bool): Si los bordes de la caja son periódicos en lugar de paredes
+        resolver (callable): Función que resuelve los choques, `Colisiones.resolver_pares` o `Colisiones.resolver_lote`
+
+    Returns:
+        tuple: Choques con las paredes, impulso transferido a las paredes, choques entre discos y cantidad de subpasos.
+    """
+    subpasos = subpasos_necesarios(estado.vel, estado.radios, dt, fraccion, maximo)
+    h = dt / subpasos
+    caja = (ancho, altura) if periodico else None
+    rebotes = choques = 0
+    impulso = 0.0
+    for _ in range(subpasos):
+        estado.pos += estado.vel * h
+        medidor.marcar('mover')
+        r, p = _bordes(estado, ancho, altura, periodico)
+        rebotes += r
+        impulso += p
+        medidor.marcar('paredes')
+        pares = fase_amplia.pares(estado.pos, estado.radios)
+        choques += resolver(estado.pos, estado.vel, estado.radios, pares, estado.masas, caja)
+        medidor.marcar('resolver')
+    medidor.contar('choques_pared', rebotes)
+    medidor.contar('choques_discos', choques)
+    return rebotes, impulso, choques, subpasos
+
+
+def paso_subpasos(estado, dt, ancho, altura, fase_amplia, fraccion=0.25, maximo=64, medidor=NULA, periodico=False,
+                  resolver=resolver_pares):
+    """
+    Avanza `dt` revisando en cada subpaso solo los choques de los discos rápidos, los que avanzarían más de `fraccion` de su radio en `dt`.
+
+    Al empezar el paso se buscan, una sola vez, los pares con algún disco rápido que pueden tocarse durante el paso (`pares_rapidos`). Luego todos los discos avanzan en subpasos, lo que es barato, pero en cada subpaso solo se revisan esos pares. Al final del paso, en lugar de esa revisión, la fase amplia completa resuelve todos los choques, incluidos los de discos lentos, que en todo el paso no avanzan más de `fraccion` de su radio. Si no hay discos rápidos, es un paso normal.
+    Si un choque vuelve rápido a un disco lento, o acelera a un disco rápido más allá de la rapidez con la que se buscaron sus pares, en medio del paso se vuelven a buscar sus pares para el resto del paso; si además los subpasos que quedan lo dejarían avanzar más de `fraccion` de su radio, se acortan. En total nunca se usan más de `maximo` subpasos (o los que ya se habían decidido al empezar el paso).
+
+    Args:
+        estado (EstadoDiscos): Estado de los discos. Se modifica en el lugar.
+        dt (float): Duración del paso
+        ancho (float): Ancho del espacio limitado
+        altura (float): Alto del espacio limitado
+        fase_amplia (RejillaCeldas): Fase amplia de la simulación
+        fraccion (float): Avance máximo por subpaso, en radios del disco
+        maximo (int): Cantidad máxima de subpasos
+        medidor (Instrumentacion): Medidor de las fases del paso
+        periodico (bool): Si los bordes de la caja son periódicos en lugar de paredes
+        resolver (callable): Función que resuelve los choques, `Colisiones.resolver_pares` o `Colisiones.resolver_lote`
+
+    Returns:
+        tuple: Choques con las paredes, impulso transferido a las paredes, choques entre discos y cantidad de subpasos.
+    """
+    pos, vel, radios, masas = estado.pos, estado.vel, estado.radios, estado.masas
+    rapidez = np.hypot(vel[:, 0], vel[:, 1])
+    es_rapido = rapidez * dt / radios > fraccion
+    rapidos = np.flatnonzero(es_rapido)
+    # Rapidez con la que se buscaron los pares de cada disco rápido; 0 si el disco no tiene pares propios
+    cubierta = np.where(es_rapido, rapidez, 0.0)
+    subpasos = subpasos_necesarios(vel[rapidos], radios[rapidos], dt, fraccion, maximo)
+    candidatos = pares_rapidos(pos, vel, radios, dt, rapidos, ancho, altura, periodico) if len(rapidos) else None
+    medidor.marcar('pares')
+    h = dt / subpasos
+    caja = (ancho, altura) if periodico else None
+    rebotes = choques = 0
+    impulso = 0.0
+    hechos = 0
+    restantes = subpasos
+    while restantes:
+        pos += vel * h
+        hechos += 1
+        restantes -= 1
+        medidor.marcar('mover')
+        r, p = _bordes(estado, ancho, altura, periodico)
+        rebotes += r
+        impulso += p
+        medidor.marcar('paredes')
+        if candidatos is None or len(candidatos) == 0 or restantes == 0:
+            continue  # el último subpaso lo cubre la fase amplia completa
+        i, j = candidatos[:, 0], candidatos[:, 1]
+        d = pos[j] - pos[i]
+        if periodico:
+            d = imagen_minima(d, np.array(caja))
+        d2 = (d**2).sum(axis=1)
+        contacto = (d2 <= (radios[i] + radios[j])**2) & (d2 > 0)
+        if not contacto.any():
+            continue
+        choques += resolver(pos, vel, radios, candidatos[contacto], masas, caja)
+        medidor.marcar('resolver')
+
+        # Un choque puede volver rápido a un disco lento o acelerar a uno rápido más allá de la rapidez con la que
+        # se buscaron sus pares: se vuelven a buscar sus pares para el resto del paso
+        resto = restantes * h
+        chocados = np.unique(candidatos[contacto])
+        nueva = np.hypot(vel[chocados, 0], vel[chocados, 1])
+        acelerados = (nueva * dt / radios[chocados] > fraccion) & (nueva > cubierta[chocados])
+        nuevos = chocados[acelerados]
+        if len(nuevos):
+            cubierta[nuevos] = nueva[acelerados]
+            agregados = pares_rapidos(pos, vel, radios, resto, nuevos, ancho, altura, periodico)
+            # Los pares se unen como claves enteras `i * n + j`: ordenar un arreglo plano es mucho más rápido que `axis=0`
+            n = len(pos)
+            claves = np.union1d(candidatos[:, 0] * n + candidatos[:, 1], agregados[:, 0] * n + agregados[:, 1])
+            candidatos = np.stack(np.divmod(claves, n), axis=1)
+            medidor.marcar('pares')
+            # Si los subpasos que quedan son largos para la nueva rapidez, se acortan, sin pasar de `maximo` en total
+            necesarios = subpasos_necesarios(vel[nuevos], radios[nuevos], resto, fraccion, max(restantes, maximo - hechos))
+            if necesarios > restantes:
+                restantes = necesarios
+                h = resto / restantes
+    pares = fase_amplia.pares(pos, radios)
+    choques += resolver(pos, vel, radios, pares, masas, caja)
+    medidor.marcar('resolver')
+    medidor.contar('choques_pared', rebotes)
+    medidor.contar('choques_discos', choques)
+    return rebotes, impulso, choques, hechos
@@ -0,0 +1,481 @@
+#!/usr/bin/env python
+"""Física en un proceso aparte y visor en vivo conectados por memoria compartida. El módulo contiene las siguientes clases y funciones:
+
+- `AnilloCuadros` - Anillo de cuadros en `multiprocessing.shared_memory` donde un proceso publica las posiciones de los discos y otros leen el último cuadro completo sin copiarlo.
+- `FisicaEnProceso` - Avanza una `DiscoSimulation` en otro proceso, lo más rápido posible, y publica un cuadro cada tantos pasos.
+- `mirar` - Anima con matplotlib el último cuadro de un anillo; si el dibujo es más lento que la física, salta los cuadros intermedios.
+- `main` - Punto de entrada de la línea de comandos para conectarse a un anillo publicado por otro proceso.
+
+Cada ranura del anillo está protegida por un contador de secuencia (*seqlock*): quien publica lo incrementa antes de escribir, y queda impar, y de nuevo al terminar, y queda par. Un lector toma la ranura del último cuadro publicado solo si su contador es par, la copia y después comprueba que el contador no cambió; si cambió, el cuadro se sobrescribió mientras lo copiaba y lo descarta sin dibujarlo. Quien publica nunca espera a los lectores, así que un visor lento o detenido no frena la simulación, y los visores se pueden conectar y desconectar en cualquier momento.
+"""
+
+import json
+import multiprocessing as mp
+import os
+import sys
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from Instrumentacion import NULA
+
+# Enteros de la cabecera: largo de los metadatos, cuadros publicados, si quien publica terminó y uno reservado
+_CABECERA = 4
+_LARGO, _ESCRITOS, _TERMINADO = 0, 1, 2
+
+
+def _abrir(nombre):
+    """
+    Abre un bloque de memoria compartida existente sin registrarlo para que se borre al salir de este proceso; solo lo borra quien lo creó.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=nombre, track=False)
+    from multiprocessing import resource_tracker
+
+    memoria = SharedMemory(name=nombre)
+    resource_tracker.unregister(memoria._name, 'shared_memory')
+    return memoria
+
+
+class AnilloCuadros:
+    """
+    Clase utilizada para compartir los cuadros de una simulación entre procesos.
+
+    El bloque de memoria compartida contiene una cabecera, los metadatos en JSON (cantidad de discos, ranuras, tipo de dato, tamaño de la caja y colores), el contador de secuencia, el paso y el tiempo de cada ranura, los radios de los discos y las ranuras con las posiciones. Se crea con `crear` o `para` y se abre desde otro proceso con `AnilloCuadros(nombre)`.
+    """
+
+    def __init__(self, nombre, _memoria=None, _creador=False):
+        """
+        Se conecta a un anillo existente.
+
+        Args:
+            nombre (str): Nombre del bloque de memoria compartida, por ejemplo `anillo.nombre` del proceso que lo creó
+
+        Example:
+            >>> anillo = AnilloCuadros('discos')
+
+            >>> numero, paso, tiempo, pos = anillo.leer()
+
+            >>> Lee el último cuadro publicado en el anillo 'discos'.
+        """
+        self._creador = _creador
+        self._memoria = _memoria if _memoria is not None else _abrir(nombre)
+        buf = self._memoria.buf
+        largo = int(np.ndarray((_CABECERA,), dtype=np.int64, buffer=buf)[_LARGO])
+        self.metadatos = json.loads(bytes(buf[8 * _CABECERA:8 * _CABECERA + largo]).decode())
+        n, ranuras = self.metadatos['N'], self.metadatos['ranuras']
+        desplazamiento = 8 * _CABECERA + 8 * (-(-largo // 8))
+        self._cabecera = np.ndarray((_CABECERA,), dtype=np.int64, buffer=buf)
+        self._secuencias = np.ndarray((ranuras,), dtype=np.int64, buffer=buf, offset=desplazamiento)
+        self._pasos = np.ndarray((ranuras,), dtype=np.int64, buffer=buf, offset=desplazamiento + 8 * ranuras)
+        self._tiempos = np.ndarray((ranuras,), dtype=np.float64, buffer=buf, offset=desplazamiento + 16 * ranuras)
+        self.radios = np.ndarray((n,), dtype=np.float64, buffer=buf, offset=desplazamiento + 24 * ranuras)
+        self._cuadros = np.ndarray((ranuras, n, 2), dtype=np.dtype(self.metadatos['dtype']), buffer=buf,
+                                   offset=desplazamiento + 24 * ranuras + 8 * n)
+        self.nombre = self._memoria.name
+        self.ranuras = ranuras
+        self._leida = None
+
+    @staticmethod
+    def _tamano(largo, n, ranuras, dtype):
+        return 8 * _CABECERA + 8 * (-(-largo // 8)) + 24 * ranuras + 8 * n + ranuras * n * 2 * np.dtype(dtype).itemsize
+
+    @classmethod
+    def crear(cls, radios, ranuras=8, dtype=np.float64, nombre=None, metadatos=None):
+        """
+        Crea un anillo nuevo. Quien lo crea es el único que lo borra, con `cerrar`.
+
+        Args:
+            radios (array): Radios de los discos, de forma (N,)
+            ranuras (int): Cantidad de cuadros que guarda el anillo. Con más ranuras, un lector lento tarda más en ver sobrescrito el cuadro que está leyendo.
+            dtype (type): Tipo de dato de las posiciones
+            nombre (str): Nombre del bloque de memoria compartida. Si es None lo elige el sistema.
+            metadatos (dict): Datos adicionales para los visores, por ejemplo `ancho`, `altura` y `colores`
+
+        Returns:
+            AnilloCuadros: El anillo, todavía sin cuadros.
+        """
+        if ranuras < 2:
+            raise ValueError("El anillo necesita al menos 2 ranuras")
+        radios = np.asarray(radios, dtype=np.float64)
+        datos = dict(metadatos or {}, N=len(radios), ranuras=int(ranuras), dtype=np.dtype(dtype).name)
+        texto = json.dumps(datos).encode()
+        memoria = SharedMemory(name=nombre, create=True, size=cls._tamano(len(texto), len(radios), ranuras, dtype))
+        memoria.buf[:8 * _CABECERA] = bytes(8 * _CABECERA)
+        np.ndarray((_CABECERA,), dtype=np.int64, buffer=memoria.buf)[_LARGO] = len(texto)
+        memoria.buf[8 * _CABECERA:8 * _CABECERA + len(texto)] = texto
+        anillo = cls(memoria.name, _memoria=memoria, _creador=True)
+        anillo._secuencias[:] = 0
+        anillo.radios[:] = radios
+        return anillo
+
+    @classmethod
+    def para(cls, sim, ranuras=8, nombre=None):
+        """
+        Crea un anillo para los discos de `sim`, con el tamaño de la caja y los colores como metadatos, y publica el estado actual como primer cuadro.
+
+        Example:
+            >>> anillo = AnilloCuadros.para(sim, nombre='discos')
+
+            >>> Otro proceso puede mirarlo con `python -m Monitor discos`.
+        """
+        anillo = cls.crear(sim.estado.radios, ranuras, sim.estado.pos.dtype, nombre,
+                           {'ancho': sim.ancho, 'altura': sim.altura, 'colores': list(sim.estado.colores)})
+        anillo.publicar(sim)
+        return anillo
+
+    @property
+    def escritos(self):
+        """
+        Cantidad de cuadros publicados desde que se creó el anillo.
+        """
+        return int(self._cabecera[_ESCRITOS])
+
+    @property
+    def terminado(self):
+        """
+        Si quien publica ya cerró el anillo.
+        """
+        return bool(self._cabecera[_TERMINADO])
+
+    def publicar(self, sim):
+        """
+        Escribe las posiciones actuales de `sim` en la ranura siguiente. Nunca espera a los lectores.
+        """
+        escritos = int(self._cabecera[_ESCRITOS])
+        ranura = escritos % self.ranuras
+        self._secuencias[ranura] += 1
+        self._cuadros[ranura] = sim.estado.pos
+        self._pasos[ranura] = sim.paso_actual
+        self._tiempos[ranura] = sim.tiempo
+        self._secuencias[ranura] += 1
+        self._cabecera[_ESCRITOS] = escritos + 1
+
+    def leer(self, intentos=8):
+        """
+        Devuelve el último cuadro completo, como una vista sobre la memoria compartida, sin copiarlo. La vista puede sobrescribirse si quien publica da toda la vuelta al anillo; después de usarla se comprueba con `intacto`.
+
+        Args:
+            intentos (int): Veces que se reintenta si el último cuadro se está escribiendo
+
+        Returns:
+            tuple: El número del cuadro (desde 0), el paso, el tiempo y las posiciones, de forma (N, 2). Si todavía no hay cuadros, o no se encontró uno completo, None.
+        """
+        for _ in range(intentos):
+            escritos = int(self._cabecera[_ESCRITOS])
+            if escritos == 0:
+                return None
+            ranura = (escritos - 1) % self.ranuras
+            secuencia = int(self._secuencias[ranura])
+            if secuencia % 2:
+                continue
+            paso, tiempo = int(self._pasos[ranura]), float(self._tiempos[ranura])
+            if int(self._secuencias[ranura]) != secuencia:
+                continue
+            self._leida = (ranura, secuencia)
+            return escritos - 1, paso, tiempo, self._cuadros[ranura]
+        return None
+
+    def intacto(self):
+        """
+        Indica si el último cuadro devuelto por `leer` sigue sin sobrescribirse, es decir, si lo que se hizo con él usó un cuadro completo.
+        """
+        if self._leida is None:
+            return False
+        ranura, secuencia = self._leida
+        return int(self._secuencias[ranura]) == secuencia
+
+    def cerrar(self):
+        """
+        Se desconecta del anillo. Si este proceso lo creó, marca el anillo como terminado y lo borra; los visores conectados conservan su vista hasta que se desconectan.
+        """
+        if self._memoria is None:
+            return
+        if self._creador:
+            self._cabecera[_TERMINADO] = 1
+        self._leida = None
+        del self._cabecera, self._secuencias, self._pasos, self._tiempos, self.radios, self._cuadros
+        self._memoria.close()
+        if self._creador:
+            self._memoria.unlink()
+        self._memoria = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# Lo que acompaña a la simulación y escribe archivos mientras avanza: se lleva al proceso de la física y vuelve al cerrar
+_ACOMPANANTES = ('grabador', 'observables', 'medidor', 'puntos_control')
+# Atributos que no viajan de vuelta: el archivo abierto sigue siendo el del padre
+_PROPIOS = ('_archivo', '_escritor')
+
+
+def _acompanantes(sim):
+    """
+    Devuelve los objetos activos de `sim` que registran lo que pasa en cada paso (grabación, observables, instrumentación y puntos de control automáticos).
+    """
+    activos = {}
+    for nombre in _ACOMPANANTES:
+        objeto = getattr(sim, nombre)
+        if objeto is not None and objeto is not NULA:
+            activos[nombre] = objeto
+    return activos
+
+
+def _estado_acompanantes(sim):
+    """
+    Cierra la parte de los acompañantes que vive en este proceso y devuelve su estado para que el padre lo continúe.
+    """
+    estados = {}
+    for nombre, objeto in _acompanantes(sim).items():
+        if nombre == 'grabador':
+            # Escribe el bloque en curso y la cabecera; el padre reabre el último bloque para seguir grabando
+            objeto.cerrar()
+        archivo = getattr(objeto, '_archivo', None)
+        if archivo is not None:
+            archivo.flush()
+        estados[nombre] = {clave: valor for clave, valor in vars(objeto).items() if clave not in _PROPIOS}
+    return estados
+
+
+def _fisica(sim, nombre, subpasos, pasos, detener, conexion):
+    """
+    Ciclo del proceso de la física: avanza `subpasos` pasos, publica un cuadro y repite hasta que se pide detenerse o se completan `pasos`. Al terminar devuelve por `conexion` lo necesario para actualizar la simulación del proceso padre.
+    """
+    # Los procesos hijos comparten el registro de memoria compartida del padre, así que se abre sin `_abrir`
+    anillo = AnilloCuadros(nombre, _memoria=SharedMemory(name=nombre))
+    # El padre ya tiene las filas del historial anteriores: solo se devuelven las nuevas
+    historial_inicial = len(sim._historial_x)
+    try:
+        restantes = pasos
+        while not detener.is_set() and (restantes is None or restantes > 0):
+            k = subpasos if restantes is None else min(subpasos, restantes)
+            sim.avanzar(k)
+            anillo.publicar(sim)
+            if restantes is not None:
+                restantes -= k
+        anillo._cabecera[_TERMINADO] = 1
+        conexion.send({
+            'pos': sim.estado.pos, 'vel': sim.estado.vel, 'tiempo': sim.tiempo, 'paso_actual': sim.paso_actual,
+            'contadores': sim.contadores, 'rng': sim.rng.bit_generator.state,
+            'historial_x': sim._historial_x[historial_inicial:],
+            'histogramas': {clave: (hist.conteos, hist.fuera) for clave, hist in sim.histogramas.items()},
+            'acompanantes': _estado_acompanantes(sim),
+        })
+    finally:
+        anillo.cerrar()
+
+
+class FisicaEnProceso:
+    """
+    Clase utilizada para avanzar una `DiscoSimulation` en un proceso aparte mientras otro proceso la dibuja.
+
+    El proceso de la física trabaja sobre su propia copia de la simulación y solo publica posiciones en un `AnilloCuadros`; no espera nunca al visor. Al cerrar, el estado, el tiempo, los contadores, los histogramas, el historial de posiciones y el generador aleatorio vuelven a `sim`, que queda igual que si hubiera avanzado en este proceso. Con el motor de eventos la cola de eventos no vuelve: se predice de nuevo al seguir avanzando.
+    La grabación de la trayectoria, los observables, la instrumentación y los puntos de control automáticos activos se llevan al proceso de la física: mientras corre, `sim` no los tiene, y al cerrar vuelven con todo lo que registraron, listos para seguir. Como sus archivos quedan abiertos en los dos procesos, esto solo es posible cuando los procesos se crean con `fork`.
+    """
+
+    def __init__(self, sim, subpasos=1, ranuras=8, nombre=None, pasos=None):
+        """
+        Crea el anillo y arranca el proceso de la física.
+
+        Args:
+            sim (DiscoSimulation): Simulación con los discos ya creados
+            subpasos (int): Pasos de la simulación entre cuadros publicados
+            ranuras (int): Ranuras del anillo
+            nombre (str): Nombre del anillo, para que otros procesos puedan conectarse con `AnilloCuadros(nombre)`. Si es None lo elige el sistema.
+            pasos (int): Si no es None, la física se detiene sola después de tantos pasos
+
+        Example:
+            >>> with FisicaEnProceso(sim, subpasos=10) as fisica:
+            >>>     mirar(fisica.anillo)
+
+            >>> Dibuja la simulación mientras avanza en otro proceso, un cuadro cada 10 pasos como máximo.
+        """
+        if subpasos < 1:
+            raise ValueError("subpasos debe ser al menos 1")
+        contexto = mp.get_context()
+        acompanantes = _acompanantes(sim)
+        if acompanantes and contexto.get_start_method() != 'fork':
+            raise ValueError(f"Con procesos creados con {contexto.get_start_method()!r} no se puede llevar "
+                             f"{', '.join(acompanantes)} al proceso de la física; desactívelos antes")
+        self.sim = sim
+        self.anillo = AnilloCuadros.para(sim, ranuras, nombre)
+        for objeto in acompanantes.values():
+            # Nada pendiente en el búfer del padre: si no, se escribiría dos veces
+            archivo = getattr(objeto, '_archivo', None)
+            if archivo is not None:
+                archivo.flush()
+        self._detener = contexto.Event()
+        self._conexion, hijo = contexto.Pipe(duplex=False)
+        self._proceso = contexto.Process(target=_fisica, daemon=True,
+                                         args=(sim, self.anillo.nombre, subpasos, pasos, self._detener, hijo))
+        self._proceso.start()
+        hijo.close()
+        # Mientras la física corre, el padre no debe escribir en esos archivos
+        self._acompanantes = acompanantes
+        for nombre in acompanantes:
+            setattr(sim, nombre, NULA if nombre == 'medidor' else None)
+        if 'medidor' in acompanantes:
+            sim.fase_amplia.medidor = NULA
+
+    @property
+    def vivo(self):
+        """
+        Si el proceso de la física sigue avanzando.
+        """
+        return self._proceso is not None and self._proceso.is_alive() and not self._detener.is_set()
+
+    def cerrar(self):
+        """
+        Detiene el proceso de la física, copia su estado final a `sim` y borra el anillo.
+
+        Returns:
+            DiscoSimulation: La simulación actualizada.
+        """
+        if self._proceso is None:
+            return self.sim
+        self._detener.set()
+        try:
+            final = self._conexion.recv()
+        except EOFError:
+            raise RuntimeError("El proceso de la física terminó sin devolver su estado") from None
+        finally:
+            self._proceso.join()
+            self._proceso = None
+            self._conexion.close()
+            self.anillo.cerrar()
+
+        sim = self.sim
+        sim.estado.pos[...] = final['pos']
+        sim.estado.vel[...] = final['vel']
+        sim.tiempo = final['tiempo']
+        sim.paso_actual = final['paso_actual']
+        sim.contadores.update(final['contadores'])
+        sim.rng.bit_generator.state = final['rng']
+        sim._historial_x.extend(final['historial_x'])
+        for nombre, (conteos, fuera) in final['histogramas'].items():
+            sim.histogramas[nombre].conteos[...] = conteos
+            sim.histogramas[nombre].fuera = fuera
+        sim._eventos = None
+        for nombre, objeto in self._acompanantes.items():
+            vars(objeto).update(final['acompanantes'][nombre])
+            if nombre == 'grabador' and objeto.bloques:
+                objeto._bloque = np.lib.format.open_memmap(os.path.join(objeto.directorio, objeto.bloques[-1]), mode='r+')
+            setattr(sim, nombre, objeto)
+        if 'medidor' in self._acompanantes:
+            sim.fase_amplia.medidor = sim.medidor
+        return sim
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def mirar(anillo, intervalo=30, titulo=None):
+    """
+    Anima los cuadros de un anillo hasta que se cierra la ventana. En cada cuadro de la animación se dibuja el último cuadro publicado, así que los intermedios se saltan cuando el dibujo no da abasto. Cerrar la ventana solo desconecta el visor.
+
+    Args:
+        anillo (AnilloCuadros | str): Anillo, o su nombre para conectarse desde otro proceso
+        intervalo (float): Milisegundos entre cuadros de la animación
+        titulo (str): Título de la figura. Si es None se indica la cantidad de discos.
+
+    Returns:
+        dict: Cuadros dibujados (`dibujados`), saltados porque la física iba más rápido (`saltados`) y descartados porque se sobrescribieron mientras se leían (`descartados`).
+
+    Example:
+        >>> mirar('discos')
+
+        >>> Abre una ventana que sigue en vivo la simulación publicada en el anillo 'discos'.
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    from matplotlib.collections import EllipseCollection
+
+    propio = isinstance(anillo, str)
+    if propio:
+        anillo = AnilloCuadros(anillo)
+    datos = anillo.metadatos
+    titulo = titulo or f'Colisión de discos en 2D\n{datos["N"]} discos'
+    estadisticas = {'dibujados': 0, 'saltados': 0, 'descartados': 0}
+    ultimo = [-1]
+
+    fig, ax = plt.subplots()
+    ax.set_xlim(-datos['ancho'] / 2, datos['ancho'] / 2)
+    ax.set_ylim(-datos['altura'] / 2, datos['altura'] / 2)
+    ax.set_aspect('equal')
+    ax.set_xlabel('X')
+    ax.set_ylabel('Y')
+    ax.set_title(titulo)
+    diametros = 2 * anillo.radios
+    coleccion = EllipseCollection(diametros, diametros, np.zeros(len(diametros)), units='xy',
+                                  offsets=np.zeros((len(diametros), 2)), offset_transform=ax.transData,
+                                  facecolors=datos.get('colores') or 'tab:blue', alpha=0.7)
+    ax.add_collection(coleccion)
+    # Copia propia del visor: el cuadro se valida sobre ella antes de dibujarlo
+    copia = np.empty((datos['N'], 2), dtype=np.float64)
+
+    def animar(_):
+        """
+        Dibuja el último cuadro completo del anillo, si es nuevo.
+        """
+        if anillo._memoria is None:
+            return [coleccion]
+        cuadro = anillo.leer()
+        if cuadro is None or cuadro[0] == ultimo[0]:
+            if anillo.terminado:
+                ax.set_title(f'{titulo}\n(simulación terminada)')
+            return [coleccion]
+        numero, paso, tiempo, pos = cuadro
+        copia[...] = pos
+        if not anillo.intacto():
+            # Se sobrescribió mientras se copiaba: queda el cuadro anterior
+            estadisticas['descartados'] += 1
+            return [coleccion]
+        coleccion.set_offsets(copia)
+        if ultimo[0] >= 0:
+            estadisticas['saltados'] += numero - ultimo[0] - 1
+        ultimo[0] = numero
+        estadisticas['dibujados'] += 1
+        ax.set_title(f'{titulo}\npaso {paso}, t = {tiempo:.3f}')
+        return [coleccion]
+
+    ani = animation.FuncAnimation(fig, animar, interval=intervalo, cache_frame_data=False)
+    try:
+        plt.show()
+    finally:
+        del ani
+        if propio:
+            anillo.cerrar()
+    return estadisticas
+
+
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos: se conecta a un anillo publicado por otro proceso y lo anima.
+
+    Example:
+        >>> python -m Discos_optimizado run --n 20000 --steps 1000000 --headless --publicar discos
+
+        >>> python -m Monitor discos
+
+        >>> El segundo comando abre un visor de la simulación que corre en el primero; se puede cerrar y volver a abrir sin detenerla.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Visor en vivo de una simulación que publica sus cuadros en memoria compartida.')
+    parser.add_argument('nombre', help='Nombre del anillo publicado')
+    parser.add_argument('--intervalo', type=float, default=30, help='Milisegundos entre cuadros de la animación')
+    args = parser.parse_args(argv)
+    estadisticas = mirar(args.nombre, args.intervalo)
+    print(f"{estadisticas['dibujados']} cuadros dibujados, {estadisticas['saltados']} saltados, "
+          f"{estadisticas['descartados']} descartados")
+
+
+if __name__ == "__main__":
+    main()
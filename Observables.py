@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""Observables termodinámicos calculados durante la simulación, sin guardar trayectorias. El módulo contiene:
+
+- `maxwell_boltzmann` - Probabilidad de cada columna de rapidez según la distribución de Maxwell–Boltzmann en dos dimensiones.
+- `Observables` - Acumula en cada paso lo necesario y, cada tantos pasos, emite un registro con la presión, la tasa de choques, el recorrido libre medio, la temperatura, la comparación con Maxwell–Boltzmann y la deriva de la energía y del momento.
+
+Cada paso solo cuesta sumar las rapideces a un histograma; todo lo demás se calcula al emitir un registro a partir de los contadores de la simulación (choques e impulso sobre las paredes).
+"""
+
+import csv
+import json
+
+import numpy as np
+
+from Histogramas import HistogramaAcumulado
+
+CAMPOS = ('paso', 'tiempo', 'energia', 'temperatura', 'presion', 'compresibilidad', 'tasa_choques',
+          'recorrido_libre', 'rapidez_media', 'distancia_mb', 'momento_x', 'momento_y', 'deriva_energia',
+          'deriva_momento')
+
+
+def maxwell_boltzmann(bordes, masas, temperatura):
+    """
+    Calcula la fracción de discos que la distribución de Maxwell–Boltzmann en dos dimensiones pone en cada columna de rapidez. Para un disco de masa m la distribución acumulada es `1 - exp(-m v² / 2kT)`; con masas distintas se promedia sobre los discos.
+
+    Args:
+        bordes (array): Bordes de las columnas de rapidez
+        masas (array): Masas de los discos
+        temperatura (float): Temperatura kT
+
+    Returns:
+        array: Probabilidad de cada columna.
+    """
+    valores, cuantos = np.unique(np.asarray(masas, dtype=float), return_counts=True)
+    acumulada = 1 - np.exp(-np.outer(valores, np.asarray(bordes)**2) / (2 * temperatura))
+    return (cuantos @ np.diff(acumulada, axis=1)) / cuantos.sum()
+
+
+class Observables:
+    """
+    Clase utilizada para medir observables termodinámicos mientras la simulación avanza.
+
+    En dos dimensiones, con N discos de energía cinética total E, la temperatura es `kT = E / N`. La presión es el impulso transferido a las paredes por unidad de longitud del borde y de tiempo; la compresibilidad `Z = P A / (N kT)` vale 1 para un gas ideal y crece con la densidad. La tasa de choques es la cantidad de choques por disco y por unidad de tiempo, y el recorrido libre medio es la rapidez media dividida por esa tasa.
+    Las paredes cambian el momento de los discos, así que en una caja cerrada solo la energía se conserva; con bordes periódicos se conservan ambos, pero al no haber paredes la presión y la compresibilidad quedan como NaN.
+    """
+
+    def __init__(self, cada=100, salida=None, formato=None, bins=100):
+        """
+        Args:
+            cada (int): Se emite un registro cada `cada` pasos, con los promedios de esos pasos
+            salida (str): Archivo donde se escriben los registros. Si es None solo se guardan en `registros`.
+            formato (str): `'csv'` o `'json'` (un objeto JSON por línea). Si es None se deduce de la extensión de `salida`.
+            bins (int): Columnas del histograma de rapidez que se compara con Maxwell–Boltzmann
+
+        Example:
+            >>> obs = sim.observar(cada=500, salida='observables.csv')
+
+            >>> sim.avanzar(100000)
+
+            >>> obs.registros[-1]['presion']
+
+            >>> Presión medida en los últimos 500 pasos.
+        """
+        if formato is None and salida is not None:
+            formato = 'json' if str(salida).endswith(('.json', '.jsonl')) else 'csv'
+        if formato not in (None, 'csv', 'json'):
+            raise ValueError(f"Formato desconocido: {formato!r}. Opciones: csv, json")
+        self.cada = max(1, int(cada))
+        self.bins = bins
+        self.registros = []
+        self._archivo = open(salida, 'w', newline='') if salida is not None else None
+        self._escritor = None
+        if self._archivo is not None and formato == 'csv':
+            self._escritor = csv.writer(self._archivo)
+            self._escritor.writerow(CAMPOS)
+        self._inicio = None
+
+    @staticmethod
+    def _energia_momento(estado):
+        # Las sumas se hacen en doble precisión aunque el estado esté en float32
+        masas = estado.masas.astype(np.float64, copy=False)
+        vel = estado.vel.astype(np.float64, copy=False)
+        energia = 0.5 * float(masas @ np.einsum('ij,ij->i', vel, vel))
+        momento = masas @ vel
+        escala = float(masas @ np.hypot(vel[:, 0], vel[:, 1]))
+        return energia, momento, escala
+
+    def iniciar(self, sim):
+        """
+        Toma el estado actual de `sim` como referencia de las derivas y empieza la primera ventana.
+        """
+        energia, momento, escala = self._energia_momento(sim.estado)
+        temperatura = energia / max(len(sim.estado), 1)
+        masa_min = float(sim.estado.masas.min(initial=1.0))
+        self._inicio = {'energia': energia, 'momento': momento, 'escala': escala or 1.0}
+        self._rango = (0.0, 5 * np.sqrt(2 * temperatura / masa_min) if temperatura > 0 else 1.0)
+        self._empezarVentana(sim)
+
+    def _empezarVentana(self, sim):
+        self._ventana = {'paso': sim.paso_actual, 'tiempo': sim.tiempo,
+                         'choques': sim.contadores['choques_discos'], 'impulso': sim.contadores['impulso_pared']}
+        self._rapidez = HistogramaAcumulado(self.bins, self._rango)
+
+    def registrar(self, sim):
+        """
+        Suma el paso actual de `sim`. Se llama al final de cada paso; cada `cada` pasos emite un registro.
+        """
+        if self._inicio is None:
+            self.iniciar(sim)
+        vel = sim.estado.vel
+        self._rapidez.agregar(np.hypot(vel[:, 0], vel[:, 1]))
+        if sim.paso_actual - self._ventana['paso'] >= self.cada:
+            self.emitir(sim)
+
+    def emitir(self, sim):
+        """
+        Calcula los observables de la ventana actual, los guarda en `registros` (y en el archivo de salida) y empieza una ventana nueva.
+
+        Returns:
+            dict: El registro emitido.
+        """
+        estado = sim.estado
+        n = max(len(estado), 1)
+        duracion = sim.tiempo - self._ventana['tiempo']
+        energia, momento, _ = self._energia_momento(estado)
+        temperatura = energia / n
+        area = sim.ancho * sim.altura
+        perimetro = 2 * (sim.ancho + sim.altura)
+
+        hist = self._rapidez
+        total = hist.conteos.sum() + hist.fuera
+        centros = (hist.bordes[:-1] + hist.bordes[1:]) / 2
+        rapidez_media = float(hist.conteos @ centros / total) if total else 0.0
+        esperada = maxwell_boltzmann(hist.bordes, estado.masas, temperatura) if temperatura > 0 else np.zeros(hist.bins)
+        observada = hist.conteos / total if total else np.zeros(hist.bins)
+        # Distancia de variación total entre el histograma de rapidez y Maxwell–Boltzmann (0 = idénticos)
+        distancia = 0.5 * (float(np.abs(observada - esperada).sum()) + (hist.fuera / total if total else 0.0))
+
+        if sim.periodico:
+            presion = float('nan')  # sin paredes no hay impulso que medir
+        else:
+            presion = (sim.contadores['impulso_pared'] - self._ventana['impulso']) / (perimetro * duracion) if duracion else 0.0
+        tasa = 2 * (sim.contadores['choques_discos'] - self._ventana['choques']) / (n * duracion) if duracion else 0.0
+        registro = {
+            'paso': sim.paso_actual,
+            'tiempo': sim.tiempo,
+            'energia': energia,
+            'temperatura': temperatura,
+            'presion': presion,
+            'compresibilidad': presion * area / (n * temperatura) if temperatura > 0 else 0.0,
+            'tasa_choques': tasa,
+            'recorrido_libre': rapidez_media / tasa if tasa else float('inf'),
+            'rapidez_media': rapidez_media,
+            'distancia_mb': distancia,
+            'momento_x': float(momento[0]),
+            'momento_y': float(momento[1]),
+            'deriva_energia': energia / self._inicio['energia'] - 1 if self._inicio['energia'] else 0.0,
+            'deriva_momento': float(np.hypot(*(momento - self._inicio['momento']))) / self._inicio['escala'],
+        }
+        self.registros.append(registro)
+        if self._archivo is not None:
+            if self._escritor is not None:
+                self._escritor.writerow([registro[c] for c in CAMPOS])
+            else:
+                self._archivo.write(json.dumps(registro) + '\n')
+            self._archivo.flush()
+        self._empezarVentana(sim)
+        return registro
+
+    def cerrar(self):
+        """
+        Cierra el archivo de salida.
+        """
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""Puntos de control para guardar y reanudar simulaciones largas. El módulo contiene las siguientes funciones y clases:
+
+- `guardar_punto` - Escribe el estado completo de una `DiscoSimulation` en un archivo `.npz`.
+- `cargar_punto` - Reconstruye la simulación a partir de un punto de control.
+- `PuntosAutomaticos` - Decide cuándo guardar un punto de control durante `avanzar`: cada tantos pasos o cada tantos segundos.
+
+El archivo guarda los arreglos del estado (posiciones, velocidades, radios, masas y colores), el estado del generador de números aleatorios, el tiempo, el paso, los contadores, los histogramas acumulados y, con el motor de eventos, la cola de eventos tal como está. Por eso una simulación reanudada continúa exactamente igual, bit a bit, que la original.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+VERSION = 1
+
+
+def _arreglos_histogramas(sim):
+    """
+    Devuelve la descripción de cada histograma (para la cabecera) y sus conteos (como arreglos).
+    """
+    descripcion = {}
+    arreglos = {}
+    for nombre, hist in sim.histogramas.items():
+        if hasattr(hist, 'rango_x'):
+            descripcion[nombre] = {'bins': list(hist.bins), 'rango_x': list(hist.rango_x), 'rango_y': list(hist.rango_y),
+                                   'fuera': int(hist.fuera)}
+        else:
+            descripcion[nombre] = {'bins': hist.bins, 'rango': list(hist.rango), 'fuera': int(hist.fuera)}
+        arreglos[f'hist_{nombre}'] = hist.conteos
+    return descripcion, arreglos
+
+
+def guardar_punto(sim, ruta):
+    """
+    Escribe el estado completo de la simulación. El archivo se escribe primero con otro nombre y luego se renombra, así que un corte durante la escritura nunca deja un punto de control a medias.
+
+    Args:
+        sim (DiscoSimulation): Simulación a guardar
+        ruta (str): Archivo de destino, normalmente con extensión `.npz`
+
+    Example:
+        >>> guardar_punto(sim, 'corrida.npz')
+
+        >>> Guarda la simulación; `cargar_punto('corrida.npz')` la reanuda.
+    """
+    histogramas, arreglos = _arreglos_histogramas(sim)
+    eventos = sim._eventos
+    cabecera = {
+        'version': VERSION,
+        'parametros': {
+            'N': sim.N, 'height': sim.altura, 'width': sim.ancho, 'dt': sim.pasoTemp, 'motor': sim.motor,
+            'bins': sim.bins, 'histogramas': list(sim._nombres_histogramas), 'historial': sim.historial,
+            'deteccion': sim.deteccion, 'piel': sim.piel,
+            'integrador': sim.integrador, 'fraccion': sim.fraccion, 'max_subpasos': sim.max_subpasos,
+            'periodico': sim.periodico, 'dtype': sim.dtype.name, 'resolucion': sim.resolucion,
+            'rango_rapidez': sim.rango_rapidez,
+        },
+        'rng': sim.rng.bit_generator.state,
+        'tiempo': float(sim.tiempo),
+        'paso_actual': int(sim.paso_actual),
+        'contadores': {nombre: valor.item() if hasattr(valor, 'item') else valor for nombre, valor in sim.contadores.items()},
+        'colores': sim.estado.colores,
+        'histogramas': histogramas,
+        'eventos': None if eventos is None else {
+            't': float(eventos.t),
+            'choques_discos': int(eventos.choques_discos),
+            'choques_pared': int(eventos.choques_pared),
+            'pares_revisados': int(eventos.pares_revisados),
+            'cruces': int(eventos.cruces),
+            'impulso_pared': float(eventos.impulso_pared),
+        },
+    }
+    arreglos.update({
+        'cabecera': np.array(json.dumps(cabecera)),
+        'radios_simulacion': sim.radios,
+        'pos': sim.estado.pos,
+        'vel': sim.estado.vel,
+        'radios': sim.estado.radios,
+        'masas': sim.estado.masas,
+    })
+    if sim.masas is not None:
+        arreglos['masas_simulacion'] = sim.masas
+    if sim.historial:
+        arreglos['historial_x'] = np.array(sim._historial_x).reshape(len(sim._historial_x), -1)
+    if eventos is not None:
+        arreglos['eventos_conteo'] = eventos.conteo
+        arreglos['eventos_celdas'] = eventos.celdas
+        arreglos['cola_t'] = np.array([e[0] for e in eventos.cola], dtype=float)
+        arreglos['cola_indices'] = np.array([e[1:] for e in eventos.cola], dtype=np.int64).reshape(-1, 4)
+
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'wb') as archivo:
+        np.savez(archivo, **arreglos)
+    os.replace(temporal, ruta)
+
+
+def cargar_punto(ruta):
+    """
+    Reconstruye una simulación guardada con `guardar_punto`. La trayectoria en curso y la instrumentación no se guardan; si hacen falta, se vuelven a activar después de cargar.
+
+    Args:
+        ruta (str): Archivo del punto de control
+
+    Returns:
+        DiscoSimulation: La simulación, lista para seguir avanzando.
+    """
+    from Discos_optimizado import DiscoSimulation, EstadoDiscos
+    from Eventos import MotorEventos
+    from Histogramas import HistogramaAcumulado, HistogramaAcumulado2D
+
+    with np.load(ruta, allow_pickle=False) as datos:
+        cabecera = json.loads(str(datos['cabecera']))
+        if cabecera['version'] != VERSION:
+            raise ValueError(f"Versión de punto de control no soportada: {cabecera['version']}")
+        parametros = cabecera['parametros']
+        masas = datos['masas_simulacion'] if 'masas_simulacion' in datos else None
+        sim = DiscoSimulation(parametros['N'], parametros['height'], parametros['width'], datos['radios_simulacion'],
+                              parametros['dt'], motor=parametros['motor'], bins=parametros['bins'],
+                              histogramas=tuple(parametros['histogramas']), historial=parametros['historial'],
+                              masas=masas, deteccion=parametros.get('deteccion', 'celdas'), piel=parametros.get('piel'),
+                              integrador=parametros.get('integrador', 'fijo'), fraccion=parametros.get('fraccion', 0.25),
+                              max_subpasos=parametros.get('max_subpasos', 64), periodico=parametros.get('periodico', False),
+                              dtype=parametros.get('dtype', 'float64'), resolucion=parametros.get('resolucion', 'secuencial'),
+                              rango_rapidez=parametros.get('rango_rapidez'))
+        sim.rng.bit_generator.state = cabecera['rng']
+        sim.estado = EstadoDiscos(datos['pos'], datos['vel'], datos['radios'], cabecera['colores'], datos['masas'], sim.dtype)
+        sim.tiempo = cabecera['tiempo']
+        sim.paso_actual = cabecera['paso_actual']
+        sim.contadores.update(cabecera['contadores'])
+        if sim.historial:
+            sim._historial_x = list(datos['historial_x'])
+
+        sim.histogramas = {}
+        for nombre, desc in cabecera['histogramas'].items():
+            if 'rango_x' in desc:
+                hist = HistogramaAcumulado2D(tuple(desc['bins']), desc['rango_x'], desc['rango_y'])
+            else:
+                hist = HistogramaAcumulado(desc['bins'], desc['rango'])
+            hist.conteos[...] = datos[f'hist_{nombre}']
+            hist.fuera = desc['fuera']
+            sim.histogramas[nombre] = hist
+
+        eventos = cabecera['eventos']
+        if eventos is not None:
+            motor = MotorEventos(sim.estado, sim.ancho, sim.altura, predecir=False)
+            motor.choques_discos = eventos['choques_discos']
+            motor.choques_pared = eventos['choques_pared']
+            motor.cruces = eventos.get('cruces', 0)
+            motor.pares_revisados = eventos['pares_revisados']
+            motor.impulso_pared = eventos.get('impulso_pared', 0.0)
+            cola = [(t, i, j, ci, cj) for t, (i, j, ci, cj)
+                    in zip(datos['cola_t'].tolist(), datos['cola_indices'].tolist())]
+            celdas = datos['eventos_celdas'] if 'eventos_celdas' in datos else None
+            motor.restaurar(eventos['t'], datos['eventos_conteo'], cola, celdas)
+            sim._eventos = motor
+    return sim
+
+
+class PuntosAutomaticos:
+    """
+    Clase utilizada para guardar puntos de control periódicos mientras la simulación avanza. Se revisa al final de cada paso; guarda cuando pasaron `cada_pasos` pasos o `cada_segundos` segundos desde el último punto de control, lo que ocurra primero.
+    """
+
+    def __init__(self, ruta, cada_pasos=None, cada_segundos=None, paso=0):
+        """
+        Args:
+            ruta (str): Archivo de destino. Puede contener `{paso}` para guardar un archivo por punto de control en lugar de sobrescribir siempre el mismo.
+            cada_pasos (int): Pasos entre puntos de control
+            cada_segundos (float): Segundos de reloj entre puntos de control
+            paso (int): Paso de la simulación desde el que se empieza a contar
+        """
+        if cada_pasos is None and cada_segundos is None:
+            raise ValueError("Se debe indicar cada_pasos, cada_segundos o ambos")
+        self.ruta = ruta
+        self.cada_pasos = cada_pasos
+        self.cada_segundos = cada_segundos
+        self.guardados = []
+        self._ultimo_paso = paso
+        self._ultimo_reloj = time.monotonic()
+
+    def revisar(self, sim):
+        """
+        Guarda un punto de control de `sim` si ya corresponde. Devuelve la ruta escrita o None.
+        """
+        if self.cada_pasos is not None and sim.paso_actual - self._ultimo_paso >= self.cada_pasos:
+            return self._guardar(sim)
+        if self.cada_segundos is not None and time.monotonic() - self._ultimo_reloj >= self.cada_segundos:
+            return self._guardar(sim)
+        return None
+
+    def _guardar(self, sim):
+        ruta = self.ruta.format(paso=sim.paso_actual)
+        guardar_punto(sim, ruta)
+        self.guardados.append(ruta)
+        self._ultimo_paso = sim.paso_actual
+        self._ultimo_reloj = time.monotonic()
+        return ruta
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+"""Pruebas de rendimiento reproducibles de los motores de simulación. El módulo contiene las siguientes funciones:
+
+- `casos` - Genera la matriz de casos a medir (motor, número de discos, tamaño de caja y radio).
+- `medir` - Corre un caso sin animación y mide pasos por segundo, pares revisados, choques y memoria máxima.
+- `ejecutar_suite` - Mide todos los casos y junta los resultados en un diccionario serializable a JSON.
+- `comparar` - Compara dos resultados guardados, por ejemplo de dos commits distintos.
+- `comparar_precisiones` - Compara la velocidad y la memoria de cada caso en precisión simple y doble.
+
+Los motores comparados son la versión de fuerza bruta de `Discos` (`fuerza_bruta`), el motor de pasos de `Discos_optimizado` con lista de celdas (`celdas`), con lista de celdas incremental (`incremental`), con lista de Verlet (`verlet`), con barrido y poda (`barrido`) o con árbol cuaternario (`arbol`) y el motor dirigido por eventos (`eventos`).
+"""
+
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+MOTORES = ('fuerza_bruta', 'celdas', 'incremental', 'verlet', 'barrido', 'arbol', 'eventos')
+PRECISIONES = ('float64', 'float32')
+# Motores que solo funcionan en doble precisión
+SOLO_DOBLE = ('fuerza_bruta', 'eventos')
+
+
+def lado_para_densidad(n, radio, densidad):
+    """
+    Devuelve el lado de la caja cuadrada en la que n discos de radio `radio` cubren la fracción `densidad` del área.
+    """
+    return float(np.sqrt(n * np.pi * radio**2 / densidad))
+
+
+def casos(motores=MOTORES, ns=(100, 1000), radios=(1.0,), densidades=(0.1, 0.3), lados=None, max_fuerza_bruta=2000,
+          precisiones=('float64',)):
+    """
+    Genera la matriz de casos. El tamaño de la caja se da directamente con `lados` o se deduce de cada densidad. Los motores de fuerza bruta y de eventos solo se miden en doble precisión.
+
+    Args:
+        motores (tuple): Motores a medir
+        ns (tuple): Números de discos
+        radios (tuple): Radios de los discos
+        densidades (tuple): Fracciones del área cubierta por los discos; se ignoran si se da `lados`
+        lados (tuple): Lados de la caja cuadrada
+        max_fuerza_bruta (int): Número máximo de discos para el motor de fuerza bruta, que crece como N²
+        precisiones (tuple): Precisiones del estado de los discos, `'float64'` y/o `'float32'`
+
+    Returns:
+        list: Un diccionario por caso con `motor`, `n`, `lado`, `radio` y `precision`.
+
+    Example:
+        >>> casos(('celdas',), ns=(1000, 10000), densidades=(0.2,))
+
+        >>> Produce dos casos del motor de celdas con 20 % del área ocupada.
+    """
+    for precision in precisiones:
+        if precision not in PRECISIONES:
+            raise ValueError(f"Precisión desconocida {precision!r}; se esperaba una de {PRECISIONES}")
+    lista = []
+    for motor in motores:
+        if motor not in MOTORES:
+            raise ValueError(f"Motor desconocido {motor!r}; se esperaba uno de {MOTORES}")
+        for n in ns:
+            if motor == 'fuerza_bruta' and n > max_fuerza_bruta:
+                continue
+            for radio in radios:
+                tamanos = lados if lados else [lado_para_densidad(n, radio, d) for d in densidades]
+                for lado in tamanos:
+                    for precision in precisiones:
+                        if motor in SOLO_DOBLE and precision != 'float64':
+                            continue
+                        lista.append({'motor': motor, 'n': int(n), 'lado': float(lado), 'radio': float(radio),
+                                      'precision': precision})
+    return lista
+
+
+def _crear(caso, dt, semilla):
+    """
+    Crea la simulación del caso y devuelve una función que avanza un paso y devuelve (pares revisados, choques entre discos).
+    """
+    n, lado, radio = caso['n'], caso['lado'], caso['radio']
+    if caso['motor'] == 'fuerza_bruta':
+        from Discos import DiscoSimulation as SimulacionBruta
+
+        random.seed(semilla)
+        sim = SimulacionBruta(n, lado, lado, radio, dt)
+        sim.creacionDiscos()
+        pares = len(sim.discos) * (len(sim.discos) - 1) // 2
+        return sim, len(sim.discos), lambda: (pares, sim.paso())
+
+    from Discos_optimizado import DiscoSimulation
+
+    motor = 'eventos' if caso['motor'] == 'eventos' else 'pasos'
+    deteccion = caso['motor'] if caso['motor'] in ('incremental', 'verlet', 'barrido', 'arbol') else 'celdas'
+    sim = DiscoSimulation(n, lado, lado, radio, dt, motor=motor, semilla=semilla, deteccion=deteccion,
+                          dtype=caso.get('precision', 'float64'))
+    sim.creacionDiscos('lotes')
+
+    def paso():
+        choques = sim.contadores['choques_discos']
+        if motor == 'eventos':
+            eventos = sim.motorEventos()
+            revisados = eventos.pares_revisados
+            sim.avanzar()
+            return eventos.pares_revisados - revisados, sim.contadores['choques_discos'] - choques
+        sim.avanzar()
+        return sim.fase_amplia.candidatos, sim.contadores['choques_discos'] - choques
+
+    return sim, len(sim.estado), paso
+
+
+def medir(caso, pasos=100, dt=0.03, semilla=0, calentamiento=2, pasos_memoria=10):
+    """
+    Mide un caso sin animación. El tiempo se mide sin `tracemalloc`; la memoria máxima se mide en una corrida aparte y más corta, que incluye la creación de los discos.
+
+    Args:
+        caso (dict): Caso generado por `casos`
+        pasos (int): Pasos cronometrados
+        dt (float): Paso del tiempo
+        semilla (int): Semilla de la colocación y las velocidades iniciales
+        calentamiento (int): Pasos previos que no se cronometran
+        pasos_memoria (int): Pasos de la corrida que mide la memoria
+
+    Returns:
+        dict: El caso junto con la densidad, los discos colocados, los pasos por segundo, los pares revisados y los choques por paso, la memoria máxima y la memoria que ocupan los arreglos del estado (None con fuerza bruta), en bytes.
+    """
+    sim, colocados, paso = _crear(caso, dt, semilla)
+    for _ in range(calentamiento):
+        paso()
+    pares = choques = 0
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        revisados, chocados = paso()
+        pares += revisados
+        choques += chocados
+    duracion = time.perf_counter() - inicio
+    estado = getattr(sim, 'estado', None)
+    memoria_estado = None if estado is None else sum(a.nbytes for a in (estado.pos, estado.vel, estado.radios, estado.masas))
+    del sim, paso, estado
+
+    tracemalloc.start()
+    try:
+        _, _, paso = _crear(caso, dt, semilla)
+        for _ in range(pasos_memoria):
+            paso()
+        memoria = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    resultado = dict(caso)
+    resultado.update({
+        'densidad': caso['n'] * np.pi * caso['radio']**2 / caso['lado']**2,
+        'discos': colocados,
+        'pasos': pasos,
+        'segundos': duracion,
+        'pasos_por_segundo': pasos / duracion if duracion > 0 else float('inf'),
+        'pares_por_paso': pares / pasos if pasos else 0.0,
+        'choques_por_paso': choques / pasos if pasos else 0.0,
+        'memoria_pico': memoria,
+        'memoria_estado': memoria_estado,
+    })
+    return resultado
+
+
+def _entorno():
+    """
+    Describe la máquina y la versión del código en que se midió.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def ejecutar_suite(lista_casos, pasos=100, dt=0.03, semilla=0, calentamiento=2, pasos_memoria=10, progreso=None):
+    """
+    Mide todos los casos, uno tras otro en el mismo proceso.
+
+    Args:
+        lista_casos (list): Casos generados por `casos`
+        pasos, dt, semilla, calentamiento, pasos_memoria: Como en `medir`
+        progreso (callable): Función que recibe el resultado de cada caso al terminarlo, por ejemplo para imprimirlo
+
+    Returns:
+        dict: Entorno de la medición, parámetros y lista de resultados, listo para guardarse con `json.dump`.
+    """
+    resultados = []
+    for caso in lista_casos:
+        resultado = medir(caso, pasos, dt, semilla, calentamiento, pasos_memoria)
+        resultados.append(resultado)
+        if progreso is not None:
+            progreso(resultado)
+    return {
+        'version': 1,
+        'entorno': _entorno(),
+        'parametros': {'pasos': pasos, 'dt': dt, 'semilla': semilla, 'calentamiento': calentamiento,
+                       'pasos_memoria': pasos_memoria},
+        'resultados': resultados,
+    }
+
+
+def _clave(resultado, precision=True):
+    clave = (resultado['motor'], resultado['n'], round(resultado['lado'], 6), round(resultado['radio'], 6))
+    return clave + (resultado.get('precision', 'float64'),) if precision else clave
+
+
+def comparar(anterior, actual, tolerancia=0.1):
+    """
+    Compara los casos comunes de dos resultados de `ejecutar_suite`.
+
+    Args:
+        anterior (dict): Resultado de referencia
+        actual (dict): Resultado nuevo
+        tolerancia (float): Pérdida relativa de pasos por segundo a partir de la cual un caso se marca como regresión
+
+    Returns:
+        list: Para cada caso común, un diccionario con el caso, los pasos por segundo de ambos, la razón actual/anterior y si es una regresión.
+    """
+    referencia = {_clave(r): r for r in anterior['resultados']}
+    filas = []
+    for r in actual['resultados']:
+        previo = referencia.get(_clave(r))
+        if previo is None:
+            continue
+        razon = r['pasos_por_segundo'] / previo['pasos_por_segundo']
+        filas.append({
+            'motor': r['motor'], 'n': r['n'], 'lado': r['lado'], 'radio': r['radio'],
+            'precision': r.get('precision', 'float64'),
+            'antes': previo['pasos_por_segundo'], 'ahora': r['pasos_por_segundo'],
+            'razon': razon, 'regresion': razon < 1 - tolerancia,
+        })
+    return filas
+
+
+def comparar_precisiones(resultado):
+    """
+    Compara, dentro de un mismo resultado de `ejecutar_suite`, cada caso medido en precisión simple con el mismo caso en doble precisión.
+
+    Args:
+        resultado (dict): Resultado de `ejecutar_suite` con casos en `'float32'` y en `'float64'`
+
+    Returns:
+        list: Para cada caso medido en ambas precisiones, un diccionario con el caso, los pasos por segundo, la memoria máxima y la memoria del estado de cada precisión y las razones float32/float64.
+    """
+    dobles = {_clave(r, False): r for r in resultado['resultados'] if r.get('precision', 'float64') == 'float64'}
+    filas = []
+    for r in resultado['resultados']:
+        doble = dobles.get(_clave(r, False))
+        if r.get('precision') != 'float32' or doble is None:
+            continue
+        filas.append({
+            'motor': r['motor'], 'n': r['n'], 'lado': r['lado'], 'radio': r['radio'],
+            'velocidad_64': doble['pasos_por_segundo'], 'velocidad_32': r['pasos_por_segundo'],
+            'memoria_64': doble['memoria_pico'], 'memoria_32': r['memoria_pico'],
+            'estado_64': doble['memoria_estado'], 'estado_32': r['memoria_estado'],
+            'razon_velocidad': r['pasos_por_segundo'] / doble['pasos_por_segundo'],
+            'razon_memoria': r['memoria_pico'] / doble['memoria_pico'] if doble['memoria_pico'] else float('nan'),
+            'razon_estado': r['memoria_estado'] / doble['memoria_estado'] if doble['memoria_estado'] else float('nan'),
+        })
+    return filas
+
+
+def _fila(r):
+    return (f"{r['motor']:>12} {r.get('precision', 'float64'):>7} N={r['n']:<7} lado={r['lado']:<8.1f} r={r['radio']:<5g} φ={r['densidad']:.2f}  "
+            f"{r['pasos_por_segundo']:10.1f} pasos/s  {r['pares_por_paso']:12.0f} pares/paso  "
+            f"{r['choques_por_paso']:8.1f} choques/paso  {r['memoria_pico'] / 2**20:8.1f} MiB")
+
+
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Example:
+        >>> python -m Rendimiento --motores celdas eventos --n 1000 10000 --densidades 0.1 0.3 --salida bench.json
+
+        >>> Mide 8 casos e imprime una línea por caso; guarda los resultados en bench.json.
+
+        >>> python -m Rendimiento --n 1000 --salida nuevo.json --comparar bench.json
+
+        >>> Además compara con una medición anterior y marca las regresiones.
+
+        >>> python -m Rendimiento --motores celdas --n 100000 --precisiones float64 float32
+
+        >>> Mide cada caso en ambas precisiones y muestra cuánto cambian la velocidad y la memoria.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m Rendimiento', description='Pruebas de rendimiento de los motores de simulación.')
+    parser.add_argument('--motores', nargs='+', choices=MOTORES, default=list(MOTORES), help='Motores a medir')
+    parser.add_argument('--n', nargs='+', type=int, default=[100, 1000], help='Números de discos')
+    parser.add_argument('--radios', nargs='+', type=float, default=[1.0], help='Radios de los discos')
+    parser.add_argument('--densidades', nargs='+', type=float, default=[0.1, 0.3], help='Fracciones del área ocupada')
+    parser.add_argument('--lados', nargs='+', type=float, default=None, help='Lados de la caja; reemplazan a --densidades')
+    parser.add_argument('--precisiones', nargs='+', choices=PRECISIONES, default=['float64'], help='Precisiones del estado de los discos')
+    parser.add_argument('--max-fuerza-bruta', type=int, default=2000, help='Máximo de discos para el motor de fuerza bruta')
+    parser.add_argument('--pasos', type=int, default=100, help='Pasos cronometrados por caso')
+    parser.add_argument('--dt', type=float, default=0.03, help='Paso del tiempo')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla de las condiciones iniciales')
+    parser.add_argument('--salida', metavar='ARCHIVO', help='Guarda los resultados en este archivo JSON')
+    parser.add_argument('--comparar', metavar='ARCHIVO', help='Compara con los resultados guardados en este archivo JSON')
+    parser.add_argument('--tolerancia', type=float, default=0.1, help='Pérdida relativa de velocidad que cuenta como regresión')
+    args = parser.parse_args(argv)
+
+    lista = casos(args.motores, args.n, args.radios, args.densidades, args.lados, args.max_fuerza_bruta, args.precisiones)
+    resultado = ejecutar_suite(lista, pasos=args.pasos, dt=args.dt, semilla=args.semilla,
+                               progreso=lambda r: print(_fila(r), flush=True))
+    for f in comparar_precisiones(resultado):
+        print(f"{f['motor']:>12} N={f['n']:<7} lado={f['lado']:<8.1f} r={f['radio']:<5g} float32/float64: "
+              f"velocidad x{f['razon_velocidad']:.2f}, memoria máxima x{f['razon_memoria']:.2f}, estado x{f['razon_estado']:.2f}")
+    if args.salida:
+        with open(args.salida, 'w') as archivo:
+            json.dump(resultado, archivo, indent=2)
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            anterior = json.load(archivo)
+        filas = comparar(anterior, resultado, args.tolerancia)
+        for f in filas:
+            marca = '  REGRESIÓN' if f['regresion'] else ''
+            print(f"{f['motor']:>12} {f['precision']:>7} N={f['n']:<7} lado={f['lado']:<8.1f} r={f['radio']:<5g} "
+                  f"{f['antes']:10.1f} -> {f['ahora']:10.1f} pasos/s (x{f['razon']:.2f}){marca}")
+        if any(f['regresion'] for f in filas):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
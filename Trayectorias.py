@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""Grabación de trayectorias en disco. El módulo contiene las siguientes clases:
+
+- `GrabadorTrayectoria` - Escribe x, y, vx y vy de todos los discos en bloques `.npy` mapeados en memoria.
+- `LectorTrayectoria` - Abre una trayectoria grabada sin cargarla completa en memoria.
+
+Una trayectoria es un directorio con una cabecera `cabecera.json`, los radios de los discos en `radios.npy` y los bloques `bloque_00000.npy`, `bloque_00001.npy`, ... Cada bloque es un arreglo de forma (cuadros, N, 4) con las columnas x, y, vx y vy.
+"""
+
+import json
+import os
+
+import numpy as np
+
+CAMPOS = ('x', 'y', 'vx', 'vy')
+CABECERA = 'cabecera.json'
+
+
+class GrabadorTrayectoria:
+    """
+    Clase utilizada para grabar la trayectoria de todos los discos en disco.
+
+    Los cuadros se escriben en bloques preasignados con `np.lib.format.open_memmap`, de modo que la memoria ocupada no crece con la duración de la simulación. La cabecera se reescribe cada vez que se completa un bloque, así que si el proceso se interrumpe los bloques completos siguen siendo legibles.
+    """
+
+    def __init__(self, directorio, radios, cada=1, dtype=np.float32, cuadros_por_bloque=1000, metadatos=None):
+        """
+        Crea el directorio de la trayectoria y guarda los radios de los discos.
+
+        Args:
+            directorio (str): Directorio donde se guarda la trayectoria
+            radios (array): Radios de los discos, de forma (N,)
+            cada (int): Se graba un cuadro cada `cada` pasos
+            dtype (type): Tipo de dato de los bloques, `np.float32` o `np.float64`
+            cuadros_por_bloque (int): Cantidad de cuadros de cada archivo de bloque
+            metadatos (dict): Datos adicionales que se guardan en la cabecera, por ejemplo el tamaño de la caja
+
+        Example:
+            >>> GrabadorTrayectoria('corrida', sim.estado.radios, cada=10)
+
+            >>> Graba uno de cada 10 pasos de la simulación en el directorio corrida.
+        """
+        if cada < 1:
+            raise ValueError("cada debe ser al menos 1")
+        self.directorio = directorio
+        self.n_discos = len(radios)
+        self.cada = int(cada)
+        self.dtype = np.dtype(dtype)
+        self.cuadros_por_bloque = int(cuadros_por_bloque)
+        self.metadatos = dict(metadatos or {})
+        self.cuadros = 0
+        self.paso_inicial = None
+        self.bloques = []
+        self._bloque = None
+        self._fila = 0
+
+        os.makedirs(directorio, exist_ok=True)
+        np.save(os.path.join(directorio, 'radios.npy'), np.asarray(radios, dtype=float))
+        self._escribirCabecera()
+
+    def _escribirCabecera(self):
+        cabecera = {
+            'version': 1,
+            'campos': list(CAMPOS),
+            'n_discos': self.n_discos,
+            'dtype': self.dtype.name,
+            'cada': self.cada,
+            'paso_inicial': self.paso_inicial,
+            'cuadros': self.cuadros,
+            'cuadros_por_bloque': self.cuadros_por_bloque,
+            'bloques': self.bloques,
+            'metadatos': self.metadatos,
+        }
+        temporal = os.path.join(self.directorio, CABECERA + '.tmp')
+        with open(temporal, 'w') as archivo:
+            json.dump(cabecera, archivo, indent=2)
+        os.replace(temporal, os.path.join(self.directorio, CABECERA))
+
+    def _nuevoBloque(self):
+        if self._bloque is not None:
+            self._bloque.flush()
+        nombre = f'bloque_{len(self.bloques):05d}.npy'
+        self._bloque = np.lib.format.open_memmap(
+            os.path.join(self.directorio, nombre), mode='w+', dtype=self.dtype,
+            shape=(self.cuadros_por_bloque, self.n_discos, len(CAMPOS)))
+        self.bloques.append(nombre)
+        self._fila = 0
+        self._escribirCabecera()
+
+    def registrar(self, paso, pos, vel):
+        """
+        Graba el estado del paso indicado si corresponde según `cada`.
+
+        Args:
+            paso (int): Número de paso de la simulación
+            pos (array): Posiciones de los discos, de forma (N, 2)
+            vel (array): Velocidades de los discos, de forma (N, 2)
+        """
+        if self.paso_inicial is None:
+            self.paso_inicial = int(paso)
+        if (paso - self.paso_inicial) % self.cada:
+            return
+        if self._bloque is None or self._fila == self.cuadros_por_bloque:
+            self._nuevoBloque()
+        cuadro = self._bloque[self._fila]
+        cuadro[:, 0:2] = pos
+        cuadro[:, 2:4] = vel
+        self._fila += 1
+        self.cuadros += 1
+
+    def cerrar(self):
+        """
+        Escribe a disco los datos pendientes y actualiza la cabecera con la cantidad final de cuadros.
+        """
+        if self._bloque is not None:
+            self._bloque.flush()
+            self._bloque = None
+        self._escribirCabecera()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class LectorTrayectoria:
+    """
+    Clase utilizada para leer una trayectoria grabada con `GrabadorTrayectoria`.
+
+    Los bloques se abren con `mmap_mode='r'` solo cuando se necesitan, por lo que se puede analizar una trayectoria más grande que la memoria disponible.
+    """
+
+    def __init__(self, directorio):
+        """
+        Lee la cabecera de la trayectoria.
+
+        Args:
+            directorio (str): Directorio de la trayectoria
+
+        Example:
+            >>> tray = LectorTrayectoria('corrida')
+
+            >>> tray[100][:, 0]
+
+            >>> Devuelve las posiciones en x de todos los discos en el cuadro 100.
+        """
+        self.directorio = directorio
+        with open(os.path.join(directorio, CABECERA)) as archivo:
+            cabecera = json.load(archivo)
+        self.n_discos = cabecera['n_discos']
+        self.dtype = np.dtype(cabecera['dtype'])
+        self.cada = cabecera['cada']
+        self.paso_inicial = cabecera['paso_inicial'] or 0
+        self.cuadros = cabecera['cuadros']
+        self.cuadros_por_bloque = cabecera['cuadros_por_bloque']
+        self.metadatos = cabecera['metadatos']
+        self._nombres = cabecera['bloques']
+        self._abiertos = {}
+        self.radios = np.load(os.path.join(directorio, 'radios.npy'))
+
+    def __len__(self):
+        return self.cuadros
+
+    def _bloque(self, b):
+        if b not in self._abiertos:
+            self._abiertos[b] = np.load(os.path.join(self.directorio, self._nombres[b]), mmap_mode='r')
+        return self._abiertos[b]
+
+    def __getitem__(self, k):
+        """
+        Devuelve el cuadro `k` como un arreglo de forma (N, 4) con columnas x, y, vx y vy, sin copiarlo a memoria.
+        """
+        if k < 0:
+            k += self.cuadros
+        if not 0 <= k < self.cuadros:
+            raise IndexError(f"Cuadro {k} fuera de rango; la trayectoria tiene {self.cuadros} cuadros")
+        b, fila = divmod(k, self.cuadros_por_bloque)
+        return self._bloque(b)[fila]
+
+    def __iter__(self):
+        for _, bloque in self.bloques():
+            yield from bloque
+
+    def paso(self, k):
+        """
+        Devuelve el número de paso de la simulación al que corresponde el cuadro `k`.
+        """
+        return self.paso_inicial + k * self.cada
+
+    def bloques(self):
+        """
+        Recorre la trayectoria bloque por bloque, para analizarla por partes.
+
+        Returns:
+            generator: Pares (primer cuadro, arreglo de forma (cuadros, N, 4)) de cada bloque. Los arreglos están mapeados en memoria.
+
+        Example:
+            >>> for inicio, bloque in tray.bloques():
+            >>>     hist.agregar(bloque[:, :, 0].ravel())
+
+            >>> Acumula el histograma de x de toda la trayectoria sin cargarla completa.
+        """
+        for b in range(len(self._nombres)):
+            inicio = b * self.cuadros_por_bloque
+            if inicio >= self.cuadros:
+                break
+            yield inicio, self._bloque(b)[:min(self.cuadros_por_bloque, self.cuadros - inicio)]
+
+    def campo(self, nombre, k):
+        """
+        Devuelve una de las columnas x, y, vx o vy del cuadro `k`.
+
+        Args:
+            nombre (str): Nombre del campo
+            k (int): Número de cuadro
+        """
+        return self[k][:, CAMPOS.index(nombre)]
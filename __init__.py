@@ -3,4 +3,19 @@
 Módulos exportados por este paquete:
 
 - `Discos`: Simula el comportamiento de varios discos dentro de una caja y realiza un histograma sobre las posiciones de cada partícula en el eje x.
+- `Discos_optimizado`: Versión optimizada de `Discos`, con el estado de los discos guardado en arreglos de NumPy.
+- `Colisiones`: Detección y resolución de colisiones entre discos sobre arreglos.
+- `Eventos`: Motor de dinámica molecular dirigida por eventos.
+- `Histogramas`: Histogramas acumulados en línea con memoria fija.
+- `Trayectorias`: Grabación y lectura de trayectorias en bloques mapeados en memoria.
+- `Colocacion`: Colocación inicial de discos sin superposiciones.
+- `Ensamble`: Ejecución en paralelo de réplicas independientes y estadísticas agregadas.
+- `Dominios`: Descomposición de la caja en franjas para simular un sistema grande en varios procesos.
+- `Rendimiento`: Pruebas de rendimiento reproducibles de los motores de simulación.
+- `Instrumentacion`: Medición del tiempo de cada fase del paso y contadores por paso.
+- `Exportacion`: Exportación en paralelo de cuadros PNG o NPZ sin interfaz gráfica.
+- `Integracion`: Paso de tiempo adaptativo y subpasos solo para los discos rápidos.
+- `PuntosControl`: Puntos de control para guardar y reanudar simulaciones de forma exacta.
+- `Observables`: Presión, tasa de choques, recorrido libre medio y comparación con Maxwell–Boltzmann calculados durante la simulación.
+- `Monitor`: Física en un proceso aparte y visor en vivo conectados por un anillo de cuadros en memoria compartida.
 """